@@ -1,26 +1,90 @@
 # python
+import asyncio
+import contextlib
+import os
+
 from fastapi import FastAPI
 from fastapi.responses import JSONResponse
 
-app = FastAPI(title="Auth Server (DEV)")
+from .models.clients import load_clients
+from .models.users import load_users
+from .routes.oauth import router as oauth_router
+from .security.keys import KeyRing
+from .security.store import TTLStore
+from .security.tokens import TokenIssuer
+
+AUTH_ISSUER_URL = os.environ.get("AUTH_ISSUER_URL", "http://auth-server:8000")
+JWT_AUDIENCE = os.environ.get("JWT_AUDIENCE", "mcp-audience")
+ACCESS_TOKEN_TTL = int(os.environ.get("ACCESS_TOKEN_TTL", "900"))
+ID_TOKEN_TTL = int(os.environ.get("ID_TOKEN_TTL", "900"))
+# Comma separated PEM files: the first signs, the rest are only published for verification
+AUTH_SIGNING_KEYS = [p.strip() for p in os.environ.get("AUTH_SIGNING_KEYS", "").split(",") if p.strip()]
+AUTH_KEY_BITS = int(os.environ.get("AUTH_KEY_BITS", "2048"))
+AUTH_KEY_ROTATION_INTERVAL = float(os.environ.get("AUTH_KEY_ROTATION_INTERVAL", "0"))
+JWKS_MAX_AGE = int(os.environ.get("JWKS_MAX_AGE", "300"))
+AUTH_CODE_TTL = float(os.environ.get("AUTH_CODE_TTL", "60"))
+AUTH_SESSION_TTL = float(os.environ.get("AUTH_SESSION_TTL", "3600"))
+AUTH_STORE_MAX_ENTRIES = int(os.environ.get("AUTH_STORE_MAX_ENTRIES", "100000"))
+AUTH_SWEEP_INTERVAL = float(os.environ.get("AUTH_SWEEP_INTERVAL", "5"))
+
+
+def _read_pem(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Retired keys stay in the JWKS until every token they signed has expired and verifiers have refetched
+    keys = KeyRing(
+        [_read_pem(p) for p in AUTH_SIGNING_KEYS], bits=AUTH_KEY_BITS,
+        retain_seconds=max(ACCESS_TOKEN_TTL, ID_TOKEN_TTL) + JWKS_MAX_AGE,
+    )
+    app.state.keys = keys
+    app.state.token_issuer = TokenIssuer(keys, AUTH_ISSUER_URL, JWT_AUDIENCE, ACCESS_TOKEN_TTL, ID_TOKEN_TTL)
+    # Codes, sessions and generated signing keys live in this process: run exactly one
+    # instance (one replica, one worker) or a code issued here is redeemed elsewhere
+    app.state.codes = TTLStore(AUTH_CODE_TTL, AUTH_STORE_MAX_ENTRIES)
+    app.state.sessions = TTLStore(AUTH_SESSION_TTL, AUTH_STORE_MAX_ENTRIES)
+    app.state.users = load_users()
+    app.state.clients = load_clients()
+    tasks = [
+        asyncio.create_task(app.state.codes.run_sweeper(AUTH_SWEEP_INTERVAL)),
+        asyncio.create_task(app.state.sessions.run_sweeper(AUTH_SWEEP_INTERVAL)),
+    ]
+    if AUTH_KEY_ROTATION_INTERVAL > 0:
+        tasks.append(asyncio.create_task(keys.run_rotation(AUTH_KEY_ROTATION_INTERVAL)))
+    try:
+        yield
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+app = FastAPI(title="Auth Server (DEV)", lifespan=lifespan)
+app.include_router(oauth_router)
 
 @app.get("/.well-known/openid-configuration")
 def discovery():
     return {
-        "issuer": "http://auth-server:8000",
-        "jwks_uri": "http://auth-server:8000/jwks",
-        "authorization_endpoint": "http://auth-server:8000/authorize",
-        "token_endpoint": "http://auth-server:8000/token",
-        "userinfo_endpoint": "http://auth-server:8000/userinfo",
+        "issuer": AUTH_ISSUER_URL,
+        "jwks_uri": f"{AUTH_ISSUER_URL}/jwks",
+        "authorization_endpoint": f"{AUTH_ISSUER_URL}/authorize",
+        "token_endpoint": f"{AUTH_ISSUER_URL}/token",
+        "userinfo_endpoint": f"{AUTH_ISSUER_URL}/userinfo",
         "scopes_supported": ["openid", "profile", "email", "mcp.tools"],
         "response_types_supported": ["code"],
         "grant_types_supported": ["authorization_code"],
+        "code_challenge_methods_supported": ["S256"],
+        "id_token_signing_alg_values_supported": ["RS256"],
+        "token_endpoint_auth_methods_supported": ["none", "client_secret_post", "client_secret_basic"],
     }
 
 @app.get("/jwks")
 def jwks():
-    # Placeholder JWKS for scaffolding; will be replaced with real keys
-    return {"keys": []}
+    # Prebuilt on rotation; max-age lets verifiers cache it between rotations
+    return JSONResponse(app.state.keys.jwks, headers={"Cache-Control": f"public, max-age={JWKS_MAX_AGE}"})
 
 @app.get("/healthz")
 def health():
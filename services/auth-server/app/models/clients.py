@@ -0,0 +1,22 @@
+# python
+import hmac
+import os
+from typing import Dict, Optional
+
+
+def load_clients() -> Dict[str, dict]:
+    client_id = os.environ.get("AUTH_CLIENT_ID", "streamlit-client")
+    redirects = os.environ.get("AUTH_REDIRECT_URI", "http://localhost:8501/oauth/callback")
+    return {
+        client_id: {
+            "redirect_uris": [u.strip() for u in redirects.split(",") if u.strip()],
+            # Empty secret means a public client that relies on PKCE alone
+            "secret": os.environ.get("AUTH_CLIENT_SECRET", ""),
+        }
+    }
+
+
+def check_secret(client: dict, secret: Optional[str]) -> bool:
+    if not client["secret"]:
+        return True
+    return secret is not None and hmac.compare_digest(secret.encode(), client["secret"].encode())
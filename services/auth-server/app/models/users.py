@@ -0,0 +1,26 @@
+# python
+import hmac
+import json
+import os
+from typing import Dict, Optional
+
+# Dev-only user directory; override with AUTH_DEV_USERS as a JSON object keyed by username
+DEFAULT_USERS = {
+    "admin": {"password": "admin", "role": "admin", "name": "Admin", "email": "admin@example.com"},
+    "demo": {"password": "demo", "role": "user", "name": "Demo User", "email": "demo@example.com"},
+}
+
+
+def load_users(raw: Optional[str] = None) -> Dict[str, dict]:
+    raw = raw if raw is not None else os.environ.get("AUTH_DEV_USERS", "")
+    users = json.loads(raw) if raw.strip() else DEFAULT_USERS
+    return {name: {"sub": entry.get("sub", name), "role": "user", **entry} for name, entry in users.items()}
+
+
+def authenticate(users: Dict[str, dict], username: str, password: str) -> Optional[dict]:
+    user = users.get(username)
+    # Compare against a dummy when the user is unknown so timing does not reveal valid names
+    expected = user["password"] if user else "\0"
+    if not hmac.compare_digest(password.encode(), expected.encode()) or user is None:
+        return None
+    return user
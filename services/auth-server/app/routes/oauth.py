@@ -0,0 +1,175 @@
+# python
+import base64
+import html
+import secrets
+from typing import Optional
+from urllib.parse import urlencode
+
+from fastapi import APIRouter, Form, Header, Request
+from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse
+from starlette.concurrency import run_in_threadpool
+
+from ..models.clients import check_secret
+from ..models.users import authenticate
+from ..security.tokens import verify_pkce
+
+router = APIRouter()
+
+SESSION_COOKIE = "auth_session"
+AUTHORIZE_FIELDS = ("response_type", "client_id", "redirect_uri", "scope", "state", "code_challenge", "code_challenge_method", "nonce")
+
+LOGIN_PAGE = """<!doctype html>
+<html><head><title>Sign in</title></head>
+<body>
+<h1>Sign in</h1>
+{error}
+<form method="post" action="/authorize">
+{hidden}
+<label>Username <input name="username" autocomplete="username" required></label><br>
+<label>Password <input name="password" type="password" autocomplete="current-password" required></label><br>
+<button type="submit">Sign in</button>
+</form>
+</body></html>
+"""
+
+NO_STORE = {"Cache-Control": "no-store", "Pragma": "no-cache"}
+
+
+def _error_page(message: str, status: int = 400) -> HTMLResponse:
+    return HTMLResponse(f"<!doctype html><p>{html.escape(message)}</p>", status_code=status)
+
+
+def _redirect(redirect_uri: str, params: dict) -> RedirectResponse:
+    sep = "&" if "?" in redirect_uri else "?"
+    query = urlencode({k: v for k, v in params.items() if v is not None})
+    # 303 so a POSTed login turns into a GET on the client's callback
+    return RedirectResponse(f"{redirect_uri}{sep}{query}", status_code=303)
+
+
+def _validate(request: Request, params: dict):
+    """Returns an error response, or None when the authorization request is acceptable."""
+    client = request.app.state.clients.get(params.get("client_id") or "")
+    # Never redirect to an unregistered URI, show the error here instead
+    if client is None:
+        return _error_page("Unknown client_id")
+    if params.get("redirect_uri") not in client["redirect_uris"]:
+        return _error_page("redirect_uri is not registered for this client")
+    error = None
+    if params.get("response_type") != "code":
+        error = ("unsupported_response_type", "Only response_type=code is supported")
+    elif not params.get("code_challenge") or params.get("code_challenge_method") != "S256":
+        error = ("invalid_request", "PKCE with code_challenge_method=S256 is required")
+    if error:
+        return _redirect(params["redirect_uri"], {"error": error[0], "error_description": error[1], "state": params.get("state")})
+    return None
+
+
+def _issue_code(request: Request, params: dict, user: dict) -> RedirectResponse:
+    code = secrets.token_urlsafe(32)
+    request.app.state.codes.put(code, {
+        "user": user,
+        "client_id": params["client_id"],
+        "redirect_uri": params["redirect_uri"],
+        "scope": params.get("scope") or "openid",
+        "code_challenge": params["code_challenge"],
+        "nonce": params.get("nonce"),
+    })
+    return _redirect(params["redirect_uri"], {"code": code, "state": params.get("state")})
+
+
+def _login_form(params: dict, error: Optional[str] = None, status: int = 200) -> HTMLResponse:
+    hidden = "\n".join(
+        f'<input type="hidden" name="{name}" value="{html.escape(params[name] or "", quote=True)}">'
+        for name in AUTHORIZE_FIELDS if params.get(name) is not None
+    )
+    body = LOGIN_PAGE.format(error=f"<p>{html.escape(error)}</p>" if error else "", hidden=hidden)
+    return HTMLResponse(body, status_code=status, headers=NO_STORE)
+
+
+@router.get("/authorize")
+async def authorize(request: Request):
+    params = {name: request.query_params.get(name) for name in AUTHORIZE_FIELDS}
+    problem = _validate(request, params)
+    if problem is not None:
+        return problem
+    # An existing login session skips the form entirely
+    session = request.app.state.sessions.get(request.cookies.get(SESSION_COOKIE, ""))
+    if session is not None:
+        return _issue_code(request, params, session["user"])
+    return _login_form(params)
+
+
+@router.post("/authorize")
+async def login(request: Request, username: str = Form(...), password: str = Form(...)):
+    form = await request.form()
+    params = {name: form.get(name) for name in AUTHORIZE_FIELDS}
+    problem = _validate(request, params)
+    if problem is not None:
+        return problem
+    user = authenticate(request.app.state.users, username, password)
+    if user is None:
+        return _login_form(params, "Invalid username or password", status=401)
+    sessions = request.app.state.sessions
+    session_id = secrets.token_urlsafe(32)
+    sessions.put(session_id, {"user": user})
+    response = _issue_code(request, params, user)
+    response.set_cookie(SESSION_COOKIE, session_id, max_age=int(sessions.ttl), httponly=True, samesite="lax")
+    return response
+
+
+def _token_error(error: str, description: str, status: int = 400) -> JSONResponse:
+    return JSONResponse({"error": error, "error_description": description}, status_code=status, headers=NO_STORE)
+
+
+def _basic_credentials(authorization: Optional[str]):
+    if not authorization or not authorization.lower().startswith("basic "):
+        return None, None
+    try:
+        client_id, _, secret = base64.b64decode(authorization[6:]).decode().partition(":")
+    except ValueError:
+        return None, None
+    return client_id, secret
+
+
+@router.post("/token")
+async def token(
+    request: Request,
+    grant_type: str = Form(...),
+    code: str = Form(""),
+    redirect_uri: str = Form(""),
+    client_id: str = Form(""),
+    code_verifier: str = Form(""),
+    client_secret: Optional[str] = Form(None),
+    authorization: Optional[str] = Header(None),
+):
+    if grant_type != "authorization_code":
+        return _token_error("unsupported_grant_type", "Only authorization_code is supported")
+    basic_id, basic_secret = _basic_credentials(authorization)
+    client_id = client_id or basic_id or ""
+    client = request.app.state.clients.get(client_id)
+    if client is None or not check_secret(client, client_secret if client_secret is not None else basic_secret):
+        return _token_error("invalid_client", "Client authentication failed", status=401)
+    # Codes are single use: pop first so a replay fails even if the checks below do
+    grant = request.app.state.codes.pop(code)
+    if grant is None or grant["client_id"] != client_id or grant["redirect_uri"] != redirect_uri:
+        return _token_error("invalid_grant", "Authorization code is invalid, expired or already used")
+    if not verify_pkce(code_verifier, grant["code_challenge"]):
+        return _token_error("invalid_grant", "PKCE verification failed")
+    issuer = request.app.state.token_issuer
+    body = await run_in_threadpool(issuer.issue, grant["user"], client_id, grant["scope"], grant["nonce"])
+    return JSONResponse(body, headers=NO_STORE)
+
+
+@router.get("/userinfo")
+async def userinfo(request: Request, authorization: Optional[str] = Header(None)):
+    challenge = {"WWW-Authenticate": 'Bearer error="invalid_token"'}
+    if not authorization or not authorization.lower().startswith("bearer "):
+        return JSONResponse({"error": "invalid_token"}, status_code=401, headers={"WWW-Authenticate": "Bearer"})
+    claims = request.app.state.token_issuer.verify_access(authorization[7:].strip())
+    if claims is None:
+        return JSONResponse({"error": "invalid_token"}, status_code=401, headers=challenge)
+    info = {"sub": claims["sub"], "role": claims.get("role")}
+    user = next((u for u in request.app.state.users.values() if u["sub"] == claims["sub"]), None)
+    if user is not None:
+        info.update({k: user[k] for k in ("name", "email") if user.get(k)})
+    return info
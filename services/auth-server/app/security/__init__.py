@@ -0,0 +1,2 @@
+# python
+# package marker for signing keys and short-lived state
@@ -0,0 +1,88 @@
+# python
+import asyncio
+import base64
+import hashlib
+import json
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jose import jwk
+from jose.backends.base import Key
+
+# Signing keys are parsed once into jose Key objects and reused for every signature;
+# jose only re-parses when handed a PEM string or dict.
+
+ALGORITHM = "RS256"
+
+
+def generate_pem(bits: int = 2048) -> bytes:
+    private = rsa.generate_private_key(public_exponent=65537, key_size=bits)
+    return private.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    )
+
+
+def thumbprint(public_jwk: dict) -> str:
+    # RFC 7638: sha256 over the required members in lexicographic order
+    canonical = json.dumps({k: public_jwk[k] for k in ("e", "kty", "n")}, separators=(",", ":"), sort_keys=True)
+    return base64.urlsafe_b64encode(hashlib.sha256(canonical.encode()).digest()).rstrip(b"=").decode()
+
+
+class SigningKey:
+    def __init__(self, pem: bytes):
+        self.key: Key = jwk.construct(pem, ALGORITHM)
+        self.verify_key: Key = self.key.public_key()
+        public = self.verify_key.to_dict()
+        self.kid = thumbprint(public)
+        self.public_jwk = {**public, "kid": self.kid, "use": "sig", "alg": ALGORITHM}
+
+
+class KeyRing:
+    """Current signing key plus retired keys that stay published until their tokens expire."""
+
+    def __init__(self, pems: Iterable[bytes] = (), bits: int = 2048, retain_seconds: float = 1800.0):
+        self.bits = bits
+        self.retain_seconds = retain_seconds
+        keys = [SigningKey(pem) for pem in pems] or [SigningKey(generate_pem(bits))]
+        self.current = keys[0]
+        # Keys loaded from config are never retired automatically
+        self.previous: List[Tuple[SigningKey, Optional[float]]] = [(k, None) for k in keys[1:]]
+        self.rotations = 0
+        self._rebuild()
+
+    def _rebuild(self) -> None:
+        by_kid: Dict[str, Key] = {self.current.kid: self.current.verify_key}
+        for k, _ in self.previous:
+            by_kid[k.kid] = k.verify_key
+        self.by_kid = by_kid
+        self.jwks = {"keys": [self.current.public_jwk] + [k.public_jwk for k, _ in self.previous]}
+
+    def prune(self, now: Optional[float] = None) -> int:
+        now = time.time() if now is None else now
+        kept = [(k, until) for k, until in self.previous if until is None or until > now]
+        dropped = len(self.previous) - len(kept)
+        if dropped:
+            self.previous = kept
+            self._rebuild()
+        return dropped
+
+    async def rotate(self) -> str:
+        # Key generation takes tens of milliseconds, keep it off the event loop
+        pem = await asyncio.to_thread(generate_pem, self.bits)
+        fresh = SigningKey(pem)
+        self.previous.insert(0, (self.current, time.time() + self.retain_seconds))
+        self.current = fresh
+        self.rotations += 1
+        if not self.prune():
+            self._rebuild()
+        return fresh.kid
+
+    async def run_rotation(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            await self.rotate()
+
+    def stats(self) -> dict:
+        return {"current_kid": self.current.kid, "published": len(self.jwks["keys"]), "rotations": self.rotations}
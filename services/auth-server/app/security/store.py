@@ -0,0 +1,71 @@
+# python
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+
+class TTLStore:
+    """Bounded in-memory map whose entries expire after a fixed TTL.
+
+    Every entry gets the same TTL, so insertion order is expiry order: the sweeper
+    only ever looks at the front of the dict and stops at the first live entry.
+    """
+
+    def __init__(self, ttl: float, maxsize: int):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data: "OrderedDict[str, tuple[float, Any]]" = OrderedDict()
+        self.expired = 0
+        self.evicted = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def put(self, key: str, value: Any) -> None:
+        self._data.pop(key, None)
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evicted += 1
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            del self._data[key]
+            self.expired += 1
+            return None
+        return entry[1]
+
+    def pop(self, key: str) -> Optional[Any]:
+        entry = self._data.pop(key, None)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            self.expired += 1
+            return None
+        return entry[1]
+
+    def sweep(self, limit: int) -> int:
+        now = time.monotonic()
+        removed = 0
+        while removed < limit and self._data:
+            key, (expires, _) = next(iter(self._data.items()))
+            if expires > now:
+                break
+            del self._data[key]
+            removed += 1
+        self.expired += removed
+        return removed
+
+    async def run_sweeper(self, interval: float, batch: int = 1000) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            # Sweep in batches and yield in between so a burst of expiries never stalls requests
+            while self.sweep(batch) == batch:
+                await asyncio.sleep(0)
+
+    def stats(self) -> dict:
+        return {"size": len(self._data), "maxsize": self.maxsize, "expired": self.expired, "evicted": self.evicted}
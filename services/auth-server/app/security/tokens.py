@@ -0,0 +1,72 @@
+# python
+import base64
+import hashlib
+import hmac
+import time
+import uuid
+from typing import Optional
+
+from jose import JOSEError, jwt
+
+from .keys import ALGORITHM, KeyRing
+
+
+def pkce_s256(verifier: str) -> str:
+    return base64.urlsafe_b64encode(hashlib.sha256(verifier.encode("ascii")).digest()).rstrip(b"=").decode()
+
+
+def verify_pkce(verifier: str, challenge: str) -> bool:
+    # RFC 7636 4.1: 43-128 characters from the unreserved set
+    if not 43 <= len(verifier) <= 128 or not verifier.isascii():
+        return False
+    return hmac.compare_digest(pkce_s256(verifier), challenge)
+
+
+class TokenIssuer:
+    def __init__(self, keys: KeyRing, issuer: str, audience: str, access_ttl: int, id_ttl: int):
+        self.keys = keys
+        self.issuer = issuer
+        self.audience = audience
+        self.access_ttl = access_ttl
+        self.id_ttl = id_ttl
+        self.issued = 0
+
+    def issue(self, user: dict, client_id: str, scope: str, nonce: Optional[str] = None) -> dict:
+        # CPU bound (RSA signatures); callers run it on a worker thread
+        signing = self.keys.current
+        headers = {"kid": signing.kid}
+        now = int(time.time())
+        access = {
+            "iss": self.issuer, "aud": self.audience, "sub": user["sub"], "role": user["role"],
+            "scope": scope, "client_id": client_id, "iat": now, "nbf": now, "exp": now + self.access_ttl,
+            "jti": uuid.uuid4().hex,
+        }
+        body = {
+            "access_token": jwt.encode(access, signing.key, algorithm=ALGORITHM, headers=headers),
+            "token_type": "Bearer",
+            "expires_in": self.access_ttl,
+            "scope": scope,
+        }
+        if "openid" in scope.split():
+            ident = {
+                "iss": self.issuer, "aud": client_id, "sub": user["sub"], "role": user["role"],
+                "iat": now, "nbf": now, "exp": now + self.id_ttl,
+            }
+            for claim in ("name", "email"):
+                if user.get(claim):
+                    ident[claim] = user[claim]
+            if nonce:
+                ident["nonce"] = nonce
+            body["id_token"] = jwt.encode(ident, signing.key, algorithm=ALGORITHM, headers=headers)
+        self.issued += 1
+        return body
+
+    def verify_access(self, token: str) -> Optional[dict]:
+        try:
+            kid = jwt.get_unverified_header(token).get("kid")
+            key = self.keys.by_kid.get(kid)
+            if key is None:
+                return None
+            return jwt.decode(token, key, algorithms=[ALGORITHM], audience=self.audience, issuer=self.issuer)
+        except JOSEError:
+            return None
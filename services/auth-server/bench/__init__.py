@@ -0,0 +1,2 @@
+# python
+# benchmarks; run from services/auth-server, e.g. `python -m bench.token_load`
@@ -0,0 +1,157 @@
+# python
+"""Concurrent Authorization Code + PKCE logins against a local auth-server.
+
+Reports tokens issued per second and latency for a full login (POST /authorize + POST /token),
+for a returning session (GET /authorize with the session cookie + POST /token), and the raw
+cost of signing with a reused key object versus re-parsing the PEM each time.
+
+    python -m bench.token_load --logins 500 --concurrency 32
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import secrets
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+from jose import jwt
+
+from app.security.keys import ALGORITHM, SigningKey, generate_pem
+from app.security.tokens import pkce_s256
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CLIENT_ID = "bench-client"
+REDIRECT_URI = "http://127.0.0.1/callback"
+CODE = re.compile(r"[?&]code=([^&]+)")
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class Server:
+    def __init__(self, env: dict):
+        self.port = free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        self.env = {**os.environ, "AUTH_ISSUER_URL": self.url, "AUTH_CLIENT_ID": CLIENT_ID,
+                    "AUTH_REDIRECT_URI": REDIRECT_URI, "AUTH_CLIENT_SECRET": "", **env}
+
+    def __enter__(self):
+        args = [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(self.port),
+                "--log-level", "warning", "--no-access-log"]
+        self.proc = subprocess.Popen(args, cwd=SERVICE_DIR, env=self.env, stdout=subprocess.DEVNULL)
+        deadline = time.time() + 30
+        while time.time() < deadline:
+            try:
+                if httpx.get(f"{self.url}/healthz", timeout=1).status_code == 200:
+                    return self
+            except httpx.HTTPError:
+                time.sleep(0.1)
+        self.proc.kill()
+        raise RuntimeError(f"auth-server on {self.url} did not start")
+
+    def __exit__(self, *exc):
+        self.proc.terminate()
+        self.proc.wait(timeout=10)
+
+
+def summarize(latencies: list, elapsed: float) -> dict:
+    lat = sorted(latencies)
+
+    def pct(p: float) -> float:
+        return round(lat[min(len(lat) - 1, int(p * len(lat)))] * 1000, 3)
+
+    return {
+        "tokens": len(lat), "tokens_per_s": round(len(lat) / elapsed, 1),
+        "p50_ms": pct(0.50), "p95_ms": pct(0.95), "p99_ms": pct(0.99), "mean_ms": round(statistics.fmean(lat) * 1000, 3),
+    }
+
+
+def _params(challenge: str) -> dict:
+    return {
+        "response_type": "code", "client_id": CLIENT_ID, "redirect_uri": REDIRECT_URI, "scope": "openid mcp.tools",
+        "state": secrets.token_urlsafe(8), "code_challenge": challenge, "code_challenge_method": "S256",
+    }
+
+
+async def _exchange(client: httpx.AsyncClient, location: str, verifier: str) -> None:
+    code = CODE.search(location).group(1)
+    r = await client.post("/token", data={
+        "grant_type": "authorization_code", "code": code, "redirect_uri": REDIRECT_URI,
+        "client_id": CLIENT_ID, "code_verifier": verifier,
+    })
+    r.raise_for_status()
+
+
+async def full_login(client: httpx.AsyncClient) -> None:
+    verifier = secrets.token_urlsafe(48)
+    r = await client.post("/authorize", data={**_params(pkce_s256(verifier)), "username": "demo", "password": "demo"})
+    if r.status_code != 303:
+        raise RuntimeError(f"login failed: {r.status_code}")
+    await _exchange(client, r.headers["location"], verifier)
+
+
+async def session_login(client: httpx.AsyncClient, cookie: str) -> None:
+    verifier = secrets.token_urlsafe(48)
+    r = await client.get("/authorize", params=_params(pkce_s256(verifier)), cookies={"auth_session": cookie})
+    if r.status_code != 303:
+        raise RuntimeError(f"session login failed: {r.status_code}")
+    await _exchange(client, r.headers["location"], verifier)
+
+
+async def drive(call, total: int, concurrency: int) -> dict:
+    latencies = []
+    queue = iter(range(total))
+
+    async def worker():
+        for _ in queue:
+            t0 = time.perf_counter()
+            await call()
+            latencies.append(time.perf_counter() - t0)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, time.perf_counter() - start)
+
+
+def signing(rounds: int) -> dict:
+    pem = generate_pem()
+    key = SigningKey(pem)
+    claims = {"sub": "demo", "aud": "mcp-audience", "exp": int(time.time()) + 900}
+    results = {}
+    for label, material in (("reparsed_pem", pem.decode()), ("reused_key", key.key)):
+        start = time.perf_counter()
+        for _ in range(rounds):
+            jwt.encode(claims, material, algorithm=ALGORITHM, headers={"kid": key.kid})
+        elapsed = time.perf_counter() - start
+        results[label] = {"signatures": rounds, "per_s": round(rounds / elapsed), "us_each": round(elapsed / rounds * 1e6, 1)}
+    return results
+
+
+async def main(args) -> dict:
+    result = {"logins": args.logins, "concurrency": args.concurrency, "signing": signing(args.signatures)}
+    with Server({}) as server:
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=server.url, limits=limits, timeout=30) as client:
+            await drive(lambda: full_login(client), min(args.logins, 20), 4)
+            result["full_login"] = await drive(lambda: full_login(client), args.logins, args.concurrency)
+            r = await client.post("/authorize", data={**_params(pkce_s256("x" * 43)), "username": "demo", "password": "demo"})
+            cookie = r.cookies["auth_session"]
+            result["session_login"] = await drive(lambda: session_login(client, cookie), args.logins, args.concurrency)
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logins", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--signatures", type=int, default=50)
+    print(json.dumps(asyncio.run(main(parser.parse_args())), indent=2))
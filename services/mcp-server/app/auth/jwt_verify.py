@@ -0,0 +1,145 @@
+# python
+import asyncio
+import hashlib
+import re
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+import httpx
+from fastapi import HTTPException
+from jose import jwk, jwt
+from jose.exceptions import JOSEError
+
+_MAX_AGE = re.compile(r"max-age=(\d+)")
+
+
+def _unauthorized(detail: str) -> HTTPException:
+    return HTTPException(status_code=401, detail=detail, headers={"WWW-Authenticate": "Bearer"})
+
+
+class JWKSCache:
+    """In-memory JWKS with parsed key objects.
+
+    Honours Cache-Control max-age, is refreshed ahead of expiry by a background task,
+    and refetches (rate limited) when a token names an unknown kid.
+    """
+
+    def __init__(self, jwks_url: str, client: httpx.AsyncClient, default_ttl: float = 300.0, min_refetch_interval: float = 10.0):
+        self.jwks_url = jwks_url
+        self.client = client
+        self.default_ttl = default_ttl
+        self.min_refetch_interval = min_refetch_interval
+        self.keys: dict[str, jwk.Key] = {}
+        self.expires_at = 0.0
+        self.fetched_at = 0.0
+        self.fetches = 0
+        self._refreshing: Optional[asyncio.Task] = None
+
+    async def refresh(self) -> None:
+        # Single-flight: concurrent callers share one fetch
+        if self._refreshing is None or self._refreshing.done():
+            self._refreshing = asyncio.ensure_future(self._fetch())
+        await asyncio.shield(self._refreshing)
+
+    async def _fetch(self) -> None:
+        self.fetched_at = time.monotonic()
+        self.fetches += 1
+        resp = await self.client.get(self.jwks_url)
+        resp.raise_for_status()
+        keys = {}
+        for data in resp.json().get("keys", []):
+            if data.get("kty") != "RSA" or data.get("use", "sig") != "sig":
+                continue
+            try:
+                keys[data.get("kid", "")] = jwk.construct(data, data.get("alg", "RS256"))
+            except JOSEError:
+                continue
+        m = _MAX_AGE.search(resp.headers.get("cache-control", ""))
+        ttl = float(m.group(1)) if m else self.default_ttl
+        self.keys = keys
+        self.expires_at = time.monotonic() + ttl
+
+    async def get_key(self, kid: str) -> Optional[jwk.Key]:
+        now = time.monotonic()
+        if now >= self.expires_at:
+            await self.refresh()
+        key = self.keys.get(kid)
+        if key is None and time.monotonic() - self.fetched_at >= self.min_refetch_interval:
+            # Possibly a freshly rotated signing key
+            await self.refresh()
+            key = self.keys.get(kid)
+        return key
+
+    async def run_refresher(self, margin: float = 0.2) -> None:
+        # Refresh at (1 - margin) of the TTL so requests never wait on a fetch
+        while True:
+            delay = max(1.0, (self.expires_at - time.monotonic()) * (1 - margin))
+            await asyncio.sleep(delay)
+            try:
+                await self.refresh()
+            except (httpx.HTTPError, ValueError):
+                await asyncio.sleep(min(self.min_refetch_interval, 5.0))
+
+
+class TokenVerifier:
+    """RS256 access-token verification with a bounded LRU of already verified tokens.
+
+    Cache entries expire at the token's exp (or sooner, after max_cache_ttl) and are
+    dropped if their signing key disappears from the JWKS.
+    """
+
+    def __init__(self, jwks: JWKSCache, issuer: str, audience: str, cache_size: int = 10000, max_cache_ttl: float = 300.0, leeway: int = 0):
+        self.jwks = jwks
+        self.issuer = issuer
+        self.audience = audience
+        self.cache_size = cache_size
+        self.max_cache_ttl = max_cache_ttl
+        self.leeway = leeway
+        self._verified: "OrderedDict[bytes, Tuple[float, str, dict]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    async def verify(self, token: str) -> dict:
+        digest = hashlib.sha256(token.encode()).digest()
+        entry = self._verified.get(digest)
+        if entry is not None:
+            valid_until, kid, claims = entry
+            if time.time() < valid_until and kid in self.jwks.keys:
+                self._verified.move_to_end(digest)
+                self.hits += 1
+                return claims
+            del self._verified[digest]
+        self.misses += 1
+        try:
+            header = jwt.get_unverified_header(token)
+        except JOSEError:
+            raise _unauthorized("Malformed token") from None
+        if header.get("alg") != "RS256":
+            raise _unauthorized("Unsupported token algorithm")
+        kid = header.get("kid", "")
+        try:
+            key = await self.jwks.get_key(kid)
+        except (httpx.HTTPError, ValueError):
+            raise HTTPException(status_code=503, detail="Unable to fetch signing keys") from None
+        if key is None:
+            raise _unauthorized("Unknown signing key")
+        try:
+            claims = jwt.decode(
+                token, key, algorithms=["RS256"], audience=self.audience, issuer=self.issuer,
+                options={"require_exp": True, "leeway": self.leeway},
+            )
+        except JOSEError as exc:
+            raise _unauthorized(f"Invalid token: {exc}") from None
+        sub = claims.get("sub")
+        if not isinstance(sub, str) or not sub:
+            # Authorization compares sub with file owners; a token without one identifies nobody
+            raise _unauthorized("Token has no subject")
+        if self.cache_size > 0:
+            self._verified[digest] = (min(float(claims["exp"]), time.time() + self.max_cache_ttl), kid, claims)
+            while len(self._verified) > self.cache_size:
+                self._verified.popitem(last=False)
+        return claims
+
+    def stats(self) -> dict:
+        return {"cached": len(self._verified), "hits": self.hits, "misses": self.misses, "jwks_keys": len(self.jwks.keys), "jwks_fetches": self.jwks.fetches}
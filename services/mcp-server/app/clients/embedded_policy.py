@@ -0,0 +1,146 @@
+# python
+import glob
+import json
+import os
+import re
+from typing import Any, Callable, Tuple
+
+# Compiles the small subset of Rego used by services/opa/policies/mcp/authz.rego
+# (default rule, equality, startswith) into Python predicates, so decisions can be
+# made in-process instead of over HTTP to the OPA sidecar.
+
+Predicate = Callable[[dict], bool]
+_UNDEFINED = object()
+
+_PACKAGE = re.compile(r"^package\s+([\w.]+)$")
+_DEFAULT = re.compile(r"^default\s+(\w+)\s*(?:=|:=)\s*(true|false)$")
+_RULE_OPEN = re.compile(r"^(\w+)\s*(?:if\s*)?\{$")
+_EQ = re.compile(r"^(.+?)\s*(==|!=)\s*(.+)$")
+_STARTSWITH = re.compile(r"^startswith\(\s*(.+?)\s*,\s*(.+?)\s*\)$")
+_REF = re.compile(r"^input(?:\.\w+)+$")
+# A '#' starts a comment only when it is outside a string literal
+_COMMENT = re.compile(r'#(?=(?:[^"]*"[^"]*")*[^"]*$).*')
+
+
+class PolicyCompileError(ValueError):
+    pass
+
+
+def _operand(token: str, where: str) -> Callable[[dict], Any]:
+    token = token.strip()
+    if _REF.match(token):
+        path = tuple(token.split(".")[1:])
+
+        def lookup(inp: dict):
+            value: Any = inp
+            for part in path:
+                if not isinstance(value, dict) or part not in value:
+                    return _UNDEFINED
+                value = value[part]
+            return value
+
+        return lookup
+    try:
+        literal = json.loads(token)
+    except ValueError:
+        raise PolicyCompileError(f"{where}: unsupported operand {token!r}") from None
+    return lambda _inp: literal
+
+
+def _compile_expr(expr: str, where: str) -> Predicate:
+    m = _STARTSWITH.match(expr)
+    if m:
+        subject, prefix = _operand(m.group(1), where), _operand(m.group(2), where)
+
+        def starts(inp: dict) -> bool:
+            s, p = subject(inp), prefix(inp)
+            return isinstance(s, str) and isinstance(p, str) and s.startswith(p)
+
+        return starts
+    m = _EQ.match(expr)
+    if m:
+        left, op, right = _operand(m.group(1), where), m.group(2), _operand(m.group(3), where)
+        negate = op == "!="
+
+        def compare(inp: dict) -> bool:
+            a, b = left(inp), right(inp)
+            # Undefined operands make the expression (and the rule body) undefined in Rego
+            if a is _UNDEFINED or b is _UNDEFINED:
+                return False
+            return (a != b) if negate else (a == b)
+
+        return compare
+    raise PolicyCompileError(f"{where}: unsupported expression {expr!r}")
+
+
+class EmbeddedPolicy:
+    def __init__(self, package: str, rule: str = "allow"):
+        self.package = package
+        self.rule = rule
+        self.default = False
+        self.bodies: list[Tuple[Predicate, ...]] = []
+
+    def load(self, source: str, name: str = "<policy>") -> None:
+        package, block, block_line = None, None, 0
+        for lineno, raw in enumerate(source.splitlines(), 1):
+            line = _COMMENT.sub("", raw).strip()
+            if not line:
+                continue
+            where = f"{name}:{lineno}"
+            if block is not None:
+                if line == "}":
+                    if not block:
+                        raise PolicyCompileError(f"{name}:{block_line}: empty rule body")
+                    # Cheap equality checks first, prefix checks last
+                    block.sort(key=lambda p: p[0])
+                    self.bodies.append(tuple(p for _, p in block))
+                    block = None
+                else:
+                    block.append((1 if line.startswith("startswith") else 0, _compile_expr(line, where)))
+                continue
+            m = _PACKAGE.match(line)
+            if m:
+                package = m.group(1)
+                continue
+            if package != self.package:
+                raise PolicyCompileError(f"{where}: expected package {self.package}, got {package}")
+            m = _DEFAULT.match(line)
+            if m and m.group(1) == self.rule:
+                self.default = m.group(2) == "true"
+                continue
+            m = _RULE_OPEN.match(line)
+            if m and m.group(1) == self.rule:
+                block, block_line = [], lineno
+                continue
+            raise PolicyCompileError(f"{where}: unsupported statement {line!r}")
+        if block is not None:
+            raise PolicyCompileError(f"{name}:{block_line}: unterminated rule body")
+
+    def decide(self, inp: dict) -> bool:
+        for body in self.bodies:
+            for pred in body:
+                if not pred(inp):
+                    break
+            else:
+                return True
+        return self.default
+
+    async def evaluate(self, subject: dict, action: str, resource: dict) -> Tuple[bool, Any]:
+        # Same shape as opa_policy_eval.evaluate so callers can switch engines freely
+        allowed = self.decide({"subject": subject, "action": action, "resource": resource})
+        return allowed, {"result": allowed, "rights": None}
+
+
+def load_policy_dir(policy_dir: str, package: str = "mcp.authz", rule: str = "allow") -> EmbeddedPolicy:
+    policy = EmbeddedPolicy(package, rule)
+    files = sorted(glob.glob(os.path.join(policy_dir, "**", "*.rego"), recursive=True))
+    for path in files:
+        with open(path) as f:
+            source = f.read()
+        # Other packages in the bundle are not ours to evaluate
+        m = re.search(r"^package\s+([\w.]+)\s*$", source, re.M)
+        if m and m.group(1) == package:
+            policy.load(source, path)
+    if not policy.bodies:
+        raise PolicyCompileError(f"No rules for {package}.{rule} found under {policy_dir}")
+    return policy
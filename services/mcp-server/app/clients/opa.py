@@ -0,0 +1,39 @@
+# python
+import os
+import httpx
+
+OPA_MAX_CONNECTIONS = int(os.environ.get("OPA_MAX_CONNECTIONS", "100"))
+OPA_MAX_KEEPALIVE = int(os.environ.get("OPA_MAX_KEEPALIVE", "20"))
+OPA_KEEPALIVE_EXPIRY = float(os.environ.get("OPA_KEEPALIVE_EXPIRY", "30"))
+OPA_POOL_TIMEOUT = float(os.environ.get("OPA_POOL_TIMEOUT", "2.0"))
+# "auto" enables HTTP/2 only when the optional h2 package is installed
+OPA_HTTP2 = os.environ.get("OPA_HTTP2", "auto").lower()
+
+
+def _http2_enabled() -> bool:
+    if OPA_HTTP2 in ("0", "false", "no", "off"):
+        return False
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def create_opa_client(
+    max_connections: int = OPA_MAX_CONNECTIONS,
+    max_keepalive: int = OPA_MAX_KEEPALIVE,
+    keepalive_expiry: float = OPA_KEEPALIVE_EXPIRY,
+    timeout: float = 2.0,
+) -> httpx.AsyncClient:
+    # One pooled client per app lifetime; per-call timeouts are still passed by evaluate()
+    limits = httpx.Limits(
+        max_connections=max_connections,
+        max_keepalive_connections=max_keepalive,
+        keepalive_expiry=keepalive_expiry,
+    )
+    return httpx.AsyncClient(
+        timeout=httpx.Timeout(timeout, pool=OPA_POOL_TIMEOUT),
+        limits=limits,
+        http2=_http2_enabled(),
+    )
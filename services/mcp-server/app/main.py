@@ -1,110 +1,631 @@
 # python
-from fastapi import FastAPI, Depends, HTTPException, Header, status, UploadFile, File
-from fastapi.responses import JSONResponse
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Depends, HTTPException, Header, Request, status, WebSocket
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+import asyncio
 import httpx
+import json
+import logging
+import math
 import os
+import time
 
-from .mcp.tools.excel_csv_reader import read_csv
-from .mcp.tools.opa_policy_eval import evaluate as opa_evaluate
+from .auth.jwt_verify import JWKSCache, TokenVerifier
+from .clients.embedded_policy import load_policy_dir
+from .clients.opa import create_opa_client
+from .mcp import schemas
+from .mcp.protocol import McpServer, Tool, text_result
+from .mcp.tools.excel_csv_reader import FORMATS, detect_format, iter_ndjson, iter_row_batches, read_result, summarize_table, table_schema
+from .mcp.tools.opa_policy_eval import evaluate as opa_evaluate, evaluate_batch
+from .utils.catalog import CATALOG_EXTENSIONS, FileCatalog
+from .utils.decision_cache import DecisionCache, decision_key
+from .utils.file_cache import ParsedFileCache, stat_signature
+from .utils import metrics
+from .utils.logs import RequestContextMiddleware, configure_logging, get_logger, log_event
+from .utils.metrics import OPA_STALE_DECISIONS, MetricsMiddleware, observe_stage
+from .utils.resilience import CircuitBreaker, RetryBudget
+from .utils.shared_state import SharedStateUnavailable, create_shared_state
+from .utils.uploads import MultipartFile, UploadSizeLimit, UploadStore
+from .utils.workers import BoundedExecutor
 
 AUTH_ISSUER_URL = os.environ.get("AUTH_ISSUER_URL", "http://auth-server:8000")
 OPA_URL = os.environ.get("OPA_URL", "http://opa:8181")
 JWT_AUDIENCE = os.environ.get("JWT_AUDIENCE", "mcp-audience")
-DATA_DIR = os.environ.get("DATA_DIR", "/data")
+JWT_ISSUER = os.environ.get("JWT_ISSUER", AUTH_ISSUER_URL)
+JWKS_URL = os.environ.get("JWKS_URL", f"{AUTH_ISSUER_URL}/jwks")
+JWKS_DEFAULT_TTL = float(os.environ.get("JWKS_DEFAULT_TTL", "300"))
+JWT_LEEWAY = int(os.environ.get("JWT_LEEWAY", "30"))
+VERIFIED_TOKEN_CACHE_SIZE = int(os.environ.get("VERIFIED_TOKEN_CACHE_SIZE", "10000"))
+# Keep the static admin-key/demo-key bearer strings working until the UI does the OAuth flow
+AUTH_DEV_TOKENS = os.environ.get("AUTH_DEV_TOKENS", "true").lower() in ("1", "true", "yes")
+DEV_TOKENS = {"admin-key": ("admin-subject", "admin"), "demo-key": ("demo", "user")}
+DATA_DIR = os.path.normpath(os.environ.get("DATA_DIR", "/data"))
+# Owner, hash, columns and row count of every table under DATA_DIR (SQLite, shared by workers)
+CATALOG_PATH = os.environ.get("CATALOG_PATH", os.path.join(DATA_DIR, ".catalog.sqlite"))
+CATALOG_SCAN_ON_START = os.environ.get("CATALOG_SCAN_ON_START", "true").lower() in ("1", "true", "yes")
+LIST_FILES_MAX_LIMIT = int(os.environ.get("LIST_FILES_MAX_LIMIT", "500"))
+# "opa" queries the sidecar over HTTP; "embedded" evaluates POLICY_DIR in-process
+POLICY_ENGINE = os.environ.get("POLICY_ENGINE", "opa").lower()
+POLICY_DIR = os.environ.get("POLICY_DIR", "/policies")
+FILE_CACHE_MAX_BYTES = int(os.environ.get("FILE_CACHE_MAX_BYTES", str(128 * 1024 * 1024)))
+# Files up to this size are parsed to the end once so any later page is a cache hit
+FILE_CACHE_FULL_PARSE_BYTES = int(os.environ.get("FILE_CACHE_FULL_PARSE_BYTES", str(8 * 1024 * 1024)))
+# Blocking parse/disk work runs here; 0 workers keeps it on the event loop
+FILE_IO_WORKERS = int(os.environ.get("FILE_IO_WORKERS", "4"))
+FILE_IO_MAX_PENDING = int(os.environ.get("FILE_IO_MAX_PENDING", "32"))
+UPLOAD_MAX_BYTES = int(os.environ.get("UPLOAD_MAX_BYTES", str(32 * 1024 * 1024)))
+UPLOAD_CHUNK_BYTES = int(os.environ.get("UPLOAD_CHUNK_BYTES", str(1024 * 1024)))
+OPA_BATCH_CONCURRENCY = int(os.environ.get("OPA_BATCH_CONCURRENCY", "8"))
+OPA_BATCH_MAX_ITEMS = int(os.environ.get("OPA_BATCH_MAX_ITEMS", "500"))
+DECISION_CACHE_SIZE = int(os.environ.get("DECISION_CACHE_SIZE", "10000"))
+DECISION_CACHE_ALLOW_TTL = float(os.environ.get("DECISION_CACHE_ALLOW_TTL", "30"))
+DECISION_CACHE_DENY_TTL = float(os.environ.get("DECISION_CACHE_DENY_TTL", "5"))
+# How long past its TTL a decision may still be served when OPA_FAIL_MODE=stale
+DECISION_CACHE_STALE_TTL = float(os.environ.get("DECISION_CACHE_STALE_TTL", "300"))
+OPA_RETRIES = int(os.environ.get("OPA_RETRIES", "3"))
+OPA_TIMEOUT = float(os.environ.get("OPA_TIMEOUT", "2.0"))
+# Total time one request may spend on OPA; X-Request-Timeout-Ms can only lower it
+OPA_REQUEST_BUDGET = float(os.environ.get("OPA_REQUEST_BUDGET", "2.5"))
+OPA_BACKOFF_BASE = float(os.environ.get("OPA_BACKOFF_BASE", "0.05"))
+OPA_BACKOFF_MAX = float(os.environ.get("OPA_BACKOFF_MAX", "0.5"))
+OPA_BREAKER_FAILURES = int(os.environ.get("OPA_BREAKER_FAILURES", "5"))
+OPA_BREAKER_RECOVERY = float(os.environ.get("OPA_BREAKER_RECOVERY", "5"))
+OPA_BREAKER_HALF_OPEN_PROBES = int(os.environ.get("OPA_BREAKER_HALF_OPEN_PROBES", "1"))
+OPA_RETRY_BUDGET_RATIO = float(os.environ.get("OPA_RETRY_BUDGET_RATIO", "0.2"))
+OPA_RETRY_BUDGET_MIN_PER_SEC = float(os.environ.get("OPA_RETRY_BUDGET_MIN_PER_SEC", "1"))
+# fail_fast: 503 while OPA is unavailable; stale: answer from the last known decision if there is one
+OPA_FAIL_MODE = os.environ.get("OPA_FAIL_MODE", "fail_fast").lower()
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+EVENT_LOOP_LAG_INTERVAL = float(os.environ.get("EVENT_LOOP_LAG_INTERVAL", "0.5"))
+# /mcp JSON-RPC sessions; calls beyond the per-session limit are rejected, not queued
+MCP_SESSION_MAX_IN_FLIGHT = int(os.environ.get("MCP_SESSION_MAX_IN_FLIGHT", "16"))
+MCP_MAX_SESSIONS = int(os.environ.get("MCP_MAX_SESSIONS", "1000"))
+MCP_SESSION_IDLE_TTL = float(os.environ.get("MCP_SESSION_IDLE_TTL", "900"))
+# State every worker must agree on (/mcp sessions, upload metadata, decision cache tier,
+# invalidations). memory:// is per process and only correct with WEB_CONCURRENCY=1.
+SHARED_STATE_URL = os.environ.get("SHARED_STATE_URL", "memory://")
+SHARED_STATE_PREFIX = os.environ.get("SHARED_STATE_PREFIX", "mcp:")
+SHARED_STATE_TIMEOUT = float(os.environ.get("SHARED_STATE_TIMEOUT", "0.25"))
+WEB_CONCURRENCY = int(os.environ.get("WEB_CONCURRENCY", "1"))
 
-app = FastAPI(title="MCP Server (DEV)")
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO")
+# Fraction of successful requests that are logged; denials and errors are always logged
+LOG_SAMPLE_RATE = float(os.environ.get("LOG_SAMPLE_RATE", "1.0"))
+LOG_QUEUE_SIZE = int(os.environ.get("LOG_QUEUE_SIZE", "10000"))
 
+metrics.configure(METRICS_ENABLED)
+log_listener = configure_logging(LOG_LEVEL, LOG_SAMPLE_RATE, LOG_QUEUE_SIZE)
+log = get_logger("tools")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    log_listener.start()
+    # Shared keep-alive pool to the OPA sidecar for the whole app lifetime
+    app.state.opa_client = create_opa_client()
+    app.state.auth_client = httpx.AsyncClient(timeout=5)
+    jwks = JWKSCache(JWKS_URL, app.state.auth_client, default_ttl=JWKS_DEFAULT_TTL)
+    app.state.token_verifier = TokenVerifier(jwks, JWT_ISSUER, JWT_AUDIENCE, VERIFIED_TOKEN_CACHE_SIZE, leeway=JWT_LEEWAY)
+    jwks_refresher = asyncio.create_task(jwks.run_refresher())
+    shared = app.state.shared = create_shared_state(SHARED_STATE_URL, SHARED_STATE_PREFIX, SHARED_STATE_TIMEOUT)
+    if WEB_CONCURRENCY > 1 and not shared.distributed:
+        log_event(log, "shared_state.per_process", logging.WARNING, workers=WEB_CONCURRENCY, backend=shared.backend)
+    app.state.decision_cache = DecisionCache(
+        DECISION_CACHE_SIZE, DECISION_CACHE_ALLOW_TTL, DECISION_CACHE_DENY_TTL,
+        stale_ttl=DECISION_CACHE_STALE_TTL if OPA_FAIL_MODE == "stale" else 0.0, shared=shared,
+    )
+    await app.state.decision_cache.sync_generation()
+    app.state.opa_breaker = CircuitBreaker(OPA_BREAKER_FAILURES, OPA_BREAKER_RECOVERY, OPA_BREAKER_HALF_OPEN_PROBES)
+    app.state.opa_retry_budget = RetryBudget(OPA_RETRY_BUDGET_RATIO, OPA_RETRY_BUDGET_MIN_PER_SEC)
+    app.state.file_cache = ParsedFileCache(FILE_CACHE_MAX_BYTES)
+    app.state.embedded_policy = load_policy_dir(POLICY_DIR) if POLICY_ENGINE == "embedded" else None
+    app.state.file_workers = BoundedExecutor(FILE_IO_WORKERS, FILE_IO_MAX_PENDING)
+    app.state.uploads = UploadStore(UPLOAD_MAX_BYTES, UPLOAD_CHUNK_BYTES)
+    app.state.catalog = FileCatalog(CATALOG_PATH, DATA_DIR, table_schema)
+    # Off the request worker pool: a first scan parses every file once
+    catalog_scan = asyncio.create_task(scan_catalog(app.state.catalog)) if CATALOG_SCAN_ON_START else None
+    app.state.mcp = McpServer(
+        MCP_TOOLS, lambda authorization: authenticate(app.state, authorization),
+        max_in_flight=MCP_SESSION_MAX_IN_FLIGHT, max_sessions=MCP_MAX_SESSIONS, idle_ttl=MCP_SESSION_IDLE_TTL,
+        server_info={"name": "mcp-server", "version": app.version}, shared=shared,
+    )
+    subscribe_invalidations(app.state)
+    await shared.start()
+    lag_monitor = asyncio.create_task(metrics.monitor_event_loop(EVENT_LOOP_LAG_INTERVAL)) if METRICS_ENABLED else None
+    try:
+        yield
+    finally:
+        jwks_refresher.cancel()
+        if catalog_scan is not None:
+            catalog_scan.cancel()
+        app.state.mcp.shutdown()
+        await shared.close()
+        if lag_monitor is not None:
+            lag_monitor.cancel()
+        await app.state.auth_client.aclose()
+        await app.state.opa_client.aclose()
+        app.state.file_workers.shutdown()
+        app.state.catalog.close()
+        # Flushes whatever is still queued
+        log_listener.stop()
+
+app = FastAPI(title="MCP Server (DEV)", lifespan=lifespan)
+app.add_middleware(UploadSizeLimit, path="/mcp/upload", max_bytes=UPLOAD_MAX_BYTES)
+if METRICS_ENABLED:
+    # Added last so it wraps everything, including uploads rejected by UploadSizeLimit
+    app.add_middleware(MetricsMiddleware)
+app.add_middleware(RequestContextMiddleware)
+
+DATA_REALPATH = os.path.realpath(DATA_DIR)
 UPLOADS_DIR = os.path.join(DATA_DIR, "uploads")
 os.makedirs(UPLOADS_DIR, exist_ok=True)
 
-async def verify_bearer_token(authorization: str | None = Header(default=None)):
+def subscribe_invalidations(state):
+    # Broadcast by whichever worker saw the change; also applied by that worker itself
+    async def policies_reloaded(fields):
+        if state.embedded_policy is not None:
+            state.embedded_policy = await asyncio.to_thread(load_policy_dir, POLICY_DIR)
+        state.decision_cache.invalidate(fields.get("generation"))
+
+    async def resync(fields):
+        # Events may have been missed while the subscriber was reconnecting
+        await state.decision_cache.sync_generation()
+        state.decision_cache.invalidate()
+
+    async def file_changed(fields):
+        state.file_cache.invalidate(fields["path"])
+        # The catalog row was already written to SQLite by the worker that saw the change
+        state.catalog.reload(fields["rel"])
+
+    state.shared.subscribe("policies.reload", policies_reloaded)
+    state.shared.subscribe("resync", resync)
+    state.shared.subscribe("file.changed", file_changed)
+
+async def scan_catalog(catalog):
+    try:
+        result = await asyncio.to_thread(catalog.scan)
+        log_event(log, "catalog.scan", **result)
+    except Exception:
+        log.exception("catalog.scan_failed")
+
+async def authenticate(state, authorization: str | None):
+    # Returns the subject and the token's expiry (epoch seconds); /mcp sessions end there
     if not authorization or not authorization.lower().startswith("bearer "):
         raise HTTPException(status_code=401, detail="Missing bearer token")
-    token = authorization.split(" ", 1)[1]
-    role = "user"
-    sub = "" # Initialize sub
-    if token == "admin-key":
-        role = "admin"
-        sub = "admin-subject"
-    elif token == "demo-key":
-        role = "user"
-        sub = "demo" # Set sub to "demo" for demo-key to match streamlit's owner logic
+    token = authorization.split(" ", 1)[1].strip()
+    if AUTH_DEV_TOKENS and token in DEV_TOKENS:
+        # demo-key maps to sub "demo" to match streamlit's owner logic
+        sub, role = DEV_TOKENS[token]
+        return {"sub": sub, "role": role, "token": token}, math.inf
+    started = time.perf_counter()
+    claims = await state.token_verifier.verify(token)
+    observe_stage("token_verify", started)
+    return {"sub": claims["sub"], "role": claims.get("role", "user"), "token": token}, float(claims["exp"])
+
+async def verify_bearer_token(request: Request, authorization: str | None = Header(default=None)):
+    subject, _ = await authenticate(request.app.state, authorization)
+    return subject
+
+def request_deadline(request: Request) -> float:
+    # One deadline per request, shared by every authorization it makes (e.g. a batch)
+    deadline = getattr(request.state, "opa_deadline", None)
+    if deadline is None:
+        budget = OPA_REQUEST_BUDGET
+        try:
+            budget = min(budget, int(request.headers.get("x-request-timeout-ms", "")) / 1000)
+        except ValueError:
+            pass
+        deadline = request.state.opa_deadline = time.monotonic() + max(0.0, budget)
+    return deadline
+
+async def authorize(state, subject: dict, action: str, resource: dict, deadline: float):
+    started = time.perf_counter()
+    if state.embedded_policy is not None:
+        # Local evaluation is cheaper than a cache lookup, so it bypasses the decision cache
+        decision = await state.embedded_policy.evaluate(subject, action, resource)
     else:
-        sub = f"{role}-subject" # Default for other roles/tokens
-    # TODO: replace with real JWT validation later
-    return {"sub": sub, "role": role, "token": token}
-
-async def opa_allow(subject: dict, action: str, resource: dict):
-    async with httpx.AsyncClient(timeout=5) as client:
-        resp = await client.post(
-            f"{OPA_URL}/v1/data/mcp/authz/allow",
-            json={"input": {"subject": subject, "action": action, "resource": resource}},
+        key = decision_key(subject, action, resource)
+        decision = await state.decision_cache.get_or_load(
+            key,
+            lambda: opa_evaluate(
+                OPA_URL, subject, action, resource, OPA_RETRIES, OPA_TIMEOUT, client=state.opa_client,
+                breaker=state.opa_breaker, budget=state.opa_retry_budget, deadline=deadline,
+                backoff_base=OPA_BACKOFF_BASE, backoff_max=OPA_BACKOFF_MAX,
+            ),
         )
-    if resp.status_code != 200:
-        return False, {"reason": f"OPA error {resp.status_code}"}
-    data = resp.json()
-    allowed = data.get("result") is True or data.get("result", {}).get("allow") is True
-    return allowed, data
+        if OPA_FAIL_MODE == "stale" and opa_unavailable(*decision):
+            stale = state.decision_cache.get_stale(key)
+            if stale is not None:
+                OPA_STALE_DECISIONS.inc()
+                log_event(log, "authz.stale", logging.WARNING, action=action, path=resource.get("path") if isinstance(resource, dict) else None,
+                          reason=decision[1].get("reason"))
+                decision = (stale[0], {**stale[1], "stale": True})
+    observe_stage("policy", started)
+    allowed, details = decision
+    if allowed:
+        log_event(log, "authz.allow", sampled=True, sub=subject.get("sub"), role=subject.get("role"), action=action,
+                  path=resource.get("path") if isinstance(resource, dict) else None)
+    else:
+        log_event(log, "authz.deny", logging.WARNING, sub=subject.get("sub"), role=subject.get("role"), action=action, resource=resource, details=details)
+    return decision
+
+def extract_rights(details):
+    if not isinstance(details, dict):
+        return None
+    result = details.get("result")
+    return details.get("rights") or (result if isinstance(result, dict) else {}).get("rights")
+
+def opa_unavailable(allowed: bool, details) -> bool:
+    return not allowed and isinstance(details, dict) and str(details.get("reason", "")).startswith("OPA unreachable")
+
+def require_admin(subject=Depends(verify_bearer_token)):
+    if subject.get("role") != "admin":
+        raise HTTPException(status_code=403, detail="Admin role required")
+    return subject
 
 @app.get("/healthz")
 async def health():
     return JSONResponse({"status": "ok"})
 
-@app.post("/mcp/tools/excel_csv_reader")
-async def excel_csv_reader(payload: dict, subject=Depends(verify_bearer_token)):
-    print(f"excel_csv_reader: Received request with payload: {payload} and subject: {subject}")
-    source = payload.get("source")
-    if not source:
+@app.get("/metrics")
+async def metrics_endpoint():
+    # Unauthenticated like /healthz; meant for a scraper on the internal network
+    if not METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return PlainTextResponse(metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
+
+@app.post("/admin/policies/reload")
+async def reload_policies(request: Request, subject=Depends(require_admin)):
+    # Invalidation hook: call after OPA picks up new policies so stale decisions are dropped
+    # on every worker. The new generation also retires the shared decision tier.
+    shared = request.app.state.shared
+    try:
+        generation = await shared.incr("policy_generation")
+    except SharedStateUnavailable as exc:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(exc))
+    broadcast = await shared.publish("policies.reload", generation=generation)
+    return {"status": "ok", "generation": generation, "broadcast": broadcast, "decision_cache": request.app.state.decision_cache.stats()}
+
+@app.get("/admin/decision-cache")
+async def decision_cache_stats(request: Request, subject=Depends(require_admin)):
+    return request.app.state.decision_cache.stats()
+
+@app.get("/admin/shared-state")
+async def shared_state_stats(request: Request, subject=Depends(require_admin)):
+    return {**request.app.state.shared.stats(), "worker_id": request.app.state.shared.worker_id, "pid": os.getpid()}
+
+@app.get("/admin/catalog")
+async def catalog_stats(request: Request, subject=Depends(require_admin)):
+    return request.app.state.catalog.stats()
+
+@app.post("/admin/catalog/scan")
+async def catalog_rescan(request: Request, subject=Depends(require_admin)):
+    # For files copied into DATA_DIR behind the server's back
+    return await asyncio.to_thread(request.app.state.catalog.scan)
+
+@app.get("/admin/opa-circuit")
+async def opa_circuit_stats(request: Request, subject=Depends(require_admin)):
+    return {"breaker": request.app.state.opa_breaker.stats(), "retry_budget": request.app.state.opa_retry_budget.stats(), "fail_mode": OPA_FAIL_MODE}
+
+@app.get("/admin/mcp-sessions")
+async def mcp_session_stats(request: Request, subject=Depends(require_admin)):
+    return request.app.state.mcp.stats()
+
+@app.get("/admin/token-cache")
+async def token_cache_stats(request: Request, subject=Depends(require_admin)):
+    return request.app.state.token_verifier.stats()
+
+@app.get("/admin/file-cache")
+async def file_cache_stats(request: Request, subject=Depends(require_admin)):
+    return {**request.app.state.file_cache.stats(), "workers": request.app.state.file_workers.stats()}
+
+def _serialize(result):
+    started = time.perf_counter()
+    response = JSONResponse(result)
+    observe_stage("serialize", started)
+    return response
+
+def _encode(result):
+    # Same encoding as JSONResponse, as text for an MCP content block
+    started = time.perf_counter()
+    text = json.dumps(result, ensure_ascii=False, separators=(",", ":"))
+    observe_stage("serialize", started)
+    return text
+
+def _render_read(render, plan, cache):
+    # Parse, shape and JSON-encode in one worker hop, off the event loop
+    return render(read_result(
+        plan["path"], plan["max_rows"], plan["offset"], plan["fmt"], plan["infer_types"], plan["rights"], cache,
+        FILE_CACHE_FULL_PARSE_BYTES, **plan["table_opts"],
+    ))
+
+def _render_metadata(render, plan, catalog):
+    # Answered from the catalog; the file is only parsed if it changed since it was indexed
+    entry = catalog.fresh(plan["rel"])
+    if entry is None:
+        raise HTTPException(status_code=400, detail=f"File not found: {plan['rel']}")
+    return render({"rights": plan["rights"], "file": file_info(entry)})
+
+def _render_summary(render, plan):
+    started = time.perf_counter()
+    summary = summarize_table(plan["path"], **plan["table_opts"])
+    observe_stage("file_parse", started)
+    return render({"rights": plan["rights"], "summary": summary})
+
+async def _primed(chunks):
+    # Pull the first chunk before the response starts so bad input (unknown sheet or
+    # column, unreadable file) becomes a proper HTTP error instead of a broken stream
+    first = await chunks.__anext__()
+
+    async def body():
+        yield first
+        async for chunk in chunks:
+            yield chunk
+
+    return body()
+
+def int_arg(payload: dict, name: str, default: int, minimum: int = 0) -> int:
+    # Whole numbers only (5, 5.0 or "5"); anything else is the caller's mistake, not a 500
+    value = payload.get(name, default)
+    try:
+        if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+            raise ValueError
+        value = int(value)
+    except (TypeError, ValueError, OverflowError):
+        raise HTTPException(status_code=400, detail=f"'{name}' must be an integer")
+    if value < minimum:
+        raise HTTPException(status_code=400, detail=f"'{name}' must be >= {minimum}")
+    return value
+
+def resolve_source(source) -> tuple:
+    # Absolute and DATA_DIR-relative path; '..' or a symlink must not lead outside DATA_DIR
+    if not source or not isinstance(source, str):
         raise HTTPException(status_code=400, detail="Missing 'source' path relative to DATA_DIR")
-    max_rows = int(payload.get("max_rows", 1000))
-    owner = payload.get("owner", "")
-    resource = {"path": os.path.join(DATA_DIR, source), "owner": owner}
-    print(f"excel_csv_reader: Evaluating OPA for action 'excel.read' on resource: {resource}")
-    allowed, details = await opa_evaluate(OPA_URL, subject, "excel.read", resource)
-    print(f"excel_csv_reader: OPA evaluation result: allowed={allowed}, details={details}")
+    path = os.path.normpath(os.path.join(DATA_DIR, source))
+    if not path.startswith(DATA_DIR + os.sep) or not os.path.realpath(path).startswith(DATA_REALPATH + os.sep):
+        raise HTTPException(status_code=400, detail="'source' must stay inside DATA_DIR")
+    return path, os.path.relpath(path, DATA_DIR)
+
+def with_owner(state, resource):
+    # Owner comes from the catalog for files under DATA_DIR; callers may still pass one for what-if checks
+    path = resource.get("path") if isinstance(resource, dict) else None
+    if not isinstance(path, str) or "owner" in resource or not path.startswith(DATA_DIR + os.sep):
+        return resource
+    return {**resource, "owner": state.catalog.owner(os.path.relpath(os.path.normpath(path), DATA_DIR))}
+
+def file_info(entry: dict) -> dict:
+    info = {k: entry[k] for k in ("path", "owner", "size", "sha256", "kind", "columns", "row_count")}
+    info["modified"] = entry["mtime_ns"] / 1e9
+    if entry["error"]:
+        info["error"] = entry["error"]
+    return info
+
+async def plan_read(state, subject: dict, payload: dict, deadline: float) -> dict:
+    # Validates and authorizes one excel_csv_reader call; shared by the REST route and /mcp
+    path, rel = resolve_source(payload.get("source"))
+    max_rows = int_arg(payload, "max_rows", 1000)
+    offset = int_arg(payload, "offset", 0)
+    stream = payload.get("stream")
+    fmt = payload.get("format") or "records"
+    infer_types = bool(payload.get("infer_types", False))
+    if stream not in (None, False, "ndjson"):
+        raise HTTPException(status_code=400, detail="'stream' must be 'ndjson' when set")
+    if fmt not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"'format' must be one of {', '.join(FORMATS)}")
+    if stream and (fmt == "columnar" or infer_types):
+        raise HTTPException(status_code=400, detail="Streaming supports the 'records' and 'rows' formats without infer_types")
+    sheet = payload.get("sheet")
+    columns = payload.get("columns")
+    if sheet is not None and not isinstance(sheet, str):
+        raise HTTPException(status_code=400, detail="'sheet' must be a sheet name")
+    if columns is not None and (not isinstance(columns, list) or not all(isinstance(c, str) for c in columns)):
+        raise HTTPException(status_code=400, detail="'columns' must be a list of column names")
+    filters = payload.get("filters")
+    if filters is not None and (not isinstance(filters, list) or not all(isinstance(f, dict) and isinstance(f.get("column"), str) for f in filters)):
+        raise HTTPException(status_code=400, detail="'filters' must be a list of {column, op, value}")
+    summary = bool(payload.get("summary", False))
+    if summary and stream:
+        raise HTTPException(status_code=400, detail="'summary' cannot be streamed")
+    metadata_only = bool(payload.get("metadata_only", False))
+    if metadata_only and (summary or stream):
+        raise HTTPException(status_code=400, detail="'metadata_only' cannot be combined with 'summary' or 'stream'")
+    # Ownership is the catalog's record of who uploaded the file, never a client hint
+    resource = {"path": path, "owner": state.catalog.owner(rel)}
+    allowed, details = await authorize(state, subject, "excel.read", resource, deadline)
     # Rights if present in details
-    rights = None
-    if isinstance(details, dict):
-        rights = details.get("rights") or (details.get("result", {}) if isinstance(details.get("result"), dict) else {}).get("rights")
-    if not allowed and isinstance(details, dict) and str(details.get("reason", "")).startswith("OPA unreachable"):
+    rights = extract_rights(details)
+    if opa_unavailable(allowed, details):
         raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=details)
     if not allowed:
         raise HTTPException(status_code=403, detail=details)
-    path = resource["path"]
     if not os.path.exists(path):
-        raise HTTPException(status_code=400, detail=f"File not found: {path}")
-    print(f"excel_csv_reader: Reading CSV from path: {path}")
-    rows = read_csv(path, max_rows=max_rows)
-    print(f"excel_csv_reader: Successfully read {len(rows)} rows.")
-    return {"rights": rights, "rows": rows, "count": len(rows)}
+        raise HTTPException(status_code=400, detail=f"File not found: {rel}")
+    table_opts = {"kind": detect_format(path, payload.get("format_hint")), "sheet": sheet, "columns": columns or None, "filters": filters or None}
+    log_event(log, "excel_csv_reader", sampled=True, sub=subject.get("sub"), path=path, kind=table_opts["kind"],
+              max_rows=max_rows, offset=offset, format=fmt, stream=stream or None, summary=summary, metadata_only=metadata_only or None)
+    return {"path": path, "rel": rel, "max_rows": max_rows, "offset": offset, "fmt": fmt, "infer_types": infer_types, "stream": stream,
+            "summary": summary, "metadata_only": metadata_only, "rights": rights, "table_opts": table_opts}
 
-@app.post("/mcp/tools/opa_policy_eval")
-async def opa_policy_eval(payload: dict, subject=Depends(verify_bearer_token)):
+async def policy_eval(state, subject: dict, payload: dict, deadline: float) -> dict:
     action = payload.get("action")
-    resource = payload.get("resource", {})
-    allowed, data = await opa_evaluate(OPA_URL, subject, action or "", resource)
-    rights = None
-    if isinstance(data, dict):
-        rights = data.get("rights") or (data.get("result", {}) if isinstance(data.get("result"), dict) else {}).get("rights")
-    if not allowed and isinstance(data, dict) and str(data.get("reason", "")).startswith("OPA unreachable"):
+    resource = with_owner(state, payload.get("resource", {}))
+    allowed, data = await authorize(state, subject, action or "", resource, deadline)
+    rights = extract_rights(data)
+    if opa_unavailable(allowed, data):
         raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=data)
     return {"allow": allowed, "rights": rights, "engine": data}
 
+async def policy_eval_batch(state, subject: dict, payload: dict, deadline: float) -> dict:
+    # Many (action, resource) pairs for the caller's subject; results keep request order
+    items = payload.get("items")
+    if not isinstance(items, list):
+        raise HTTPException(status_code=400, detail="'items' must be a list of {action, resource}")
+    if len(items) > OPA_BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {OPA_BATCH_MAX_ITEMS} items per batch")
+    results = await evaluate_batch(
+        lambda action, resource: authorize(state, subject, action, with_owner(state, resource), deadline),
+        items,
+        concurrency=OPA_BATCH_CONCURRENCY,
+    )
+    return {"results": results, "count": len(results)}
+
+async def list_files(state, subject: dict, payload: dict, deadline: float) -> dict:
+    # One page of the catalog in path order, reduced to the files the caller may read.
+    # Paging is over catalog entries, so a page can hold fewer than 'limit' files.
+    prefix = payload.get("prefix") or ""
+    if not isinstance(prefix, str):
+        raise HTTPException(status_code=400, detail="'prefix' must be a string")
+    offset = int_arg(payload, "offset", 0)
+    limit = min(int_arg(payload, "limit", 100, minimum=1), LIST_FILES_MAX_LIMIT)
+    entries, next_offset = state.catalog.page(prefix, offset, limit)
+    items = [{"action": "excel.read", "resource": {"path": os.path.join(DATA_DIR, e["path"]), "owner": e["owner"]}} for e in entries]
+    decisions = await evaluate_batch(
+        lambda action, resource: authorize(state, subject, action, resource, deadline),
+        items,
+        concurrency=OPA_BATCH_CONCURRENCY,
+    )
+    if any("error" in d for d in decisions):
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Policy engine unavailable")
+    files = [{**file_info(e), "rights": d["rights"]} for e, d in zip(entries, decisions) if d["allow"]]
+    log_event(log, "list_files", sampled=True, sub=subject.get("sub"), prefix=prefix, offset=offset, scanned=len(entries), visible=len(files))
+    return {"files": files, "count": len(files), "next_offset": next_offset}
+
+@app.post("/mcp/tools/excel_csv_reader")
+async def excel_csv_reader(request: Request, payload: dict, subject=Depends(verify_bearer_token)):
+    plan = await plan_read(request.app.state, subject, payload, request_deadline(request))
+    workers = request.app.state.file_workers
+    if plan["metadata_only"]:
+        return await workers.run(_render_metadata, _serialize, plan, request.app.state.catalog)
+    if plan["summary"]:
+        # Per-column statistics over the whole (filtered) file, computed in one pass
+        return await workers.run(_render_summary, _serialize, plan)
+    if plan["stream"] == "ndjson":
+        # Rows are produced and sent incrementally; memory does not grow with max_rows
+        chunks = workers.iterate(iter_ndjson(plan["path"], plan["max_rows"], plan["offset"], plan["rights"], plan["fmt"], **plan["table_opts"]))
+        return StreamingResponse(await _primed(chunks), media_type="application/x-ndjson")
+    # Authorization above always runs first; only the parse is served from cache
+    return await workers.run(_render_read, _serialize, plan, request.app.state.file_cache)
+
+@app.post("/mcp/tools/list_files")
+async def list_files_route(request: Request, payload: dict, subject=Depends(verify_bearer_token)):
+    return await list_files(request.app.state, subject, payload, request_deadline(request))
+
+@app.post("/mcp/tools/opa_policy_eval")
+async def opa_policy_eval(request: Request, payload: dict, subject=Depends(verify_bearer_token)):
+    return await policy_eval(request.app.state, subject, payload, request_deadline(request))
+
+@app.post("/mcp/tools/opa_policy_eval_batch")
+async def opa_policy_eval_batch(request: Request, payload: dict, subject=Depends(verify_bearer_token)):
+    return await policy_eval_batch(request.app.state, subject, payload, request_deadline(request))
+
+def mcp_deadline() -> float:
+    # Each tools/call gets the full OPA budget, like one REST request
+    return time.monotonic() + OPA_REQUEST_BUDGET
+
+async def _stream_read(workers, plan, progress) -> str:
+    # Rows go out in notifications/progress as they are parsed; the result only carries the cursor
+    sent, trailer = 0, {}
+    async for kind, value in workers.iterate(iter_row_batches(plan["path"], plan["max_rows"], plan["offset"], plan["fmt"], **plan["table_opts"])):
+        if kind == "rows":
+            sent += len(value)
+            await progress(sent, rows=value)
+        elif kind == "columns":
+            await progress(0, columns=value)
+        else:
+            trailer = value
+    return _encode({"rights": plan["rights"], **trailer, "streamed": True})
+
+async def mcp_excel_csv_reader(subject: dict, arguments: dict, progress) -> dict:
+    plan = await plan_read(app.state, subject, arguments, mcp_deadline())
+    workers = app.state.file_workers
+    if plan["metadata_only"]:
+        text = await workers.run(_render_metadata, _encode, plan, app.state.catalog)
+    elif plan["summary"]:
+        text = await workers.run(_render_summary, _encode, plan)
+    elif progress is not None and plan["fmt"] != "columnar" and not plan["infer_types"]:
+        text = await _stream_read(workers, plan, progress)
+    else:
+        text = await workers.run(_render_read, _encode, plan, app.state.file_cache)
+    return text_result(text)
+
+async def mcp_list_files(subject: dict, arguments: dict, progress) -> dict:
+    return text_result(_encode(await list_files(app.state, subject, arguments, mcp_deadline())))
+
+async def mcp_opa_policy_eval(subject: dict, arguments: dict, progress) -> dict:
+    return text_result(_encode(await policy_eval(app.state, subject, arguments, mcp_deadline())))
+
+async def mcp_opa_policy_eval_batch(subject: dict, arguments: dict, progress) -> dict:
+    return text_result(_encode(await policy_eval_batch(app.state, subject, arguments, mcp_deadline())))
+
+MCP_TOOLS = [
+    Tool("excel_csv_reader", "Read rows from a CSV or XLSX file under DATA_DIR, one page at a time (see next_offset). "
+         "With a progressToken the rows arrive in notifications/progress ('rows') as they are parsed.",
+         schemas.EXCEL_CSV_READER, mcp_excel_csv_reader),
+    Tool("list_files", "List the CSV/XLSX files under DATA_DIR the caller may read, with owner, size, sha256, columns and "
+         "row count, one page at a time (see next_offset).", schemas.LIST_FILES, mcp_list_files),
+    Tool("opa_policy_eval", "Ask the policy engine whether the caller may perform an action on a resource.",
+         schemas.OPA_POLICY_EVAL, mcp_opa_policy_eval),
+    Tool("opa_policy_eval_batch", f"Evaluate up to {OPA_BATCH_MAX_ITEMS} (action, resource) pairs for the caller in one call.",
+         schemas.OPA_POLICY_EVAL_BATCH, mcp_opa_policy_eval_batch),
+]
+
+@app.websocket("/mcp")
+async def mcp_websocket(websocket: WebSocket):
+    await websocket.app.state.mcp.websocket(websocket)
+
+@app.post("/mcp")
+async def mcp_http(request: Request):
+    return await request.app.state.mcp.http(request)
+
+@app.delete("/mcp")
+async def mcp_http_close(request: Request):
+    return await request.app.state.mcp.http_delete(request)
+
 @app.post("/mcp/upload")
-async def upload_file(file: UploadFile = File(...), subject=Depends(verify_bearer_token)):
-    print(f"upload_file: Received upload request for file: {file.filename} with subject: {subject}")
-    dest_path = os.path.join(UPLOADS_DIR, file.filename)
-    owner = subject.get("sub", "") # Get owner from subject
-    resource = {"path": dest_path, "owner": owner}
-    print(f"upload_file: Evaluating OPA for action 'excel.write' on resource: {resource}")
-    allowed, details = await opa_evaluate(OPA_URL, subject, "excel.write", resource)
-    print(f"upload_file: OPA evaluation result: allowed={allowed}, details={details}")
+async def upload_file(request: Request, subject=Depends(verify_bearer_token)):
+    # The body is parsed as it streams in (form field "file"), not spooled by request.form() first
+    upload = MultipartFile(request.headers, request.stream(), "file", UPLOAD_MAX_BYTES, UPLOAD_CHUNK_BYTES)
+    if await upload.open() is None:
+        raise HTTPException(status_code=400, detail="Missing 'file' field")
+    # Only the base name is kept so a crafted filename cannot escape UPLOADS_DIR
+    filename = os.path.basename(upload.filename)
+    if filename in ("", ".", ".."):
+        raise HTTPException(status_code=400, detail="Invalid filename")
+    dest_path = os.path.join(UPLOADS_DIR, filename)
+    state = request.app.state
+    rel = os.path.relpath(dest_path, DATA_DIR)
+    # The first uploader keeps the file; the policy decides who may overwrite it (owner "" = unclaimed)
+    current_owner = state.catalog.owner(rel)
+    owner = current_owner or subject["sub"]
+    resource = {"path": dest_path, "owner": current_owner}
+    allowed, details = await authorize(state, subject, "excel.write", resource, request_deadline(request))
+    if opa_unavailable(allowed, details):
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=details)
     if not allowed: # Removed the redundant subject.get("role") != "admin" check as OPA should handle it
         raise HTTPException(status_code=403, detail=details) # Return OPA details for better debugging
-    content = await file.read()
-    with open(dest_path, "wb") as f:
-        f.write(content)
-    print(f"upload_file: Successfully wrote file to: {dest_path}")
+    seed_upload_hash(state, rel, dest_path)
+    # Written to a temp file in fixed-size chunks as the body arrives, hashed on the way, then renamed into place
+    started = time.perf_counter()
+    stored = await state.uploads.store(upload.chunks(), dest_path, state.file_workers.run)
+    observe_stage("upload_write", started)
+    changed = not stored["deduplicated"]
+    # Only tables are cataloged, matching what a scan of DATA_DIR would pick up
+    cataloged = filename.lower().endswith(CATALOG_EXTENSIONS) and not filename.startswith(".")
+    indexed = cataloged and (changed or state.catalog.get(rel) is None)
+    if indexed:
+        # Same owner whether or not the bytes changed; the hash is already known
+        await state.file_workers.run(state.catalog.index, rel, owner, stored["sha256"])
+    if changed or indexed:
+        # Other workers drop their parsed copy and re-read the catalog row
+        await state.shared.publish("file.changed", path=dest_path, rel=rel)
+    log_event(log, "upload_file", sampled=True, sub=subject["sub"], owner=owner, path=dest_path, size=stored["size"], deduplicated=stored["deduplicated"])
     # Return relative path from DATA_DIR for downstream tool
-    rel = os.path.relpath(dest_path, DATA_DIR)
-    return {"relative_path": rel, "size": len(content)}
+    return {"relative_path": rel, **stored}
+
+def seed_upload_hash(state, rel: str, dest_path: str):
+    # The catalog already has the hash of the file on disk, possibly from another worker
+    entry = state.catalog.get(rel)
+    try:
+        if entry is not None and (entry["mtime_ns"], entry["size"]) == stat_signature(dest_path):
+            state.uploads.remember(dest_path, (entry["mtime_ns"], entry["size"]), entry["sha256"])
+    except OSError:
+        pass
@@ -0,0 +1,468 @@
+# python
+import asyncio
+import hashlib
+import hmac
+import json
+import logging
+import secrets
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, Request, WebSocket
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+from ..utils.logs import get_logger, log_event, request_id
+from ..utils.metrics import REGISTRY
+from ..utils.shared_state import SharedState, SharedStateUnavailable
+
+# MCP over JSON-RPC 2.0 on one endpoint, two transports:
+#   WebSocket /mcp: the connection is the session; the bearer token is checked at the handshake.
+#   POST /mcp (streamable HTTP): initialize opens a session and returns Mcp-Session-Id; later
+#   requests carry that id and the same bearer token, which is compared by hash, not re-verified.
+#   With a shared-state backend the session record is stored there, so any worker or replica
+#   can serve the next request; running tasks stay on the worker that started them.
+# tools/call requests run as tasks so many can be in flight per session, up to max_in_flight.
+# A call with params._meta.progressToken gets notifications/progress while it runs (over SSE
+# on HTTP when the client accepts text/event-stream).
+
+JSONRPC = "2.0"
+PROTOCOL_VERSION = "2025-06-18"
+SUPPORTED_VERSIONS = ("2025-06-18", "2025-03-26", "2024-11-05")
+PARSE_ERROR, INVALID_REQUEST, METHOD_NOT_FOUND, INVALID_PARAMS, INTERNAL_ERROR = -32700, -32600, -32601, -32602, -32603
+# -32000..-32099 are left to the server by JSON-RPC
+UNAUTHORIZED, TOO_MANY_REQUESTS, REQUEST_CANCELLED = -32001, -32002, -32800
+
+RPC_MESSAGES = REGISTRY.counter("mcp_rpc_messages_total", "JSON-RPC messages handled on /mcp by method and outcome.", ("method", "outcome"))
+RPC_LATENCY = REGISTRY.histogram("mcp_rpc_duration_seconds", "Time to answer a tools/call on /mcp.", ("tool",))
+RPC_SESSIONS = REGISTRY.gauge("mcp_rpc_sessions", "Open MCP sessions by transport.", ("transport",))
+RPC_IN_FLIGHT = REGISTRY.gauge("mcp_rpc_calls_in_flight", "tools/call requests currently running.")
+
+Handler = Callable[[dict, dict, Optional[Callable[..., Awaitable[None]]]], Awaitable[dict]]
+Authenticate = Callable[[Optional[str]], Awaitable[Tuple[dict, float]]]
+
+_KNOWN_METHODS = frozenset({"initialize", "ping", "tools/list", "tools/call", "notifications/initialized", "notifications/cancelled"})
+
+
+class RpcError(Exception):
+    def __init__(self, code: int, message: str, data: Any = None):
+        super().__init__(message)
+        self.code, self.message, self.data = code, message, data
+
+    def response(self, msg_id) -> dict:
+        error = {"code": self.code, "message": self.message}
+        if self.data is not None:
+            error["data"] = self.data
+        return {"jsonrpc": JSONRPC, "id": msg_id, "error": error}
+
+
+class Tool:
+    """An MCP tool: `handler(subject, arguments, progress)` returns a CallToolResult dict.
+    `progress(done, **fields)` is None unless the caller asked for progress notifications."""
+
+    def __init__(self, name: str, description: str, input_schema: dict, handler: Handler):
+        self.name = name
+        self.handler = handler
+        self.descriptor = {"name": name, "description": description, "inputSchema": input_schema}
+
+
+def text_result(text: str, is_error: bool = False) -> dict:
+    return {"content": [{"type": "text", "text": text}], "isError": is_error}
+
+
+def _dumps(message) -> str:
+    return json.dumps(message, ensure_ascii=False, separators=(",", ":"))
+
+
+def _digest(authorization: Optional[str]) -> bytes:
+    return hashlib.sha256((authorization or "").encode()).digest()
+
+
+def _valid_id(msg_id) -> bool:
+    return isinstance(msg_id, (str, int)) and not isinstance(msg_id, bool)
+
+
+class Session:
+    def __init__(self, subject: dict, expires_at: float, transport: str, token_digest: bytes = b"", sid: Optional[str] = None):
+        self.id = sid or secrets.token_urlsafe(24)
+        self.subject = subject
+        self.expires_at = expires_at
+        self.transport = transport
+        self.token_digest = token_digest
+        self.protocol_version = PROTOCOL_VERSION
+        self.tasks: Dict[Any, asyncio.Task] = {}
+        self.last_seen = self.refreshed = time.monotonic()
+
+    def record(self) -> dict:
+        # Persisted to the shared backend: never the bearer token itself, token_digest rebinds the session
+        subject = {k: v for k, v in self.subject.items() if k != "token"}
+        return {"subject": subject, "expires_at": self.expires_at, "token_digest": self.token_digest.hex()}
+
+    @classmethod
+    def from_record(cls, sid: str, record: dict) -> "Session":
+        return cls(record["subject"], record["expires_at"], "http", bytes.fromhex(record["token_digest"]), sid)
+
+    @property
+    def expired(self) -> bool:
+        return time.time() >= self.expires_at
+
+    def close(self) -> None:
+        for task in list(self.tasks.values()):
+            task.cancel()
+
+
+class McpServer:
+    """JSON-RPC dispatcher plus the WebSocket and streamable HTTP transports for /mcp."""
+
+    def __init__(self, tools: List[Tool], authenticate: Authenticate, *, max_in_flight: int = 16, max_sessions: int = 1000,
+                 idle_ttl: float = 900.0, server_info: Optional[dict] = None, logger: Optional[logging.Logger] = None,
+                 shared: Optional[SharedState] = None):
+        self.tools = {tool.name: tool for tool in tools}
+        self.tool_list = {"tools": [tool.descriptor for tool in tools]}
+        self.authenticate = authenticate
+        self.max_in_flight = max(1, max_in_flight)
+        self.max_sessions = max(1, max_sessions)
+        self.idle_ttl = idle_ttl
+        self.server_info = server_info or {"name": "mcp-server", "version": "0"}
+        self.log = logger or get_logger("mcp")
+        # HTTP sessions held by this worker; with `shared` it is a cache in front of the backend
+        self.sessions: "OrderedDict[str, Session]" = OrderedDict()
+        self.shared = shared
+        self.rejected = 0
+        if shared is not None:
+            shared.subscribe("mcp.session.closed", self._on_session_closed)
+            shared.subscribe("mcp.cancel", self._on_cancel)
+
+    # Dispatch
+
+    async def handle(self, session: Session, message, send, wait: bool) -> Optional[dict]:
+        # Returns the response to send, or None for notifications and for calls that will
+        # answer through `send` themselves (wait=False, the WebSocket case)
+        if not isinstance(message, dict) or message.get("jsonrpc") != JSONRPC or not isinstance(message.get("method"), str):
+            RPC_MESSAGES.inc(1, ("invalid", "rpc_error"))
+            return RpcError(INVALID_REQUEST, "Invalid request").response(message.get("id") if isinstance(message, dict) else None)
+        method = message["method"]
+        label = method if method in _KNOWN_METHODS else "unknown"
+        params = message.get("params") or {}
+        if "id" not in message:
+            if method == "notifications/cancelled" and isinstance(params, dict):
+                task = session.tasks.get(params.get("requestId"))
+                if task is not None:
+                    task.cancel()
+                elif session.transport == "http" and self.shared is not None and _valid_id(params.get("requestId")):
+                    # The call may be running on another worker
+                    await self.shared.publish("mcp.cancel", sid=session.id, id=params["requestId"])
+            RPC_MESSAGES.inc(1, (label, "notification"))
+            return None
+        msg_id = message["id"]
+        try:
+            if not _valid_id(msg_id):
+                raise RpcError(INVALID_REQUEST, "'id' must be a string or an integer")
+            if not isinstance(params, dict):
+                raise RpcError(INVALID_PARAMS, "'params' must be an object")
+            if session.expired:
+                raise RpcError(UNAUTHORIZED, "Access token expired; open a new session")
+            if method == "tools/call":
+                task = self._start_call(session, msg_id, params, send, respond=not wait)
+                if not wait:
+                    return None
+                try:
+                    return await task
+                except asyncio.CancelledError:
+                    if not task.cancelled():
+                        raise
+                    return RpcError(REQUEST_CANCELLED, "Request cancelled").response(msg_id)
+            result = self._simple(session, method, params)
+        except RpcError as exc:
+            RPC_MESSAGES.inc(1, (label, "rpc_error"))
+            return exc.response(msg_id)
+        RPC_MESSAGES.inc(1, (label, "ok"))
+        return {"jsonrpc": JSONRPC, "id": msg_id, "result": result}
+
+    def _simple(self, session: Session, method: str, params: dict) -> dict:
+        if method == "ping":
+            return {}
+        if method == "tools/list":
+            return self.tool_list
+        if method == "initialize":
+            requested = params.get("protocolVersion")
+            session.protocol_version = requested if requested in SUPPORTED_VERSIONS else PROTOCOL_VERSION
+            return {"protocolVersion": session.protocol_version, "capabilities": {"tools": {"listChanged": False}}, "serverInfo": self.server_info}
+        raise RpcError(METHOD_NOT_FOUND, f"Method not found: {method}")
+
+    def _start_call(self, session: Session, msg_id, params: dict, send, respond: bool) -> asyncio.Task:
+        if msg_id in session.tasks:
+            raise RpcError(INVALID_REQUEST, "A request with this id is already in flight")
+        if len(session.tasks) >= self.max_in_flight:
+            self.rejected += 1
+            raise RpcError(TOO_MANY_REQUESTS, "Too many requests in flight for this session", {"max_in_flight": self.max_in_flight})
+        tool = self.tools.get(params.get("name"))
+        if tool is None:
+            raise RpcError(INVALID_PARAMS, f"Unknown tool: {params.get('name')}")
+        arguments = params.get("arguments") or {}
+        if not isinstance(arguments, dict):
+            raise RpcError(INVALID_PARAMS, "'arguments' must be an object")
+        meta = params.get("_meta")
+        token = meta.get("progressToken") if isinstance(meta, dict) else None
+        progress = None
+        if token is not None and send is not None:
+            async def progress(done: float, **fields):
+                await send({"jsonrpc": JSONRPC, "method": "notifications/progress", "params": {"progressToken": token, "progress": done, **fields}})
+
+        task = asyncio.create_task(self._run_call(session, msg_id, tool, arguments, progress, send if respond else None))
+        session.tasks[msg_id] = task
+        RPC_IN_FLIGHT.inc()
+
+        def done(_):
+            session.tasks.pop(msg_id, None)
+            RPC_IN_FLIGHT.dec()
+
+        task.add_done_callback(done)
+        return task
+
+    async def _run_call(self, session: Session, msg_id, tool: Tool, arguments: dict, progress, respond) -> Optional[dict]:
+        if request_id.get() == "-":
+            # WebSocket calls have no X-Request-ID; correlate log lines by session and id instead
+            request_id.set(f"{session.id[:8]}:{msg_id}")
+        started = time.perf_counter()
+        outcome = "cancelled"
+        try:
+            try:
+                result = await tool.handler(session.subject, arguments, progress)
+                outcome = "tool_error" if result.get("isError") else "ok"
+            except HTTPException as exc:
+                if exc.status_code == 400:
+                    # Malformed arguments are the caller's error, like a 400 on the REST route
+                    raise RpcError(INVALID_PARAMS, str(exc.detail))
+                # Tool-level failures (denied by policy, OPA down, ...) are results, not protocol errors
+                outcome = "tool_error"
+                result = text_result(_dumps({"status": exc.status_code, "detail": exc.detail}), is_error=True)
+            response = {"jsonrpc": JSONRPC, "id": msg_id, "result": result}
+        except RpcError as exc:
+            outcome = "invalid_params"
+            response = exc.response(msg_id)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            outcome = "rpc_error"
+            self.log.exception("mcp.call_failed", extra={"fields": {"tool": tool.name, "id": msg_id}})
+            response = RpcError(INTERNAL_ERROR, "Internal error").response(msg_id)
+        finally:
+            RPC_MESSAGES.inc(1, ("tools/call", outcome))
+            RPC_LATENCY.observe(time.perf_counter() - started, (tool.name,))
+        if respond is None:
+            return response
+        try:
+            await respond(response)
+        except Exception:
+            # The connection closed while the call was running
+            pass
+        return None
+
+    # WebSocket transport
+
+    async def websocket(self, ws: WebSocket) -> None:
+        try:
+            subject, expires_at = await self.authenticate(ws.headers.get("authorization"))
+        except HTTPException as exc:
+            # Closing before accept turns into an HTTP 403 on the handshake
+            await ws.close(code=1008, reason=str(exc.detail)[:120])
+            return
+        await ws.accept(subprotocol="mcp" if "mcp" in ws.scope.get("subprotocols", ()) else None)
+        session = Session(subject, expires_at, "websocket")
+        RPC_SESSIONS.inc(1, ("websocket",))
+        log_event(self.log, "mcp.session.open", sampled=True, transport="websocket", sub=subject.get("sub"), session=session.id[:8])
+        lock = asyncio.Lock()
+
+        async def send(message: dict) -> None:
+            text = _dumps(message)
+            async with lock:
+                await ws.send_text(text)
+
+        try:
+            while True:
+                event = await ws.receive()
+                if event["type"] == "websocket.disconnect":
+                    break
+                raw = event.get("text")
+                if raw is None:
+                    raw = event.get("bytes") or b""
+                try:
+                    body = json.loads(raw)
+                except ValueError:
+                    await send(RpcError(PARSE_ERROR, "Parse error").response(None))
+                    continue
+                for message in body if isinstance(body, list) and body else [body]:
+                    reply = await self.handle(session, message, send, wait=False)
+                    if reply is not None:
+                        await send(reply)
+                if session.expired:
+                    await ws.close(code=1008, reason="Access token expired")
+                    break
+        except RuntimeError:
+            # Sending after the peer went away
+            pass
+        finally:
+            session.close()
+            RPC_SESSIONS.dec(1, ("websocket",))
+
+    # Streamable HTTP transport
+
+    async def http(self, request: Request) -> Response:
+        try:
+            body = json.loads(await request.body())
+        except ValueError:
+            return JSONResponse(RpcError(PARSE_ERROR, "Parse error").response(None), status_code=400)
+        authorization = request.headers.get("authorization")
+        sid = request.headers.get("mcp-session-id")
+        try:
+            if sid is None:
+                if not isinstance(body, dict) or body.get("method") != "initialize":
+                    return JSONResponse(RpcError(INVALID_REQUEST, "Missing Mcp-Session-Id; send initialize first").response(None), status_code=400)
+                try:
+                    subject, expires_at = await self.authenticate(authorization)
+                except HTTPException as exc:
+                    return JSONResponse(RpcError(UNAUTHORIZED, str(exc.detail)).response(body.get("id")), status_code=exc.status_code)
+                session = await self._open(subject, expires_at, _digest(authorization))
+                reply = await self.handle(session, body, None, wait=True)
+                return JSONResponse(reply, headers={"Mcp-Session-Id": session.id})
+            session = await self._lookup(sid)
+            if session is None:
+                # 404 tells the client to start over with initialize
+                return JSONResponse(RpcError(INVALID_REQUEST, "Unknown or expired session").response(None), status_code=404)
+            if not hmac.compare_digest(session.token_digest, _digest(authorization)):
+                return JSONResponse(RpcError(UNAUTHORIZED, "Bearer token does not match the session").response(None), status_code=401)
+            if session.expired:
+                await self._end(sid)
+                return JSONResponse(RpcError(UNAUTHORIZED, "Access token expired; open a new session").response(None), status_code=401)
+            await self._touch(session)
+        except SharedStateUnavailable:
+            return JSONResponse(RpcError(INTERNAL_ERROR, "Session store unavailable").response(None), status_code=503)
+        messages = body if isinstance(body, list) else [body]
+        if not messages:
+            return JSONResponse(RpcError(INVALID_REQUEST, "Empty batch").response(None), status_code=400)
+        if "text/event-stream" in request.headers.get("accept", "") and any(_wants_progress(m) for m in messages):
+            return StreamingResponse(self._sse(session, messages), media_type="text/event-stream", headers={"Cache-Control": "no-store"})
+        replies = await asyncio.gather(*(self.handle(session, m, None, wait=True) for m in messages))
+        replies = [r for r in replies if r is not None]
+        if not replies:
+            return Response(status_code=202)
+        status = 429 if len(replies) == 1 and replies[0].get("error", {}).get("code") == TOO_MANY_REQUESTS else 200
+        return JSONResponse(replies if isinstance(body, list) else replies[0], status_code=status)
+
+    async def _sse(self, session: Session, messages: list):
+        # Bounded so a slow reader holds back the tool (and its file worker) instead of buffering rows
+        queue: asyncio.Queue = asyncio.Queue(maxsize=8)
+
+        async def run():
+            try:
+                for reply in await asyncio.gather(*(self.handle(session, m, queue.put, wait=True) for m in messages)):
+                    if reply is not None:
+                        await queue.put(reply)
+            finally:
+                await queue.put(None)
+
+        runner = asyncio.create_task(run())
+        try:
+            while (message := await queue.get()) is not None:
+                yield f"event: message\ndata: {_dumps(message)}\n\n"
+        finally:
+            runner.cancel()
+
+    async def http_delete(self, request: Request) -> Response:
+        sid = request.headers.get("mcp-session-id", "")
+        try:
+            session = await self._lookup(sid)
+            if session is None:
+                return Response(status_code=404)
+            if not hmac.compare_digest(session.token_digest, _digest(request.headers.get("authorization"))):
+                return Response(status_code=401)
+            await self._end(sid)
+        except SharedStateUnavailable:
+            return Response(status_code=503)
+        return Response(status_code=204)
+
+    async def _open(self, subject: dict, expires_at: float, token_digest: bytes) -> Session:
+        session = Session(subject, expires_at, "http", token_digest)
+        if self.shared is not None:
+            await self.shared.set_json(f"session:{session.id}", session.record(), self.idle_ttl)
+        self._cache(session)
+        log_event(self.log, "mcp.session.open", sampled=True, transport="http", sub=subject.get("sub"), session=session.id[:8])
+        return session
+
+    async def _lookup(self, sid: str) -> Optional[Session]:
+        session = self.sessions.get(sid)
+        if session is None and self.shared is not None and sid:
+            # Opened on another worker
+            record = await self.shared.get_json(f"session:{sid}")
+            if record is not None:
+                session = Session.from_record(sid, record)
+                self._cache(session)
+        return session
+
+    async def _touch(self, session: Session) -> None:
+        session.last_seen = now = time.monotonic()
+        self.sessions.move_to_end(session.id)
+        # The backend TTL is the idle timeout; pushing it out on every call would cost a write per call
+        if self.shared is not None and now - session.refreshed > self.idle_ttl / 4:
+            session.refreshed = now
+            try:
+                await self.shared.expire(f"session:{session.id}", self.idle_ttl)
+            except SharedStateUnavailable:
+                pass
+
+    def _cache(self, session: Session) -> None:
+        now = time.monotonic()
+        # Least recently used first: drop idle sessions, then the oldest if still full. With a
+        # shared backend this only forgets the local copy; its running calls still finish.
+        while self.sessions:
+            sid, oldest = next(iter(self.sessions.items()))
+            if now - oldest.last_seen < self.idle_ttl and len(self.sessions) < self.max_sessions:
+                break
+            self._forget(sid, cancel=self.shared is None)
+        self.sessions[session.id] = session
+        RPC_SESSIONS.inc(1, ("http",))
+
+    async def _end(self, sid: str) -> None:
+        # DELETE or expiry: gone everywhere, running calls cancelled
+        if self.shared is None:
+            self._forget(sid)
+            return
+        await self.shared.delete(f"session:{sid}")
+        await self.shared.publish("mcp.session.closed", sid=sid)
+
+    def _forget(self, sid: str, cancel: bool = True) -> None:
+        session = self.sessions.pop(sid, None)
+        if session is not None:
+            if cancel:
+                session.close()
+            RPC_SESSIONS.dec(1, ("http",))
+
+    async def _on_session_closed(self, fields: dict) -> None:
+        self._forget(str(fields.get("sid")))
+
+    async def _on_cancel(self, fields: dict) -> None:
+        session = self.sessions.get(str(fields.get("sid")))
+        task = session.tasks.get(fields.get("id")) if session is not None else None
+        if task is not None:
+            task.cancel()
+
+    def shutdown(self) -> None:
+        # Local copies only; sessions in a shared backend outlive this worker
+        for sid in list(self.sessions):
+            self._forget(sid)
+
+    def stats(self) -> dict:
+        return {
+            "http_sessions": len(self.sessions),
+            "session_store": self.shared.backend if self.shared is not None else "local",
+            "in_flight": sum(len(s.tasks) for s in self.sessions.values()),
+            "max_in_flight_per_session": self.max_in_flight,
+            "rejected": self.rejected,
+        }
+
+
+def _wants_progress(message) -> bool:
+    params = message.get("params") if isinstance(message, dict) else None
+    meta = params.get("_meta") if isinstance(params, dict) else None
+    return isinstance(meta, dict) and meta.get("progressToken") is not None
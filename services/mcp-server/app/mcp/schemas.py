@@ -0,0 +1,60 @@
+# python
+# JSON Schemas for the tools listed by tools/list on /mcp. Arguments are the same
+# bodies the REST routes under /mcp/tools accept and are validated by the same code.
+from .tools.excel_csv_reader import FILTER_OPS, FORMAT_HINTS, FORMATS
+
+_RESOURCE = {
+    "type": "object",
+    "properties": {"path": {"type": "string"}, "owner": {"type": "string"}},
+    "required": ["path"],
+}
+
+EXCEL_CSV_READER = {
+    "type": "object",
+    "properties": {
+        "source": {"type": "string", "description": "Path relative to DATA_DIR"},
+        "max_rows": {"type": "integer", "minimum": 0, "default": 1000},
+        "offset": {"type": "integer", "minimum": 0, "default": 0},
+        "format": {"enum": list(FORMATS), "default": "records"},
+        "format_hint": {"enum": list(FORMAT_HINTS)},
+        "infer_types": {"type": "boolean", "default": False},
+        "sheet": {"type": "string"},
+        "columns": {"type": "array", "items": {"type": "string"}},
+        "filters": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "column": {"type": "string"},
+                    "op": {"enum": list(FILTER_OPS)},
+                    "value": {},
+                },
+                "required": ["column"],
+            },
+        },
+        "summary": {"type": "boolean", "default": False},
+        "metadata_only": {"type": "boolean", "default": False, "description": "Columns, row count, size and hash from the file catalog"},
+    },
+    "required": ["source"],
+}
+
+LIST_FILES = {
+    "type": "object",
+    "properties": {
+        "prefix": {"type": "string", "description": "Path prefix relative to DATA_DIR, e.g. 'uploads/'"},
+        "offset": {"type": "integer", "minimum": 0, "default": 0},
+        "limit": {"type": "integer", "minimum": 1, "default": 100},
+    },
+}
+
+OPA_POLICY_EVAL = {
+    "type": "object",
+    "properties": {"action": {"type": "string"}, "resource": _RESOURCE},
+    "required": ["action", "resource"],
+}
+
+OPA_POLICY_EVAL_BATCH = {
+    "type": "object",
+    "properties": {"items": {"type": "array", "items": OPA_POLICY_EVAL}},
+    "required": ["items"],
+}
@@ -1,17 +1,403 @@
 # python
 import os
 import csv
+import datetime
+import itertools
+import json
+import math
+import time
+from typing import Any, Callable, Iterator, List, Optional, Tuple
 from fastapi import HTTPException
 
+from ...utils.file_cache import ParsedFileCache, stat_signature
+from ...utils.metrics import FILE_BYTES_READ, observe_stage
 
-def read_csv(path: str, max_rows: int = 1000):
+# Rows per NDJSON chunk handed to the ASGI server
+NDJSON_CHUNK_ROWS = 256
+# records: list of dicts (default); rows: columns + value arrays; columnar: one array per column
+FORMATS = ("records", "rows", "columnar")
+FORMAT_HINTS = ("auto", "csv", "xlsx")
+XLSX_EXTENSIONS = (".xlsx", ".xlsm")
+FILTER_OPS = ("eq", "ne", "lt", "le", "gt", "ge", "between", "contains", "in")
+
+
+def detect_format(path: str, format_hint: Optional[str] = None) -> str:
+    hint = format_hint or "auto"
+    if not isinstance(hint, str) or hint.lower() not in FORMAT_HINTS:
+        raise HTTPException(status_code=400, detail=f"'format_hint' must be one of {', '.join(FORMAT_HINTS)}")
+    hint = hint.lower()
+    if hint != "auto":
+        return hint
+    return "xlsx" if os.path.splitext(path)[1].lower() in XLSX_EXTENSIONS else "csv"
+
+
+def _projection(header: List[str], columns: Optional[List[str]]) -> Optional[List[int]]:
+    if not columns:
+        return None
+    index = {name: i for i, name in enumerate(header)}
+    missing = [c for c in columns if c not in index]
+    if missing:
+        raise HTTPException(status_code=400, detail=f"Unknown columns: {', '.join(map(str, missing))}")
+    return [index[c] for c in columns]
+
+
+def _csv_rows(path: str) -> Iterator[list]:
+    # Header, then every row. Blank lines are skipped and ragged rows padded/truncated,
+    # matching csv.DictReader.
+    with open(path, newline="") as f:
+        try:
+            reader = csv.reader(f)
+            header = next(reader, [])
+            yield header
+            width = len(header)
+            for row in reader:
+                if not row:
+                    continue
+                if len(row) != width:
+                    row = (row + [None] * width)[:width]
+                yield row
+        finally:
+            # Bytes pulled through the buffer so far; a paged read stops early
+            FILE_BYTES_READ.inc(f.buffer.tell(), ("csv",))
+
+
+def _cell(value):
+    # openpyxl returns native types; dates/times are sent as ISO strings
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, datetime.timedelta):
+        return value.total_seconds()
+    return value
+
+
+def _xlsx_rows(path: str, sheet: Optional[str], needed: Optional[List[str]]) -> Iterator[list]:
+    # Header, then every non-blank row, limited to the column span covering `needed`
+    try:
+        import openpyxl
+    except ImportError:
+        raise HTTPException(status_code=501, detail="XLSX support requires the openpyxl package") from None
+    try:
+        # read_only streams rows from the sheet XML instead of building the whole workbook
+        wb = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    except Exception as exc:
+        raise HTTPException(status_code=400, detail=f"Invalid XLSX file: {exc}") from None
+    # The archive is read through zipfile, so count the file once as read
+    FILE_BYTES_READ.inc(os.path.getsize(path), ("xlsx",))
+    try:
+        if sheet is None:
+            ws = wb.worksheets[0]
+        elif sheet in wb.sheetnames:
+            ws = wb[sheet]
+        else:
+            raise HTTPException(status_code=400, detail=f"Unknown sheet: {sheet}")
+        header_row = next(ws.iter_rows(min_row=1, max_row=1, values_only=True), ())
+        header = [str(v) if v is not None else f"column_{i + 1}" for i, v in enumerate(header_row)]
+        picks = _projection(header, needed)
+        # Only cells inside the needed column span are converted to values
+        min_col, max_col = (1, max(len(header), 1)) if picks is None else (min(picks) + 1, max(picks) + 1)
+        yield header[min_col - 1:max_col]
+        width = max_col - min_col + 1
+        for row in ws.iter_rows(min_row=2, min_col=min_col, max_col=max_col, values_only=True):
+            if all(v is None for v in row):
+                continue
+            row = [_cell(v) for v in row]
+            if len(row) != width:
+                row = (row + [None] * width)[:width]
+            yield row
+    finally:
+        wb.close()
+
+
+def _as_number(value):
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return value
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _compare(op: str, target):
+    # Range operators compare numerically when the filter value is a number
+    numeric = _as_number(target) if not isinstance(target, str) else None
+    if numeric is not None:
+        cmp = {"lt": float.__lt__, "le": float.__le__, "gt": float.__gt__, "ge": float.__ge__}[op]
+        target = float(numeric)
+
+        def pred(value):
+            number = _as_number(value)
+            return number is not None and cmp(float(number), target)
+
+        return pred
+    cmp = {"lt": str.__lt__, "le": str.__le__, "gt": str.__gt__, "ge": str.__ge__}[op]
+    target = str(target)
+    return lambda value: value is not None and cmp(str(value), target)
+
+
+def _equals(target):
+    # Numbers match numerically ("10.0" == 10); anything else matches on its string form
+    numeric = _as_number(target) if not isinstance(target, str) else None
+    if numeric is not None:
+        target = float(numeric)
+        return lambda value: _as_number(value) == target
+    target = str(target)
+    return lambda value: value is not None and str(value) == target
+
+
+def compile_filters(header: List[str], filters: Optional[List[dict]]) -> Optional[Callable[[list], bool]]:
+    # [{column, op, value}] joined with AND; evaluated on each row as it is parsed
+    if not filters:
+        return None
+    index = _projection(header, [f.get("column") for f in filters])
+    preds = []
+    for i, flt in zip(index, filters):
+        op, value = flt.get("op", "eq"), flt.get("value")
+        if op == "eq":
+            test = _equals(value)
+        elif op == "ne":
+            eq = _equals(value)
+            test = lambda v, eq=eq: not eq(v)
+        elif op in ("lt", "le", "gt", "ge"):
+            test = _compare(op, value)
+        elif op == "between":
+            if not isinstance(value, list) or len(value) != 2:
+                raise HTTPException(status_code=400, detail="'between' needs a [low, high] value")
+            low, high = _compare("ge", value[0]), _compare("le", value[1])
+            test = lambda v, low=low, high=high: low(v) and high(v)
+        elif op == "contains":
+            needle = str(value)
+            test = lambda v, needle=needle: v is not None and needle in str(v)
+        elif op == "in":
+            if not isinstance(value, list):
+                raise HTTPException(status_code=400, detail="'in' needs a list value")
+            tests = [_equals(x) for x in value]
+            test = lambda v, tests=tests: any(t(v) for t in tests)
+        else:
+            raise HTTPException(status_code=400, detail=f"Unsupported filter op: {op}. Use one of {', '.join(FILTER_OPS)}")
+        preds.append((i, test))
+    return lambda row: all(test(row[i]) for i, test in preds)
+
+
+def _source_rows(path: str, kind: str, sheet: Optional[str], columns: Optional[List[str]], filters: Optional[List[dict]]) -> Iterator[list]:
+    if kind != "xlsx":
+        return _csv_rows(path)
+    # The XLSX span must cover filter columns as well as the projection
+    needed = None if not columns else list(columns) + [f.get("column") for f in filters or []]
+    return _xlsx_rows(path, sheet, needed)
+
+
+def iter_table(path: str, offset: int = 0, limit: Optional[int] = None, *, kind: str = "csv", sheet: Optional[str] = None, columns: Optional[List[str]] = None, filters: Optional[List[dict]] = None) -> Iterator[list]:
+    # Yields the header first, then rows [offset, offset + limit) as value lists.
+    # Filters run on every parsed row before paging; projection is applied last.
+    source = _source_rows(path, kind, sheet, columns, filters)
+    try:
+        header = next(source)
+        picks = _projection(header, columns)
+        match = compile_filters(header, filters)
+        yield header if picks is None else [header[i] for i in picks]
+        rows = source if match is None else filter(match, source)
+        stop = None if limit is None else offset + limit
+        for row in itertools.islice(rows, offset, stop):
+            yield row if picks is None else [row[i] for i in picks]
+    finally:
+        source.close()
+
+
+def summarize_table(path: str, *, kind: str = "csv", sheet: Optional[str] = None, columns: Optional[List[str]] = None, filters: Optional[List[dict]] = None) -> dict:
+    # One streaming pass over the whole file; keeps only running totals per column
+    rows = iter_table(path, kind=kind, sheet=sheet, columns=columns, filters=filters)
+    header = next(rows)
+    width = len(header)
+    non_empty = [0] * width
+    numeric = [0] * width
+    totals = [0.0] * width
+    lows: List[Optional[float]] = [None] * width
+    highs: List[Optional[float]] = [None] * width
+    count = 0
+    for row in rows:
+        count += 1
+        for i in range(width):
+            value = row[i]
+            if value is None or value == "":
+                continue
+            non_empty[i] += 1
+            number = _as_number(value)
+            if number is None or not math.isfinite(number):
+                continue
+            numeric[i] += 1
+            totals[i] += number
+            if lows[i] is None or number < lows[i]:
+                lows[i] = number
+            if highs[i] is None or number > highs[i]:
+                highs[i] = number
+    stats = {}
+    for i, name in enumerate(header):
+        col = {"count": non_empty[i], "empty": count - non_empty[i], "numeric": numeric[i]}
+        if numeric[i]:
+            col.update({"min": lows[i], "max": highs[i], "sum": totals[i], "mean": totals[i] / numeric[i]})
+        stats[name] = col
+    return {"rows": count, "columns": stats}
+
+
+def table_schema(path: str, kind: str = "csv") -> Tuple[List[str], int]:
+    # Header and data row count of the first sheet, for the file catalog
+    rows = iter_table(path, kind=kind)
+    header = next(rows)
+    return header, sum(1 for _ in rows)
+
+
+def read_table(path: str, max_rows: Optional[int] = 1000, offset: int = 0, **table_opts):
     if not os.path.exists(path):
         raise HTTPException(status_code=400, detail="File not found")
-    rows = []
-    with open(path, newline="") as f:
-        reader = csv.DictReader(f)
-        for i, row in enumerate(reader):
-            if i >= max_rows:
+    rows = iter_table(path, offset, max_rows, **table_opts)
+    columns = next(rows)
+    return columns, list(rows)
+
+
+def read_page(path: str, max_rows: int = 1000, offset: int = 0, cache: Optional[ParsedFileCache] = None, full_parse_bytes: int = 0, **table_opts):
+    # Returns (columns, rows, next_offset). With a cache, one parse serves every page inside
+    # the cached prefix; files up to full_parse_bytes are parsed to the end on first read.
+    need = offset + max_rows + 1
+    if cache is None:
+        started = time.perf_counter()
+        columns, rows = read_table(path, max_rows=max_rows + 1, offset=offset, **table_opts)
+        observe_stage("file_parse", started)
+    else:
+        # Sheet, projection and filters change what is parsed, so they are part of the key
+        variant = json.dumps(table_opts, sort_keys=True, default=str)
+        key = cache.key(path, variant)
+        started = time.perf_counter()
+        try:
+            sig = stat_signature(path)
+        except FileNotFoundError:
+            raise HTTPException(status_code=400, detail="File not found") from None
+        observe_stage("file_stat", started)
+        hit = cache.get(key, sig, need)
+        if hit is None:
+            started = time.perf_counter()
+            limit = None if sig[1] <= full_parse_bytes else need
+            columns, parsed = read_table(path, max_rows=limit, **table_opts)
+            cache.put(key, sig, columns, parsed, complete=limit is None or len(parsed) < limit)
+            observe_stage("file_parse", started)
+        else:
+            columns, parsed = hit
+        rows = parsed[offset:need]
+    # max_rows=0 only asks for the header; a cursor equal to offset would never advance
+    next_offset = offset + max_rows if max_rows and len(rows) > max_rows else None
+    return columns, rows[:max_rows], next_offset
+
+
+def _value_kind(value) -> str:
+    # XLSX cells arrive already typed
+    if isinstance(value, bool):
+        return "str"
+    if isinstance(value, int):
+        return "int"
+    if isinstance(value, float):
+        return "float" if math.isfinite(value) else "str"
+    if not isinstance(value, str):
+        return "str"
+    # "1_000", "nan" and "inf" parse in Python but are not portable JSON numbers
+    if "_" in value:
+        return "str"
+    try:
+        int(value)
+        return "int"
+    except ValueError:
+        pass
+    try:
+        return "float" if math.isfinite(float(value)) else "str"
+    except ValueError:
+        return "str"
+
+
+def infer_column_types(columns: List[str], rows: List[list]) -> List[str]:
+    # A column is numeric when every non-empty value parses as a number
+    types = []
+    for i in range(len(columns)):
+        kind = "int"
+        for row in rows:
+            value = row[i]
+            if value is None or value == "":
+                continue
+            value_kind = _value_kind(value)
+            if value_kind == "str":
+                kind = "str"
                 break
-            rows.append(row)
-    return rows
+            if value_kind == "float":
+                kind = "float"
+        types.append(kind)
+    return types
+
+
+def apply_types(rows: List[list], types: List[str]) -> List[list]:
+    # Returns new row lists; the input may be shared with the parsed-file cache
+    numeric = [(i, int if t == "int" else float) for i, t in enumerate(types) if t != "str"]
+    if not numeric:
+        return rows
+    typed = []
+    for row in rows:
+        row = list(row)
+        for i, cast in numeric:
+            value = row[i]
+            row[i] = None if value is None or value == "" else cast(value)
+        typed.append(row)
+    return typed
+
+
+def format_table(columns: List[str], rows: List[list], fmt: str = "records") -> dict:
+    if fmt == "rows":
+        return {"columns": columns, "rows": rows}
+    if fmt == "columnar":
+        return {"columns": columns, "data": [list(col) for col in zip(*rows)] if rows else [[] for _ in columns]}
+    return {"rows": [dict(zip(columns, row)) for row in rows]}
+
+
+def read_result(path: str, max_rows: int = 1000, offset: int = 0, fmt: str = "records", infer_types: bool = False, rights=None, cache: Optional[ParsedFileCache] = None, full_parse_bytes: int = 0, **table_opts) -> dict:
+    columns, rows, next_offset = read_page(path, max_rows, offset, cache=cache, full_parse_bytes=full_parse_bytes, **table_opts)
+    result = {"rights": rights}
+    if infer_types:
+        types = infer_column_types(columns, rows)
+        rows = apply_types(rows, types)
+        result["types"] = dict(zip(columns, types))
+    result.update(format_table(columns, rows, fmt))
+    result.update({"count": len(rows), "next_offset": next_offset})
+    if fmt != "records":
+        result["format"] = fmt
+    return result
+
+
+def iter_row_batches(path: str, max_rows: int = 1000, offset: int = 0, fmt: str = "records", batch_rows: int = NDJSON_CHUNK_ROWS, **table_opts) -> Iterator[Tuple[str, Any]]:
+    # Yields ("columns", names), then ("rows", batch) for each batch of at most
+    # batch_rows shaped rows, then ("end", {"count", "next_offset"}).
+    rows = iter_table(path, offset, max_rows + 1, **table_opts)
+    columns = next(rows)
+    yield "columns", columns
+    count, more, batch = 0, False, []
+    for row in rows:
+        if count == max_rows:
+            more = True
+            break
+        batch.append(row if fmt == "rows" else dict(zip(columns, row)))
+        count += 1
+        if len(batch) >= batch_rows:
+            yield "rows", batch
+            batch = []
+    if batch:
+        yield "rows", batch
+    yield "end", {"count": count, "next_offset": offset + count if more and count else None}
+
+
+def iter_ndjson(path: str, max_rows: int = 1000, offset: int = 0, rights=None, fmt: str = "records", **table_opts) -> Iterator[str]:
+    # One JSON row per line, then a trailer line carrying the paging cursor.
+    # In "rows" format the first line is {"columns": [...]} and rows are value arrays.
+    for kind, value in iter_row_batches(path, max_rows, offset, fmt, **table_opts):
+        if kind == "rows":
+            yield "\n".join([json.dumps(row, separators=(",", ":")) for row in value]) + "\n"
+        elif kind == "columns":
+            if fmt == "rows":
+                yield json.dumps({"columns": value}, separators=(",", ":")) + "\n"
+        else:
+            yield json.dumps({"__end__": {**value, "rights": rights}}) + "\n"
@@ -1,34 +1,121 @@
 # python
-from typing import Any, Tuple
+from typing import Any, Awaitable, Callable, List, Optional, Tuple
 import httpx
 import asyncio
+import time
 
-async def evaluate(opa_url: str, subject: dict, action: str, resource: dict, retries: int = 3, timeout: float = 2.0) -> Tuple[bool, Any]:
-    last_exc = None
-    for attempt in range(1, retries + 1):
-        try:
-            async with httpx.AsyncClient(timeout=timeout) as client:
-                resp = await client.post(
-                    f"{opa_url}/v1/data/mcp/authz/allow",
-                    json={"input": {"subject": subject, "action": action, "resource": resource}},
-                )
-            if resp.status_code == 200:
-                data = resp.json()
-                # Normalize result to include rights if provided by policy
-                result = data.get("result")
-                if isinstance(result, dict):
-                    allowed = bool(result.get("allow", False)) or result == {}
+from ...utils.metrics import OPA_ATTEMPTS, OPA_RETRIES, OPA_SHORT_CIRCUITED, observe_stage
+from ...utils.resilience import CLOSED, CircuitBreaker, RetryBudget, backoff_delay
+
+async def _post(client: Optional[httpx.AsyncClient], url: str, body: dict, timeout: float) -> httpx.Response:
+    if client is None:
+        # Legacy path: throwaway client (new TCP connection per call)
+        async with httpx.AsyncClient(timeout=timeout) as tmp:
+            return await tmp.post(url, json=body)
+    return await client.post(url, json=body, timeout=timeout)
+
+def _decision(data: dict) -> Tuple[bool, Any]:
+    # Normalize result to include rights if provided by policy
+    result = data.get("result")
+    if isinstance(result, dict):
+        allowed = bool(result.get("allow", False)) or result == {}
+    else:
+        allowed = bool(result)
+    # Rights from policy (rights field) if present
+    rights = None
+    if isinstance(result, dict) and "rights" in result:
+        rights = result["rights"]
+    return allowed, {"result": result, "rights": rights}
+
+async def evaluate(
+    opa_url: str, subject: dict, action: str, resource: dict, retries: int = 3, timeout: float = 2.0,
+    client: Optional[httpx.AsyncClient] = None, *, breaker: Optional[CircuitBreaker] = None,
+    budget: Optional[RetryBudget] = None, deadline: Optional[float] = None,
+    backoff_base: float = 0.05, backoff_max: float = 0.5,
+) -> Tuple[bool, Any]:
+    # deadline is a time.monotonic() value; no attempt or backoff sleep runs past it
+    if breaker is not None and not breaker.allow():
+        OPA_SHORT_CIRCUITED.inc()
+        return False, {"reason": "OPA unreachable: circuit open", "circuit": breaker.state}
+    if budget is not None:
+        budget.deposit()
+    last_exc, reason = None, f"OPA unreachable after {retries} attempts"
+    url = f"{opa_url}/v1/data/mcp/authz/allow"
+    body = {"input": {"subject": subject, "action": action, "resource": resource}}
+    settled = False
+    try:
+        for attempt in range(1, retries + 1):
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                reason = "OPA unreachable: request deadline exceeded"
+                break
+            started = time.perf_counter()
+            try:
+                if remaining is None:
+                    resp = await _post(client, url, body, timeout)
                 else:
-                    allowed = bool(result)
-                # Rights from policy (rights field) if present
-                rights = None
-                if isinstance(result, dict) and "rights" in result:
-                    rights = result["rights"]
-                return allowed, {"result": result, "rights": rights}
-            return False, {"reason": f"OPA HTTP {resp.status_code}", "body": resp.text}
-        except (httpx.ConnectTimeout, httpx.ReadTimeout) as exc:
-            last_exc = exc
-            await asyncio.sleep(0.2 * attempt)
-        except httpx.HTTPError as exc:
-            return False, {"reason": f"OPA HTTP error: {exc}"}
-    return False, {"reason": f"OPA unreachable after {retries} attempts", "error": str(last_exc)}
+                    async with asyncio.timeout(remaining):
+                        resp = await _post(client, url, body, min(timeout, remaining))
+                observe_stage("opa_http", started)
+                OPA_ATTEMPTS.inc(1, ("ok" if resp.status_code == 200 else f"http_{resp.status_code}",))
+                if breaker is not None:
+                    # A 4xx is a bad query, not a sick OPA
+                    if resp.status_code >= 500:
+                        breaker.record_failure()
+                    else:
+                        breaker.record_success()
+                    settled = True
+                if resp.status_code == 200:
+                    return _decision(resp.json())
+                if resp.status_code >= 500:
+                    return False, {"reason": f"OPA unreachable: HTTP {resp.status_code}", "body": resp.text}
+                return False, {"reason": f"OPA HTTP {resp.status_code}", "body": resp.text}
+            except (httpx.TimeoutException, httpx.ConnectError, TimeoutError) as exc:
+                # Nothing usable came back: retry, within the breaker, budget and deadline
+                observe_stage("opa_http", started)
+                OPA_ATTEMPTS.inc(1, ("timeout" if not isinstance(exc, httpx.ConnectError) else "connect_error",))
+                last_exc = exc
+                if breaker is not None:
+                    breaker.record_failure()
+                    settled = True
+                    if breaker.state != CLOSED:
+                        reason = "OPA unreachable: circuit opened"
+                        break
+                if attempt == retries:
+                    break
+                if budget is not None and not budget.try_spend():
+                    reason = "OPA unreachable: retry budget exhausted"
+                    break
+                delay = backoff_delay(attempt, backoff_base, backoff_max)
+                if deadline is not None and time.monotonic() + delay >= deadline:
+                    reason = "OPA unreachable: request deadline exceeded"
+                    break
+                OPA_RETRIES.inc()
+                await asyncio.sleep(delay)
+            except httpx.HTTPError as exc:
+                OPA_ATTEMPTS.inc(1, ("error",))
+                return False, {"reason": f"OPA HTTP error: {exc}"}
+    finally:
+        if breaker is not None and not settled:
+            breaker.release()
+    return False, {"reason": reason, "error": str(last_exc) if last_exc else None}
+
+async def evaluate_batch(evaluate_one: Callable[[str, dict], Awaitable[Tuple[bool, Any]]], items: List[dict], concurrency: int = 8) -> List[dict]:
+    # Fan out with a bounded number in flight; a failing item never fails the batch
+    sem = asyncio.Semaphore(max(1, concurrency))
+
+    async def run(item: Any) -> dict:
+        if not isinstance(item, dict) or not isinstance(item.get("action"), str) or not isinstance(item.get("resource", {}), dict):
+            return {"allow": False, "rights": None, "error": "Each item needs a string 'action' and an object 'resource'"}
+        async with sem:
+            try:
+                allowed, details = await evaluate_one(item["action"], item.get("resource", {}))
+            except Exception as exc:
+                return {"allow": False, "rights": None, "error": f"{type(exc).__name__}: {exc}"}
+        out = {"allow": allowed, "rights": details.get("rights") if isinstance(details, dict) else None}
+        if not allowed and isinstance(details, dict) and "result" not in details:
+            # Transport problem rather than a policy deny
+            out["error"] = details.get("reason", "evaluation failed")
+        return out
+
+    return list(await asyncio.gather(*(run(item) for item in items)))
@@ -0,0 +1,2 @@
+# python
+# package marker for shared helpers
@@ -0,0 +1,183 @@
+# python
+import bisect
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import List, Optional, Tuple
+
+from .file_cache import StatSig, stat_signature
+from .uploads import file_sha256
+
+CATALOG_EXTENSIONS = (".csv", ".xlsx", ".xlsm")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    owner TEXT NOT NULL DEFAULT '',
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    sha256 TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    columns TEXT,
+    row_count INTEGER,
+    error TEXT,
+    indexed_at REAL NOT NULL
+)
+"""
+_FIELDS = ("path", "owner", "size", "mtime_ns", "sha256", "kind", "columns", "row_count", "error", "indexed_at")
+
+
+def _row_to_entry(row: tuple) -> dict:
+    entry = dict(zip(_FIELDS, row))
+    entry["columns"] = json.loads(entry["columns"]) if entry["columns"] else None
+    return entry
+
+
+def _matches(entry: Optional[dict], sig: StatSig) -> bool:
+    return entry is not None and (entry["mtime_ns"], entry["size"]) == sig
+
+
+class FileCatalog:
+    """Index of the tables under DATA_DIR: owner, size, sha256, mtime, columns and row count.
+
+    Persisted in SQLite; every lookup and listing is served from an in-memory copy kept in
+    path order. Entries are keyed by path relative to data_dir and refreshed when the file's
+    (mtime, size) changes. Indexing parses the file, so it belongs on the file worker pool.
+    Safe to use from worker threads.
+    """
+
+    def __init__(self, db_path: str, data_dir: str, table_schema):
+        # table_schema(path, kind) -> (columns, row_count); injected to keep parsing in the reader module
+        self.data_dir = data_dir
+        self.table_schema = table_schema
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA busy_timeout=5000")
+        self._db.execute(_SCHEMA)
+        self._entries: dict[str, dict] = {}
+        self._order: List[str] = []
+        self.scanned_at: Optional[float] = None
+        self.indexed = 0
+        self.load()
+
+    def load(self) -> None:
+        # Replace the in-memory view with what is on disk (written by any worker)
+        with self._lock:
+            rows = self._db.execute(f"SELECT {', '.join(_FIELDS)} FROM files").fetchall()
+            self._entries = {row[0]: _row_to_entry(row) for row in rows}
+            self._order = sorted(self._entries)
+
+    def reload(self, rel: str) -> None:
+        # One entry changed elsewhere (another worker or replica)
+        with self._lock:
+            row = self._db.execute(f"SELECT {', '.join(_FIELDS)} FROM files WHERE path = ?", (rel,)).fetchone()
+            self._set(rel, _row_to_entry(row) if row else None)
+
+    def _set(self, rel: str, entry: Optional[dict]) -> None:
+        i = bisect.bisect_left(self._order, rel)
+        present = i < len(self._order) and self._order[i] == rel
+        if entry is None:
+            self._entries.pop(rel, None)
+            if present:
+                del self._order[i]
+            return
+        self._entries[rel] = entry
+        if not present:
+            self._order.insert(i, rel)
+
+    def get(self, rel: str) -> Optional[dict]:
+        return self._entries.get(rel)
+
+    def owner(self, rel: str) -> str:
+        entry = self._entries.get(rel)
+        return entry["owner"] if entry else ""
+
+    def fresh(self, rel: str) -> Optional[dict]:
+        # Blocking: the entry for the file as it is on disk now, indexed first if needed
+        path = os.path.join(self.data_dir, rel)
+        try:
+            sig = stat_signature(path)
+        except FileNotFoundError:
+            self.remove(rel)
+            return None
+        entry = self._entries.get(rel)
+        return entry if _matches(entry, sig) else self.index(rel)
+
+    def index(self, rel: str, owner: Optional[str] = None, sha256: Optional[str] = None) -> Optional[dict]:
+        # Blocking. owner=None keeps the current owner; sha256 may be passed when already known.
+        path = os.path.join(self.data_dir, rel)
+        try:
+            mtime_ns, size = stat_signature(path)
+            kind = "xlsx" if path.lower().endswith((".xlsx", ".xlsm")) else "csv"
+            digest = sha256 or file_sha256(path)
+            columns = row_count = error = None
+            try:
+                columns, row_count = self.table_schema(path, kind)
+            except Exception as exc:
+                # Still listed, so the owner and hash are known; readers get the parse error as usual
+                error = f"{type(exc).__name__}: {getattr(exc, 'detail', exc)}"
+        except FileNotFoundError:
+            self.remove(rel)
+            return None
+        if owner is None:
+            owner = self.owner(rel)
+        entry = {"path": rel, "owner": owner, "size": size, "mtime_ns": mtime_ns, "sha256": digest, "kind": kind,
+                 "columns": columns, "row_count": row_count, "error": error, "indexed_at": time.time()}
+        values = [json.dumps(columns) if f == "columns" and columns is not None else entry[f] for f in _FIELDS]
+        with self._lock:
+            self._db.execute(f"INSERT OR REPLACE INTO files ({', '.join(_FIELDS)}) VALUES ({', '.join('?' * len(_FIELDS))})", values)
+            self._set(rel, entry)
+        self.indexed += 1
+        return entry
+
+    def remove(self, rel: str) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM files WHERE path = ?", (rel,))
+            self._set(rel, None)
+
+    def scan(self) -> dict:
+        # Blocking: bring the index in line with DATA_DIR. Unchanged files are not reopened.
+        seen, changed = set(), 0
+        for root, dirs, files in os.walk(self.data_dir):
+            dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+            for name in files:
+                if name.startswith(".") or not name.lower().endswith(CATALOG_EXTENSIONS):
+                    continue
+                rel = os.path.relpath(os.path.join(root, name), self.data_dir)
+                seen.add(rel)
+                try:
+                    sig = stat_signature(os.path.join(root, name))
+                except FileNotFoundError:
+                    continue
+                if not _matches(self._entries.get(rel), sig):
+                    # Another worker scanning at the same time may have indexed it already
+                    self.reload(rel)
+                    if not _matches(self._entries.get(rel), sig):
+                        self.index(rel)
+                        changed += 1
+        # Uploads of other types are indexed too, so only drop entries whose file is gone
+        removed = [rel for rel in list(self._order) if rel not in seen and not os.path.exists(os.path.join(self.data_dir, rel))]
+        for rel in removed:
+            self.remove(rel)
+        self.scanned_at = time.time()
+        return {"files": len(seen), "indexed": changed, "removed": len(removed)}
+
+    def page(self, prefix: str = "", offset: int = 0, limit: int = 100) -> Tuple[List[dict], Optional[int]]:
+        # Entries in path order whose path starts with prefix; returns them and the next offset
+        with self._lock:
+            start = bisect.bisect_left(self._order, prefix)
+            end = bisect.bisect_left(self._order, prefix + "\U0010ffff") if prefix else len(self._order)
+            window = self._order[start + offset:min(end, start + offset + limit)]
+            entries = [self._entries[rel] for rel in window]
+        more = start + offset + limit < end
+        return entries, offset + len(entries) if more else None
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def stats(self) -> dict:
+        return {"files": len(self._entries), "indexed": self.indexed, "scanned_at": self.scanned_at}
@@ -0,0 +1,202 @@
+# python
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Optional, Tuple
+
+from .shared_state import SharedState, SharedStateUnavailable
+
+Decision = Tuple[bool, Any]
+
+# Subject claims that authz.rego actually reads; everything else (token, iat, ...) is ignored
+SUBJECT_KEY_FIELDS = ("sub", "role")
+
+
+def decision_key(subject: dict, action: str, resource: dict) -> str:
+    subj = {k: subject.get(k) for k in SUBJECT_KEY_FIELDS}
+    return json.dumps([subj, action, resource], sort_keys=True, separators=(",", ":"), default=str)
+
+
+def is_cacheable(decision: Decision) -> bool:
+    # Only real policy answers are cached, never transport errors
+    _, details = decision
+    return isinstance(details, dict) and "result" in details
+
+
+class DecisionCache:
+    """Bounded LRU of authorization decisions with separate allow/deny TTLs.
+
+    Concurrent misses for the same key share a single loader call. With stale_ttl > 0
+    expired entries are kept that much longer so get_stale() can answer while the
+    policy engine is unreachable. With a distributed `shared` backend, local misses
+    check a second tier that every worker fills, keyed by the policy generation.
+    """
+
+    def __init__(self, maxsize: int = 10000, allow_ttl: float = 30.0, deny_ttl: float = 5.0, stale_ttl: float = 0.0,
+                 shared: Optional[SharedState] = None):
+        self.maxsize = maxsize
+        self.allow_ttl = allow_ttl
+        self.deny_ttl = deny_ttl
+        self.stale_ttl = stale_ttl
+        self._entries: "OrderedDict[str, Tuple[float, Decision]]" = OrderedDict()
+        self._inflight: dict[str, asyncio.Future] = {}
+        self._generation = 0
+        # An in-process backend would only duplicate the local entries
+        self.shared = shared if shared is not None and shared.distributed else None
+        self.shared_generation = 0
+        self.shared_hits = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.coalesced = 0
+        self.stale_served = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0 and (self.allow_ttl > 0 or self.deny_ttl > 0)
+
+    def get(self, key: str) -> Optional[Decision]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires, decision = entry
+        now = time.monotonic()
+        if now >= expires:
+            if now >= expires + self.stale_ttl:
+                del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return decision
+
+    def get_stale(self, key: str) -> Optional[Decision]:
+        # Last known decision for the key, even if expired, as long as it is within stale_ttl
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires, decision = entry
+        if time.monotonic() >= expires + self.stale_ttl:
+            del self._entries[key]
+            return None
+        self.stale_served += 1
+        return decision
+
+    def put(self, key: str, decision: Decision, started: float) -> None:
+        # TTL counts from when the query was sent, so an entry never outlives it
+        ttl = self.allow_ttl if decision[0] else self.deny_ttl
+        if ttl > 0:
+            self._store(key, decision, started + ttl)
+
+    def _store(self, key: str, decision: Decision, expires: float) -> None:
+        self._entries[key] = (expires, decision)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def get_or_load(self, key: str, loader: Callable[[], Awaitable[Decision]]) -> Decision:
+        if not self.enabled:
+            return await loader()
+        decision = self.get(key)
+        if decision is not None:
+            self.hits += 1
+            return decision
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.coalesced += 1
+            try:
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                # The leading request was cancelled, not us: load on our own
+                if not pending.cancelled() or asyncio.current_task().cancelling():
+                    raise
+                return await loader()
+        self.misses += 1
+        fut = asyncio.get_running_loop().create_future()
+        self._inflight[key] = fut
+        generation, started = self._generation, time.monotonic()
+        try:
+            decision, remaining = await self._load(key, loader)
+        except asyncio.CancelledError:
+            fut.cancel()
+            raise
+        except BaseException as exc:
+            fut.set_exception(exc)
+            # Mark retrieved so an exception nobody else awaited does not get logged
+            fut.exception()
+            raise
+        else:
+            fut.set_result(decision)
+            if generation == self._generation and is_cacheable(decision):
+                if remaining is not None:
+                    self._store(key, decision, time.monotonic() + remaining)
+                else:
+                    self.put(key, decision, started)
+                    if self.shared is not None:
+                        await self._share(key, decision, started)
+            return decision
+        finally:
+            if self._inflight.get(key) is fut:
+                del self._inflight[key]
+
+    def _shared_key(self, key: str) -> str:
+        # Bumping the policy generation orphans every old entry; they expire on their own
+        return f"decision:{self.shared_generation}:{hashlib.sha256(key.encode()).hexdigest()}"
+
+    async def _load(self, key: str, loader: Callable[[], Awaitable[Decision]]) -> Tuple[Decision, Optional[float]]:
+        # Returns the decision and, if it came from the shared tier, how long it has left
+        if self.shared is not None:
+            try:
+                raw = await self.shared.get(self._shared_key(key))
+            except SharedStateUnavailable:
+                raw = None
+            if raw is not None:
+                allowed, details, expires_at = json.loads(raw)
+                remaining = expires_at - time.time()
+                if remaining > 0:
+                    self.shared_hits += 1
+                    return (allowed, details), remaining
+        return await loader(), None
+
+    async def _share(self, key: str, decision: Decision, started: float) -> None:
+        ttl = (self.allow_ttl if decision[0] else self.deny_ttl) - (time.monotonic() - started)
+        if ttl <= 0:
+            return
+        value = json.dumps([decision[0], decision[1], time.time() + ttl], separators=(",", ":"), default=str)
+        try:
+            await self.shared.set(self._shared_key(key), value, ttl)
+        except SharedStateUnavailable:
+            pass
+
+    async def sync_generation(self) -> None:
+        if self.shared is not None:
+            try:
+                self.shared_generation = int(await self.shared.get("policy_generation") or 0)
+            except SharedStateUnavailable:
+                pass
+
+    def invalidate(self, generation: Optional[int] = None) -> None:
+        # Called on policy reload; in-flight loads from the old generation are not stored
+        self._entries.clear()
+        self._inflight.clear()
+        self._generation += 1
+        if generation is not None:
+            self.shared_generation = max(self.shared_generation, generation)
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "coalesced": self.coalesced,
+            "stale_served": self.stale_served,
+            "shared": self.shared is not None,
+            "shared_hits": self.shared_hits,
+            "shared_generation": self.shared_generation,
+            "allow_ttl": self.allow_ttl,
+            "deny_ttl": self.deny_ttl,
+            "stale_ttl": self.stale_ttl,
+        }
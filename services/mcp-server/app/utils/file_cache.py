@@ -0,0 +1,115 @@
+# python
+import os
+import sys
+import threading
+from collections import OrderedDict
+from typing import List, NamedTuple, Optional, Tuple
+
+StatSig = Tuple[int, int]
+
+
+def stat_signature(path: str) -> StatSig:
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+class _Entry(NamedTuple):
+    sig: StatSig
+    columns: List[str]
+    rows: List[list]
+    complete: bool
+    nbytes: int
+
+
+def estimate_bytes(columns: List[str], rows: List[list]) -> int:
+    size = sys.getsizeof(columns) + sum(sys.getsizeof(c) for c in columns) + sys.getsizeof(rows)
+    for row in rows:
+        size += sys.getsizeof(row)
+        for value in row:
+            size += sys.getsizeof(value)
+    return size
+
+
+class ParsedFileCache:
+    """Memory-capped LRU of parsed tables keyed by real path and validated against os.stat.
+
+    An entry holds a prefix of the file's rows (or all of them when `complete`),
+    so any page that fits inside the prefix is served without re-parsing.
+    Cached rows are shared: callers must not mutate them. Safe to use from worker threads.
+    """
+
+    def __init__(self, max_bytes: int = 128 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes_held = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def key(path: str, variant: str = "") -> str:
+        # variant separates different parses of one file (sheet, column projection)
+        return os.path.realpath(path) + "\0" + variant
+
+    def get(self, key: str, sig: StatSig, need_rows: int) -> Optional[Tuple[List[str], List[list]]]:
+        with self._lock:
+            return self._get(key, sig, need_rows)
+
+    def _get(self, key: str, sig: StatSig, need_rows: int) -> Optional[Tuple[List[str], List[list]]]:
+        entry = self._entries.get(key)
+        if entry is not None and entry.sig != sig:
+            # File changed on disk since it was parsed
+            self._drop(key)
+            entry = None
+        if entry is None or (not entry.complete and len(entry.rows) < need_rows):
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry.columns, entry.rows
+
+    def put(self, key: str, sig: StatSig, columns: List[str], rows: List[list], complete: bool) -> None:
+        if self.max_bytes <= 0:
+            return
+        nbytes = estimate_bytes(columns, rows)
+        if nbytes > self.max_bytes:
+            return
+        with self._lock:
+            self._put(key, _Entry(sig, columns, rows, complete, nbytes))
+
+    def _put(self, key: str, entry: _Entry) -> None:
+        nbytes = entry.nbytes
+        self._drop(key)
+        self._entries[key] = entry
+        self.bytes_held += nbytes
+        while self.bytes_held > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._drop(oldest)
+            self.evictions += 1
+
+    def invalidate(self, path: str) -> None:
+        # Drops every variant of the file
+        prefix = self.key(path)
+        with self._lock:
+            for key in [k for k in self._entries if k.startswith(prefix)]:
+                self._drop(key)
+                self.invalidations += 1
+
+    def _drop(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.bytes_held -= entry.nbytes
+
+    def stats(self) -> dict:
+        # Read without the lock; counters may be momentarily inconsistent
+        return {
+            "entries": len(self._entries),
+            "bytes_held": self.bytes_held,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
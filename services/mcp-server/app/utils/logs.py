@@ -0,0 +1,177 @@
+# python
+import contextvars
+import json
+import logging
+import queue
+import random
+import re
+import sys
+import time
+import uuid
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Optional
+
+from .metrics import REGISTRY
+
+# Structured JSON logs. Request handlers only put a small tuple on a queue; building
+# the LogRecord, redaction, JSON encoding and the stdout write all happen on the
+# listener thread, so a slow log consumer never stalls the event loop.
+
+LOGGER_NAME = "mcp"
+REDACTED = "[REDACTED]"
+SECRET_KEYS = frozenset({"token", "authorization", "access_token", "id_token", "refresh_token", "password", "client_secret", "code_verifier"})
+_BEARER = re.compile(r"(?i)\bbearer\s+[\w\-.~+/]+=*")
+_JWT = re.compile(r"\beyJ[\w-]*\.[\w-]+\.[\w-]*")
+_REQUEST_ID_OK = re.compile(r"^[\w.\-:]{1,128}$")
+
+request_id: contextvars.ContextVar[str] = contextvars.ContextVar("request_id", default="-")
+LOG_RECORDS_DROPPED = REGISTRY.counter("mcp_log_records_dropped_total", "Log records dropped because the log queue was full.")
+
+_sample_rate = 1.0
+_records: Optional[queue.Queue] = None
+
+
+def redact(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {k: REDACTED if str(k).lower() in SECRET_KEYS else redact(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [redact(v) for v in value]
+    # The substring checks skip both regexes for the common case of plain values
+    if isinstance(value, str) and ("eyJ" in value or "earer" in value):
+        return _JWT.sub(REDACTED, _BEARER.sub("Bearer " + REDACTED, value))
+    return value
+
+
+class JsonFormatter(logging.Formatter):
+    _second = -1
+    _prefix = ""
+
+    def _timestamp(self, created: float) -> str:
+        second = int(created)
+        if second != self._second:
+            self._second, self._prefix = second, time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(second))
+        return f"{self._prefix}.{int((created - second) * 1000):03d}Z"
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": self._timestamp(record.created),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "event": record.getMessage(),
+            "request_id": getattr(record, "request_id", "-"),
+        }
+        fields = getattr(record, "fields", None)
+        if fields:
+            entry.update(redact(fields))
+        if record.exc_info:
+            entry["exc"] = redact(self.formatException(record.exc_info))
+        return json.dumps(entry, default=str, separators=(",", ":"))
+
+
+class _Listener(QueueListener):
+    def prepare(self, record):
+        # log_event enqueues plain tuples; turn them into records here, off the caller's thread
+        if isinstance(record, tuple):
+            created, level, name, event, rid, fields = record
+            record = logging.LogRecord(name, level, "", 0, event, None, None)
+            record.created, record.request_id, record.fields = created, rid, fields
+        return record
+
+
+class _EnqueueHandler(QueueHandler):
+    """QueueHandler that defers all formatting to the listener and drops instead of blocking."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Captured here because the context variable is not visible from the listener thread
+        record.request_id = request_id.get()
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.inc()
+
+
+def configure_logging(level: str = "INFO", sample_rate: float = 1.0, queue_size: int = 10000, stream=None) -> QueueListener:
+    """Routes the "mcp" logger through a bounded queue; start()/stop() the returned listener."""
+    global _sample_rate, _records
+    _sample_rate = max(0.0, min(1.0, sample_rate))
+    _records = records = queue.Queue(maxsize=queue_size)
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(JsonFormatter())
+    logger = logging.getLogger(LOGGER_NAME)
+    logger.handlers[:] = [_EnqueueHandler(records)]
+    logger.setLevel(level.upper())
+    logger.propagate = False
+    return _Listener(records, output, respect_handler_level=False)
+
+
+def get_logger(name: str = "") -> logging.Logger:
+    return logging.getLogger(f"{LOGGER_NAME}.{name}" if name else LOGGER_NAME)
+
+
+def log_event(logger: logging.Logger, event: str, level: int = logging.INFO, sampled: bool = False, **fields) -> None:
+    """Log one structured event. sampled=True marks a success path subject to LOG_SAMPLE_RATE;
+    denials and errors should leave it False so they are always logged."""
+    if not logger.isEnabledFor(level):
+        return
+    if sampled and _sample_rate < 1.0 and random.random() >= _sample_rate:
+        return
+    if _records is None:
+        logger.log(level, event, extra={"fields": fields})
+        return
+    try:
+        _records.put_nowait((time.time(), level, logger.name, event, request_id.get(), fields))
+    except queue.Full:
+        LOG_RECORDS_DROPPED.inc()
+
+
+def new_request_id(incoming: Optional[str]) -> str:
+    # Reuse a caller-supplied id only when it is short and harmless to echo back
+    if incoming and _REQUEST_ID_OK.match(incoming):
+        return incoming
+    return uuid.uuid4().hex
+
+
+class RequestContextMiddleware:
+    """Pure ASGI middleware: sets the correlation id from X-Request-ID (or a fresh one),
+    echoes it on the response and writes one access-log line per request."""
+
+    def __init__(self, app, logger: Optional[logging.Logger] = None, exclude: tuple = ("/healthz", "/metrics")):
+        self.app = app
+        self.logger = logger or get_logger("http")
+        self.exclude = exclude
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        incoming = None
+        for name, value in scope["headers"]:
+            if name == b"x-request-id":
+                incoming = value.decode("latin-1")
+                break
+        rid = new_request_id(incoming)
+        token = request_id.set(rid)
+        started = time.perf_counter()
+        status = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [(b"x-request-id", rid.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception:
+            self.logger.exception("http.unhandled", extra={"fields": {"method": scope["method"], "path": scope["path"]}})
+            raise
+        finally:
+            if scope["path"] not in self.exclude:
+                code = status[0]
+                level = logging.ERROR if code >= 500 else logging.WARNING if code >= 400 else logging.INFO
+                log_event(self.logger, "http.request", level, sampled=code < 400, method=scope["method"], path=scope["path"], status=code,
+                          duration_ms=round((time.perf_counter() - started) * 1000, 3))
+            request_id.reset(token)
@@ -0,0 +1,245 @@
+# python
+import asyncio
+import bisect
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Minimal Prometheus text-format metrics. Recording is a dict update under an
+# uncontended lock, so it is cheap enough for every request and every stage;
+# all formatting work happens in render(), i.e. only when /metrics is scraped.
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_enabled = True
+
+
+def configure(enabled: bool) -> None:
+    global _enabled
+    _enabled = enabled
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _num(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, doc: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.doc = doc
+        self.labelnames = labelnames
+        self._lock = threading.Lock()
+
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, doc: str, labelnames: Tuple[str, ...] = ()):
+        super().__init__(name, doc, labelnames)
+        self._values: Dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1, labels: tuple = ()) -> None:
+        if not _enabled:
+            return
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, labels: tuple = ()) -> float:
+        return self._values.get(labels, 0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return self._header() + [f"{self.name}{_labels(self.labelnames, k)} {_num(v)}" for k, v in items]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, doc: str, labelnames: Tuple[str, ...] = (), fn: Optional[Callable[[], float]] = None):
+        super().__init__(name, doc, labelnames)
+        self._values: Dict[tuple, float] = {}
+        # A callback gauge is sampled at scrape time and costs nothing in between
+        self._fn = fn
+
+    def set(self, value: float, labels: tuple = ()) -> None:
+        if not _enabled:
+            return
+        self._values[labels] = value
+
+    def inc(self, amount: float = 1, labels: tuple = ()) -> None:
+        if not _enabled:
+            return
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, amount: float = 1, labels: tuple = ()) -> None:
+        self.inc(-amount, labels)
+
+    def value(self, labels: tuple = ()) -> float:
+        return self._values.get(labels, 0)
+
+    def render(self) -> List[str]:
+        if self._fn is not None:
+            return self._header() + [f"{self.name} {_num(self._fn())}"]
+        with self._lock:
+            items = list(self._values.items())
+        return self._header() + [f"{self.name}{_labels(self.labelnames, k)} {_num(v)}" for k, v in items]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, doc: str, labelnames: Tuple[str, ...] = (), buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, doc, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [count per bucket (+Inf last, not cumulative), sum, count]
+        self._series: Dict[tuple, list] = {}
+
+    def observe(self, value: float, labels: tuple = ()) -> None:
+        if not _enabled:
+            return
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, labels: tuple = ()) -> int:
+        series = self._series.get(labels)
+        return series[2] if series else 0
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = [(k, (list(s[0]), s[1], s[2])) for k, s in self._series.items()]
+        lines = self._header()
+        for labels, (counts, total, count) in items:
+            running = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                running += n
+                le = 'le="' + _num(bound) + '"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {running}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_num(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Duplicate metric {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, doc: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        return self.register(Counter(name, doc, labelnames))
+
+    def gauge(self, name: str, doc: str, labelnames: Tuple[str, ...] = (), fn: Optional[Callable[[], float]] = None) -> Gauge:
+        return self.register(Gauge(name, doc, labelnames, fn))
+
+    def histogram(self, name: str, doc: str, labelnames: Tuple[str, ...] = (), buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, doc, labelnames, buckets))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+HTTP_REQUESTS = REGISTRY.counter("mcp_http_requests_total", "HTTP requests by route, method and status.", ("route", "method", "status"))
+HTTP_LATENCY = REGISTRY.histogram("mcp_http_request_duration_seconds", "Time from request start to the last response byte.", ("route",))
+HTTP_IN_FLIGHT = REGISTRY.gauge("mcp_http_requests_in_flight", "HTTP requests currently being handled.")
+HTTP_RESPONSE_BYTES = REGISTRY.counter("mcp_http_response_bytes_total", "Response body bytes sent.", ("route",))
+STAGE_LATENCY = REGISTRY.histogram("mcp_stage_duration_seconds", "Time spent in each request stage.", ("stage",))
+OPA_ATTEMPTS = REGISTRY.counter("mcp_opa_attempts_total", "HTTP attempts made to OPA by outcome.", ("outcome",))
+OPA_RETRIES = REGISTRY.counter("mcp_opa_retries_total", "OPA attempts retried after a timeout or connect error.")
+OPA_SHORT_CIRCUITED = REGISTRY.counter("mcp_opa_short_circuited_total", "OPA calls refused by the open circuit breaker.")
+OPA_STALE_DECISIONS = REGISTRY.counter("mcp_opa_stale_decisions_total", "Decisions served from expired cache entries while OPA was unavailable.")
+FILE_BYTES_READ = REGISTRY.counter("mcp_file_bytes_read_total", "Bytes read from data files by format.", ("kind",))
+EVENT_LOOP_LAG = REGISTRY.histogram(
+    "mcp_event_loop_lag_seconds", "How late the event loop woke a periodic timer.",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+
+
+def observe_stage(stage: str, started: float) -> None:
+    """Record time.perf_counter() - started under the given stage label."""
+    if _enabled:
+        STAGE_LATENCY.observe(time.perf_counter() - started, (stage,))
+
+
+async def monitor_event_loop(interval: float = 0.5) -> None:
+    loop = asyncio.get_running_loop()
+    while True:
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        EVENT_LOOP_LAG.observe(max(0.0, loop.time() - expected))
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware: request counts, latency to the last body byte, in-flight and bytes sent."""
+
+    def __init__(self, app, exclude: Tuple[str, ...] = ("/metrics",)):
+        self.app = app
+        self.exclude = exclude
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not _enabled or scope["path"] in self.exclude:
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        status = [500]
+        sent = [0]
+
+        async def send_wrapper(message):
+            kind = message["type"]
+            if kind == "http.response.start":
+                status[0] = message["status"]
+            elif kind == "http.response.body":
+                sent[0] += len(message.get("body", b""))
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            # The router stores the matched route in the scope; unmatched paths share one
+            # label so scanners cannot blow up the series count
+            route = scope.get("route")
+            label = getattr(route, "path", None) or "unmatched"
+            HTTP_REQUESTS.inc(1, (label, scope["method"], str(status[0])))
+            HTTP_LATENCY.observe(time.perf_counter() - started, (label,))
+            HTTP_RESPONSE_BYTES.inc(sent[0], (label,))
@@ -0,0 +1,118 @@
+# python
+import random
+import time
+
+from .metrics import REGISTRY
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+CIRCUIT_STATE = REGISTRY.gauge("mcp_opa_circuit_state", "OPA circuit breaker state (0 closed, 1 half-open, 2 open).")
+CIRCUIT_TRANSITIONS = REGISTRY.counter("mcp_opa_circuit_transitions_total", "OPA circuit breaker state changes.", ("to",))
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker shared by every caller of one dependency.
+
+    closed: calls pass; `failure_threshold` failures in a row open the circuit.
+    open: calls are refused until `recovery_time` has passed, then half-open.
+    half_open: up to `half_open_probes` calls go through; a success closes the
+    circuit, a failure reopens it. failure_threshold=0 disables the breaker.
+    """
+
+    def __init__(self, failure_threshold: int = 5, recovery_time: float = 5.0, half_open_probes: int = 1):
+        self.failure_threshold = failure_threshold
+        self.recovery_time = recovery_time
+        self.half_open_probes = max(1, half_open_probes)
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probes = 0
+        self.rejected = 0
+        CIRCUIT_STATE.set(0)
+
+    def _move(self, state: str) -> None:
+        if state != self.state:
+            self.state = state
+            CIRCUIT_STATE.set(_STATE_VALUES[state])
+            CIRCUIT_TRANSITIONS.inc(1, (state,))
+
+    def allow(self) -> bool:
+        if self.failure_threshold <= 0 or self.state == CLOSED:
+            return True
+        if self.state == OPEN:
+            if time.monotonic() - self.opened_at < self.recovery_time:
+                self.rejected += 1
+                return False
+            self._move(HALF_OPEN)
+            self.probes = 0
+        if self.probes >= self.half_open_probes:
+            self.rejected += 1
+            return False
+        self.probes += 1
+        return True
+
+    def record_success(self) -> None:
+        self.failures = 0
+        if self.state == HALF_OPEN:
+            self.probes = max(0, self.probes - 1)
+            self._move(CLOSED)
+
+    def record_failure(self) -> None:
+        if self.failure_threshold <= 0:
+            return
+        self.failures += 1
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+            self.probes = 0
+            self._move(OPEN)
+
+    def release(self) -> None:
+        # A call that ended without an outcome (e.g. cancelled) gives its probe slot back
+        if self.state == HALF_OPEN:
+            self.probes = max(0, self.probes - 1)
+
+    def stats(self) -> dict:
+        return {"state": self.state, "consecutive_failures": self.failures, "rejected": self.rejected}
+
+
+class RetryBudget:
+    """Caps retries at a fraction of first attempts, shared across all requests.
+
+    Each first attempt deposits `ratio` tokens, each retry spends one, and
+    `min_per_second` tokens trickle in so low traffic can still retry. During an
+    outage retries stop once the budget is spent instead of multiplying the load.
+    """
+
+    def __init__(self, ratio: float = 0.2, min_per_second: float = 1.0, max_tokens: float = 20.0):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.max_tokens = max_tokens
+        self.tokens = max_tokens
+        self._refilled = time.monotonic()
+        self.exhausted = 0
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.max_tokens, self.tokens + (now - self._refilled) * self.min_per_second)
+        self._refilled = now
+
+    def deposit(self) -> None:
+        self._refill()
+        self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        self._refill()
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return True
+        self.exhausted += 1
+        return False
+
+    def stats(self) -> dict:
+        return {"tokens": round(self.tokens, 2), "exhausted": self.exhausted}
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    # "Full jitter": uniform over [0, min(cap, base * 2^attempt)] so retries from many callers spread out
+    return random.uniform(0.0, min(cap, base * (2 ** attempt)))
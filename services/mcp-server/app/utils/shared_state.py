@@ -0,0 +1,210 @@
+# python
+import asyncio
+import json
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from .logs import get_logger, log_event
+from .metrics import REGISTRY
+
+# State every worker and replica has to agree on: /mcp sessions, upload metadata and
+# the shared tier of the decision cache, plus a broadcast channel for invalidations
+# (policy reloads, changed files). "memory" keeps it in the process, which is only
+# correct with one worker; "redis" works with any Redis-compatible server.
+
+SHARED_STATE_ERRORS = REGISTRY.counter("mcp_shared_state_errors_total", "Failed shared-state operations.", ("op",))
+SHARED_STATE_EVENTS = REGISTRY.counter("mcp_shared_state_events_total", "Broadcast events applied by this worker.", ("event", "origin"))
+
+Handler = Callable[[dict], Awaitable[None]]
+log = get_logger("shared_state")
+
+
+class SharedStateUnavailable(Exception):
+    pass
+
+
+class SharedState:
+    backend = "none"
+    # True when the state lives outside this process and is seen by other workers
+    distributed = False
+
+    def __init__(self):
+        self.worker_id = uuid.uuid4().hex[:12]
+        self._handlers: Dict[str, List[Handler]] = {}
+
+    def subscribe(self, event: str, handler: Handler) -> None:
+        self._handlers.setdefault(event, []).append(handler)
+
+    async def _dispatch(self, event: str, fields: dict, origin: str) -> None:
+        SHARED_STATE_EVENTS.inc(1, (event, origin))
+        for handler in self._handlers.get(event, ()):
+            try:
+                await handler(fields)
+            except Exception:
+                log.exception("shared_state.handler_failed", extra={"fields": {"event": event}})
+
+    async def get_json(self, key: str) -> Optional[dict]:
+        raw = await self.get(key)
+        return None if raw is None else json.loads(raw)
+
+    async def set_json(self, key: str, value, ttl: Optional[float] = None) -> None:
+        await self.set(key, json.dumps(value, separators=(",", ":")), ttl)
+
+    async def start(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+
+class MemoryState(SharedState):
+    """In-process backend: an LRU dict with per-key expiry; events go straight to local handlers."""
+
+    backend = "memory"
+
+    def __init__(self, maxsize: int = 100000):
+        super().__init__()
+        self.maxsize = maxsize
+        self._data: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+
+    async def get(self, key: str) -> Optional[str]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        if time.monotonic() >= entry[0]:
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return entry[1]
+
+    async def set(self, key: str, value: str, ttl: Optional[float] = None) -> None:
+        self._data[key] = (time.monotonic() + ttl if ttl else float("inf"), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    async def expire(self, key: str, ttl: float) -> None:
+        entry = self._data.get(key)
+        if entry is not None:
+            self._data[key] = (time.monotonic() + ttl, entry[1])
+
+    async def delete(self, key: str) -> None:
+        self._data.pop(key, None)
+
+    async def incr(self, key: str) -> int:
+        value = int(await self.get(key) or 0) + 1
+        await self.set(key, str(value))
+        return value
+
+    async def publish(self, event: str, **fields) -> bool:
+        await self._dispatch(event, fields, "local")
+        return True
+
+    def stats(self) -> dict:
+        return {"backend": self.backend, "keys": len(self._data), "maxsize": self.maxsize}
+
+
+class RedisState(SharedState):
+    """Redis (or compatible) backend. Events are applied locally first, then published;
+    each worker's listener skips its own messages. After a reconnect handlers get a
+    "resync" event, since invalidations may have been missed in between."""
+
+    backend = "redis"
+    distributed = True
+
+    def __init__(self, url: str, prefix: str = "mcp:", timeout: float = 0.25):
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise RuntimeError("SHARED_STATE_URL points at Redis but the 'redis' package is not installed") from None
+        super().__init__()
+        self._errors = (redis.RedisError, OSError, asyncio.TimeoutError)
+        self._client = redis.from_url(url, decode_responses=True, socket_timeout=timeout, socket_connect_timeout=timeout)
+        # The subscriber blocks on reads, so it gets its own connection without a read timeout
+        self._subscriber = redis.from_url(url, decode_responses=True, socket_connect_timeout=timeout, health_check_interval=30)
+        self.prefix = prefix
+        self.channel = prefix + "events"
+        self._listener: Optional[asyncio.Task] = None
+        self.connected = False
+
+    async def _call(self, op: str, awaitable):
+        try:
+            return await awaitable
+        except self._errors as exc:
+            SHARED_STATE_ERRORS.inc(1, (op,))
+            raise SharedStateUnavailable(f"shared state {op} failed: {exc}") from None
+
+    async def get(self, key: str) -> Optional[str]:
+        return await self._call("get", self._client.get(self.prefix + key))
+
+    async def set(self, key: str, value: str, ttl: Optional[float] = None) -> None:
+        px = max(1, int(ttl * 1000)) if ttl else None
+        await self._call("set", self._client.set(self.prefix + key, value, px=px))
+
+    async def expire(self, key: str, ttl: float) -> None:
+        await self._call("expire", self._client.pexpire(self.prefix + key, max(1, int(ttl * 1000))))
+
+    async def delete(self, key: str) -> None:
+        await self._call("delete", self._client.delete(self.prefix + key))
+
+    async def incr(self, key: str) -> int:
+        return int(await self._call("incr", self._client.incr(self.prefix + key)))
+
+    async def publish(self, event: str, **fields) -> bool:
+        # False when other workers could not be told; the local change still happened
+        await self._dispatch(event, fields, "local")
+        message = json.dumps({"event": event, "origin": self.worker_id, "fields": fields}, separators=(",", ":"))
+        try:
+            await self._call("publish", self._client.publish(self.channel, message))
+        except SharedStateUnavailable as exc:
+            log_event(log, "shared_state.publish_failed", logging.WARNING, event=event, error=str(exc))
+            return False
+        return True
+
+    async def start(self) -> None:
+        self._listener = asyncio.create_task(self._listen())
+
+    async def _listen(self) -> None:
+        delay = 0.1
+        while True:
+            pubsub = self._subscriber.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(self.channel)
+                self.connected = True
+                await self._dispatch("resync", {}, "local")
+                delay = 0.1
+                async for message in pubsub.listen():
+                    try:
+                        data = json.loads(message["data"])
+                    except (TypeError, ValueError):
+                        continue
+                    if data.get("origin") != self.worker_id:
+                        await self._dispatch(str(data.get("event")), data.get("fields") or {}, "remote")
+            except self._errors as exc:
+                SHARED_STATE_ERRORS.inc(1, ("subscribe",))
+                log_event(log, "shared_state.subscriber_down", logging.WARNING, error=str(exc), retry_s=delay)
+            finally:
+                self.connected = False
+                await pubsub.aclose()
+            await asyncio.sleep(delay)
+            delay = min(5.0, delay * 2)
+
+    async def close(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+        await self._client.aclose()
+        await self._subscriber.aclose()
+
+    def stats(self) -> dict:
+        return {"backend": self.backend, "subscribed": self.connected, "prefix": self.prefix}
+
+
+def create_shared_state(url: str, prefix: str = "mcp:", timeout: float = 0.25) -> SharedState:
+    if not url or url.startswith("memory:"):
+        return MemoryState()
+    if url.split(":", 1)[0] in ("redis", "rediss", "unix"):
+        return RedisState(url, prefix, timeout)
+    raise ValueError(f"Unsupported SHARED_STATE_URL scheme: {url}")
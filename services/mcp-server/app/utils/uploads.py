@@ -0,0 +1,226 @@
+# python
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from typing import AsyncIterator, Awaitable, Callable, List, Optional, Tuple
+
+from fastapi import HTTPException, status
+
+from .file_cache import StatSig, stat_signature
+
+try:
+    from python_multipart.exceptions import MultipartParseError
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ModuleNotFoundError:  # python-multipart < 0.0.13
+    from multipart.exceptions import MultipartParseError
+    from multipart.multipart import MultipartParser, parse_options_header
+
+# Multipart framing (boundaries, part headers, small fields) allowed on top of the file itself
+MULTIPART_SLACK = 64 * 1024
+
+
+class UploadTooLarge(HTTPException):
+    def __init__(self, max_bytes: int):
+        super().__init__(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=f"Upload exceeds {max_bytes} bytes")
+
+
+def file_sha256(path: str, chunk_size: int = 1024 * 1024) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class UploadStore:
+    """Writes uploads via temp file + atomic rename and remembers content hashes.
+
+    Identical re-uploads of a file are detected by hash and leave the existing file untouched.
+    """
+
+    def __init__(self, max_bytes: int, chunk_size: int = 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.chunk_size = chunk_size
+        self._hashes: dict[str, Tuple[StatSig, str]] = {}
+        self._lock = threading.Lock()
+
+    def known_hash(self, path: str) -> Optional[str]:
+        # Hash of the file currently on disk, computed at most once per version
+        try:
+            sig = stat_signature(path)
+        except FileNotFoundError:
+            return None
+        with self._lock:
+            cached = self._hashes.get(path)
+        if cached is not None and cached[0] == sig:
+            return cached[1]
+        digest = file_sha256(path, self.chunk_size)
+        self.remember(path, sig, digest)
+        return digest
+
+    def remember(self, path: str, sig: StatSig, digest: str) -> None:
+        with self._lock:
+            self._hashes[path] = (sig, digest)
+
+    async def store(self, chunks: AsyncIterator[bytes], dest_path: str, run: Callable[..., Awaitable]) -> dict:
+        # Writes chunks to a temp file as they arrive, hashing on the way; blocking file work goes
+        # through run (the file worker pool). Returns size, sha256 and whether it was a duplicate.
+        digest, size = hashlib.sha256(), 0
+        fd, tmp_path = await run(tempfile.mkstemp, dir=os.path.dirname(dest_path), prefix=".upload-", suffix=".part")
+        out = os.fdopen(fd, "wb")
+
+        def write(chunk: bytes) -> None:
+            digest.update(chunk)
+            out.write(chunk)
+
+        try:
+            try:
+                async for chunk in chunks:
+                    size += len(chunk)
+                    if size > self.max_bytes:
+                        raise UploadTooLarge(self.max_bytes)
+                    await run(write, chunk)
+            finally:
+                out.close()
+            stored = await run(self._commit, tmp_path, dest_path, size, digest.hexdigest())
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        return stored
+
+    def _commit(self, tmp_path: str, dest_path: str, size: int, sha256: str) -> dict:
+        existing = os.path.getsize(dest_path) if os.path.exists(dest_path) else None
+        if existing == size and self.known_hash(dest_path) == sha256:
+            os.unlink(tmp_path)
+            return {"size": size, "sha256": sha256, "deduplicated": True}
+        # mkstemp creates 0600; keep the permissions a plain open() would have given
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, dest_path)
+        self.remember(dest_path, stat_signature(dest_path), sha256)
+        return {"size": size, "sha256": sha256, "deduplicated": False}
+
+
+class MultipartFile:
+    """Reads one file field straight off a multipart/form-data request stream.
+
+    Unlike request.form(), nothing is spooled: part headers are parsed first so the caller
+    can authorize by filename, then chunks() yields the file's bytes as they arrive,
+    coalesced to about chunk_size. The whole body is capped at max_bytes plus MULTIPART_SLACK while it is
+    read, whether or not the client sent Content-Length. Other fields are ignored.
+    """
+
+    def __init__(self, headers, stream: AsyncIterator[bytes], field: str, max_bytes: int, chunk_size: int = 1024 * 1024):
+        content_type, params = parse_options_header(headers.get("content-type", ""))
+        if content_type != b"multipart/form-data" or not params.get(b"boundary"):
+            raise HTTPException(status_code=400, detail="Expected a multipart/form-data body")
+        self.field = field
+        self.max_bytes = max_bytes
+        self.chunk_size = chunk_size
+        self.filename: Optional[str] = None
+        self._stream = stream
+        self._read = 0
+        self._eof = False
+        self._pending: List[bytes] = []
+        self._pending_size = 0
+        self._part: Optional[dict] = None
+        self._header_name = self._header_value = b""
+        # None: file part not reached yet; True: inside it; False: past it
+        self._in_file: Optional[bool] = None
+        self._parser = MultipartParser(params[b"boundary"], {
+            "on_part_begin": self._on_part_begin, "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value, "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished, "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+        })
+
+    def _on_part_begin(self) -> None:
+        self._part = {}
+
+    def _on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_name += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def _on_header_end(self) -> None:
+        self._part[self._header_name.lower()] = self._header_value
+        self._header_name = self._header_value = b""
+
+    def _on_headers_finished(self) -> None:
+        _, options = parse_options_header(self._part.get(b"content-disposition", b""))
+        if self._in_file is None and options.get(b"name") == self.field.encode() and b"filename" in options:
+            self.filename = options[b"filename"].decode("utf-8", "replace")
+            self._in_file = True
+
+    def _on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if self._in_file:
+            self._pending.append(data[start:end])
+            self._pending_size += end - start
+
+    def _on_part_end(self) -> None:
+        if self._in_file:
+            self._in_file = False
+
+    async def _feed(self) -> None:
+        try:
+            chunk = await self._stream.__anext__()
+        except StopAsyncIteration:
+            self._eof = True
+            return
+        self._read += len(chunk)
+        if self._read > self.max_bytes + MULTIPART_SLACK:
+            raise UploadTooLarge(self.max_bytes)
+        try:
+            self._parser.write(chunk)
+        except MultipartParseError as exc:
+            raise HTTPException(status_code=400, detail=f"Malformed multipart body: {exc}") from None
+
+    async def open(self) -> Optional[str]:
+        # Reads up to the file part's headers; returns its filename (None if the field is missing)
+        while self._in_file is None and not self._eof:
+            await self._feed()
+        return self.filename
+
+    async def chunks(self) -> AsyncIterator[bytes]:
+        while True:
+            while self._in_file and not self._eof and self._pending_size < self.chunk_size:
+                await self._feed()
+            if self._pending:
+                data = b"".join(self._pending)
+                self._pending, self._pending_size = [], 0
+                yield data
+            if not self._in_file or self._eof:
+                break
+        if self._in_file:
+            raise HTTPException(status_code=400, detail="Multipart body ended inside the file")
+        # Drain the closing boundary (and any trailing fields) so the connection can be reused
+        while not self._eof:
+            await self._feed()
+
+
+class UploadSizeLimit:
+    """ASGI middleware rejecting oversized uploads from Content-Length before the body is read.
+
+    Bodies without Content-Length (chunked) are capped by MultipartFile as they stream in.
+    """
+
+    def __init__(self, app, path: str, max_bytes: int, slack: int = MULTIPART_SLACK):
+        self.app = app
+        self.path = path
+        # Multipart framing adds a little on top of the file itself
+        self.limit = max_bytes + slack
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"] == self.path:
+            for name, value in scope["headers"]:
+                if name == b"content-length" and value.isdigit() and int(value) > self.limit:
+                    body = json.dumps({"detail": f"Upload exceeds {self.max_bytes} bytes"}, separators=(",", ":")).encode()
+                    await send({"type": "http.response.start", "status": 413, "headers": [
+                        (b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]})
+                    await send({"type": "http.response.body", "body": body})
+                    return
+        await self.app(scope, receive, send)
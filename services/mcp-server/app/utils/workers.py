@@ -0,0 +1,111 @@
+# python
+import asyncio
+import functools
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Iterator
+
+from fastapi import HTTPException, status
+
+_DONE = object()
+
+
+class BoundedExecutor:
+    """Thread pool for blocking file I/O and parsing with a cap on queued + running jobs.
+
+    When the cap is reached new work is rejected with 503 instead of queueing without
+    bound. max_workers=0 runs work inline on the event loop (the old behaviour).
+    """
+
+    def __init__(self, max_workers: int = 4, max_pending: int = 32, retry_after: int = 1):
+        self.max_workers = max_workers
+        self.max_pending = max(max_pending, max_workers)
+        self.retry_after = retry_after
+        self._pool = ThreadPoolExecutor(max_workers, thread_name_prefix="file-io") if max_workers > 0 else None
+        self.pending = 0
+        self.rejected = 0
+
+    def _acquire(self) -> None:
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="File worker queue is full, retry later",
+                headers={"Retry-After": str(self.retry_after)},
+            )
+        self.pending += 1
+
+    def _release(self) -> None:
+        self.pending -= 1
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        if self._pool is None:
+            return fn(*args, **kwargs)
+        self._acquire()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._pool, functools.partial(fn, *args, **kwargs))
+        finally:
+            self._release()
+
+    def iterate(self, iterator: Iterator[Any]) -> AsyncIterator[Any]:
+        # Reserves one slot for the whole stream up front so a full queue fails
+        # with 503 before the response starts, never halfway through it.
+        if self._pool is None:
+            return _inline(iterator)
+        self._acquire()
+        return self._iterate(iterator)
+
+    async def _iterate(self, iterator: Iterator[Any]) -> AsyncIterator[Any]:
+        pending = None
+        try:
+            while True:
+                pending = self._pool.submit(next, iterator, _DONE)
+                item = await asyncio.wrap_future(pending)
+                pending = None
+                if item is _DONE:
+                    break
+                yield item
+        finally:
+            try:
+                # On cancellation a worker may still be inside next(); closing the generator
+                # under it would raise "generator already executing" and leak the file
+                if pending is not None:
+                    await _settle(pending)
+                close = getattr(iterator, "close", None)
+                if close is not None:
+                    try:
+                        await _settle(self._pool.submit(close))
+                    except RuntimeError:
+                        # Pool already shut down
+                        close()
+            finally:
+                self._release()
+
+    def stats(self) -> dict:
+        return {"workers": self.max_workers, "max_pending": self.max_pending, "pending": self.pending, "rejected": self.rejected}
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+async def _settle(job: Future) -> None:
+    # Wait for a pool job to finish without cancelling it; its result is not needed.
+    # A cancellation that arrives meanwhile is re-raised once the job is done.
+    waiter = asyncio.wrap_future(job)
+    cancelled = False
+    while not waiter.done():
+        try:
+            await asyncio.shield(waiter)
+        except asyncio.CancelledError:
+            cancelled = cancelled or not waiter.done()
+        except Exception:
+            pass
+    if not waiter.cancelled():
+        waiter.exception()  # retrieved so it is not reported as never retrieved
+    if cancelled:
+        raise asyncio.CancelledError
+
+
+async def _inline(iterator: Iterator[Any]) -> AsyncIterator[Any]:
+    for item in iterator:
+        yield item
@@ -0,0 +1,2 @@
+# python
+# benchmarks; run from services/mcp-server, e.g. `python -m bench.opa_client`
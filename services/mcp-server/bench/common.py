@@ -0,0 +1,207 @@
+# python
+import asyncio
+import csv
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+import httpx
+import uvicorn
+from fastapi import FastAPI
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class BackgroundServer:
+    """Runs an ASGI app on a local uvicorn in a daemon thread."""
+
+    def __init__(self, app, port: int | None = None):
+        self.port = port or free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        config = uvicorn.Config(app, host="127.0.0.1", port=self.port, log_level="warning", access_log=False)
+        self.server = uvicorn.Server(config)
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc):
+        self.server.should_exit = True
+        self.thread.join(timeout=5)
+
+
+def stub_opa_app() -> FastAPI:
+    # Mirrors services/opa/policies/mcp/authz.rego closely enough for load tests
+    app = FastAPI()
+
+    @app.post("/v1/data/mcp/authz/allow")
+    async def allow(body: dict):
+        inp = body.get("input", {})
+        subject, action, resource = inp.get("subject", {}), inp.get("action"), inp.get("resource", {})
+        role, path = subject.get("role"), str(resource.get("path", ""))
+        result = (
+            role == "admin"
+            or (role == "user" and action == "excel.read" and resource.get("owner") == subject.get("sub"))
+            or (action == "excel.read" and path.startswith("/data/public/"))
+            or (role == "user" and action == "excel.write" and path.startswith("/data/uploads/")
+                and resource.get("owner") in ("", subject.get("sub")))
+        )
+        return {"result": result}
+
+    return app
+
+
+class StubIssuer:
+    """Local RSA signing key plus a FastAPI app serving its JWKS, standing in for the auth server."""
+
+    def __init__(self, issuer: str = "http://auth-server:8000", audience: str = "mcp-audience", kid: str = "bench-key", max_age: int = 300):
+        from cryptography.hazmat.primitives import serialization
+        from cryptography.hazmat.primitives.asymmetric import rsa
+        from jose import jwk
+
+        self.issuer, self.audience, self.kid = issuer, audience, kid
+        private = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        self.private_pem = private.private_bytes(
+            serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+        ).decode()
+        public_pem = private.public_key().public_bytes(serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo)
+        self.public_jwk = {**jwk.RSAKey(public_pem, "RS256").to_dict(), "kid": kid, "use": "sig", "alg": "RS256"}
+        self.jwks_requests = 0
+        self.app = FastAPI()
+
+        @self.app.get("/jwks")
+        async def jwks():
+            from fastapi.responses import JSONResponse
+
+            self.jwks_requests += 1
+            return JSONResponse({"keys": [self.public_jwk]}, headers={"Cache-Control": f"public, max-age={max_age}"})
+
+    def mint(self, sub: str, role: str = "user", ttl: int = 3600) -> str:
+        from jose import jwt
+
+        now = int(time.time())
+        claims = {"iss": self.issuer, "aud": self.audience, "sub": sub, "role": role, "iat": now, "nbf": now, "exp": now + ttl}
+        return jwt.encode(claims, self.private_pem, algorithm="RS256", headers={"kid": self.kid})
+
+
+def summarize(latencies: list[float], elapsed: float) -> dict:
+    lat = sorted(latencies)
+    if not lat:
+        return {"requests": 0}
+
+    def pct(p: float) -> float:
+        return round(lat[min(len(lat) - 1, int(p * len(lat)))] * 1000, 3)
+
+    return {
+        "requests": len(lat),
+        "rps": round(len(lat) / elapsed, 1),
+        "p50_ms": pct(0.50),
+        "p95_ms": pct(0.95),
+        "p99_ms": pct(0.99),
+        "mean_ms": round(statistics.fmean(lat) * 1000, 3),
+    }
+
+
+async def run_load(call, total: int, concurrency: int) -> dict:
+    """Run `await call()` `total` times with at most `concurrency` in flight."""
+    latencies: list[float] = []
+    queue = iter(range(total))
+
+    async def worker():
+        for _ in queue:
+            t0 = time.perf_counter()
+            await call()
+            latencies.append(time.perf_counter() - t0)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, time.perf_counter() - start)
+
+
+def emit(result: dict):
+    print(json.dumps(result, indent=2))
+
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+POLICY_DIR = os.path.normpath(os.path.join(SERVICE_DIR, "..", "opa", "policies"))
+
+
+def embedded_env(data_dir: str) -> dict:
+    # Server env that needs no OPA sidecar; benchmarks use the admin-key dev token
+    return {"DATA_DIR": data_dir, "POLICY_ENGINE": "embedded", "POLICY_DIR": POLICY_DIR}
+
+
+class SubprocessServer:
+    """Runs the MCP server on a local uvicorn in a child process so its RSS can be measured."""
+
+    def __init__(self, env: dict, port: int | None = None, app: str = "app.main:app", extra_args: tuple = ()):
+        self.port = port or free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        self.env = {**os.environ, **env}
+        self.args = [sys.executable, "-m", "uvicorn", app, "--host", "127.0.0.1", "--port", str(self.port),
+                     "--log-level", "warning", "--no-access-log", *extra_args]
+        self.proc = None
+
+    def __enter__(self):
+        self.proc = subprocess.Popen(self.args, cwd=SERVICE_DIR, env=self.env, stdout=subprocess.DEVNULL)
+        deadline = time.time() + 30
+        while time.time() < deadline:
+            try:
+                if httpx.get(f"{self.url}/healthz", timeout=1).status_code == 200:
+                    return self
+            except httpx.HTTPError:
+                time.sleep(0.1)
+        self.proc.kill()
+        raise RuntimeError(f"server on {self.url} did not start")
+
+    def __exit__(self, *exc):
+        self.proc.terminate()
+        self.proc.wait(timeout=10)
+
+    def peak_rss_kb(self) -> int:
+        return proc_status_kb(self.proc.pid, "VmHWM")
+
+    def rss_kb(self) -> int:
+        return proc_status_kb(self.proc.pid, "VmRSS")
+
+
+def proc_status_kb(pid: int, field: str) -> int:
+    # Linux only; returns 0 elsewhere
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+def write_synthetic_csv(path: str, rows: int, seed: int = 7) -> int:
+    """Writes a CSV shaped like data/public/sample.csv with a few extra columns; returns its size."""
+    rng = random.Random(seed)
+    names = ["Alice", "Bob", "Charlie", "Dana", "Eve", "Frank", "Grace", "Heidi"]
+    regions = ["north", "south", "east", "west"]
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "name", "amount", "region", "quantity", "created_at", "note"])
+        for i in range(1, rows + 1):
+            writer.writerow([
+                i, rng.choice(names), f"{rng.uniform(0, 5000):.2f}", rng.choice(regions), rng.randint(1, 500),
+                f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}", f"row {i} synthetic note text",
+            ])
+    return os.path.getsize(path)
@@ -0,0 +1,57 @@
+# python
+"""Payload bytes, server peak RSS and end-to-end time per excel_csv_reader format.
+
+    python -m bench.csv_formats --rows 100000 --max-rows 50000
+
+Each format runs against a fresh server process so VmHWM reflects only that format.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import httpx
+
+from .common import SubprocessServer, embedded_env, emit, write_synthetic_csv
+
+CASES = [
+    ("records", {}),
+    ("rows", {"format": "rows"}),
+    ("rows+types", {"format": "rows", "infer_types": True}),
+    ("columnar", {"format": "columnar"}),
+    ("columnar+types", {"format": "columnar", "infer_types": True}),
+]
+
+
+def main(args):
+    results = {}
+    with tempfile.TemporaryDirectory() as data_dir:
+        size = write_synthetic_csv(os.path.join(data_dir, "public", "big.csv"), args.rows)
+        env = embedded_env(data_dir)
+        for name, extra in CASES:
+            with SubprocessServer(env) as server:
+                baseline_kb = server.rss_kb()
+                body = {"source": "public/big.csv", "max_rows": args.max_rows, **extra}
+                timings, payload = [], 0
+                with httpx.Client(base_url=server.url, headers={"Authorization": "Bearer admin-key"}, timeout=120) as client:
+                    for _ in range(args.repeat):
+                        t0 = time.perf_counter()
+                        resp = client.post("/mcp/tools/excel_csv_reader", json=body)
+                        resp.json()
+                        timings.append(time.perf_counter() - t0)
+                        resp.raise_for_status()
+                        payload = len(resp.content)
+                results[name] = {
+                    "payload_bytes": payload,
+                    "server_peak_rss_delta_kb": server.peak_rss_kb() - baseline_kb,
+                    "best_e2e_ms": round(min(timings) * 1000, 1),
+                }
+    emit({"benchmark": "csv_formats", "file_bytes": size, "rows": args.rows, "max_rows": args.max_rows, "formats": results})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--max-rows", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=3)
+    main(parser.parse_args())
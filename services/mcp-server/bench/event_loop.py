@@ -0,0 +1,76 @@
+# python
+"""p99 of small requests while large CSVs are parsed, with and without the file worker pool.
+
+    python -m bench.event_loop --rows 350000 --large-concurrency 4 --small-requests 300
+
+FILE_IO_WORKERS=0 reproduces the old behaviour (parsing on the event loop).
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+
+import httpx
+
+from .common import SubprocessServer, embedded_env, emit, run_load, write_synthetic_csv
+
+HEADERS = {"Authorization": "Bearer admin-key"}
+
+
+async def measure(url: str, args) -> dict:
+    stop = asyncio.Event()
+    large_done = 0
+    rejected = 0
+    async with httpx.AsyncClient(base_url=url, headers=HEADERS, timeout=300) as client:
+        async def large_reader():
+            nonlocal large_done, rejected
+            while not stop.is_set():
+                resp = await client.post("/mcp/tools/excel_csv_reader", json={"source": "public/big.csv", "max_rows": args.large_rows})
+                if resp.status_code == 503:
+                    rejected += 1
+                    await asyncio.sleep(0.05)
+                else:
+                    large_done += 1
+
+        background = [asyncio.create_task(large_reader()) for _ in range(args.large_concurrency)]
+        await asyncio.sleep(0.5)  # let the large parses get going
+
+        async def healthz():
+            (await client.get("/healthz")).raise_for_status()
+
+        async def small_read():
+            resp = await client.post("/mcp/tools/excel_csv_reader", json={"source": "public/small.csv", "max_rows": 10})
+            resp.raise_for_status()
+
+        result = {
+            "healthz": await run_load(healthz, args.small_requests, 4),
+            "small_read": await run_load(small_read, args.small_requests, 4),
+        }
+        stop.set()
+        await asyncio.gather(*background)
+    result["large_reads_completed"] = large_done
+    result["large_reads_rejected_503"] = rejected
+    return result
+
+
+def main(args):
+    results = {}
+    with tempfile.TemporaryDirectory() as data_dir:
+        size = write_synthetic_csv(os.path.join(data_dir, "public", "big.csv"), args.rows)
+        write_synthetic_csv(os.path.join(data_dir, "public", "small.csv"), 50)
+        # Disable the parsed-file cache so every large read really parses
+        env = {**embedded_env(data_dir), "FILE_CACHE_MAX_BYTES": "0"}
+        for workers in args.workers:
+            with SubprocessServer({**env, "FILE_IO_WORKERS": str(workers)}) as server:
+                results[f"workers={workers}"] = asyncio.run(measure(server.url, args))
+    emit({"benchmark": "event_loop", "large_file_bytes": size, "large_concurrency": args.large_concurrency, **results})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=350000)
+    parser.add_argument("--large-rows", type=int, default=100000)
+    parser.add_argument("--large-concurrency", type=int, default=4)
+    parser.add_argument("--small-requests", type=int, default=300)
+    parser.add_argument("--workers", type=int, nargs="+", default=[0, 4])
+    main(parser.parse_args())
@@ -0,0 +1,56 @@
+# python
+"""Access-token verifications per second: naive (JWKS fetched per request), cold LRU and warm LRU.
+
+    python -m bench.jwt_verify --tokens 200 --verifications 5000
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+from jose import jwk, jwt
+
+from app.auth.jwt_verify import JWKSCache, TokenVerifier
+
+from .common import BackgroundServer, StubIssuer, emit
+
+
+async def rate(verify, tokens: list[str], total: int) -> dict:
+    start = time.perf_counter()
+    for i in range(total):
+        await verify(tokens[i % len(tokens)])
+    elapsed = time.perf_counter() - start
+    return {"verifications": total, "per_s": round(total / elapsed), "us_each": round(elapsed / total * 1e6, 1)}
+
+
+async def main(args):
+    issuer = StubIssuer()
+    tokens = [issuer.mint(f"user-{i}") for i in range(args.tokens)]
+    results = {}
+    with BackgroundServer(issuer.app) as auth:
+        async with httpx.AsyncClient(timeout=5) as client:
+            async def naive(token):
+                # What a straightforward implementation would do on every request
+                keys = (await client.get(f"{auth.url}/jwks")).json()["keys"]
+                key = jwk.construct(keys[0], "RS256")
+                jwt.decode(token, key, algorithms=["RS256"], audience=issuer.audience, issuer=issuer.issuer)
+
+            results["naive_fetch_per_request"] = await rate(naive, tokens, min(args.verifications, 500))
+
+            cold = TokenVerifier(JWKSCache(f"{auth.url}/jwks", client), issuer.issuer, issuer.audience, cache_size=0)
+            results["cold_cache"] = await rate(cold.verify, tokens, args.verifications)
+
+            warm = TokenVerifier(JWKSCache(f"{auth.url}/jwks", client), issuer.issuer, issuer.audience, cache_size=args.tokens)
+            for token in tokens:
+                await warm.verify(token)
+            results["warm_cache"] = await rate(warm.verify, tokens, args.verifications)
+            results["warm_cache"]["hit_ratio"] = round(warm.hits / max(1, warm.hits + warm.misses), 3)
+    results["jwks_fetches_after_naive"] = issuer.jwks_requests
+    emit({"benchmark": "jwt_verify", "distinct_tokens": args.tokens, **results})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tokens", type=int, default=200)
+    parser.add_argument("--verifications", type=int, default=5000)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,203 @@
+# python
+"""End-to-end load test of the MCP tool endpoints with a stub OPA and a stub auth server.
+
+    python -m bench.loadtest --mode uvicorn --csv-mb 25 --requests 500 --concurrency 16 --output result.json
+    python -m bench.loadtest ... --baseline result.json   # compare with an earlier run
+
+--mode inproc drives the app through httpx's ASGI transport in this process (no sockets,
+RSS includes the client); --mode uvicorn runs it in a child uvicorn process and reports
+that process's peak RSS. Access tokens are real RS256 JWTs minted by the stub issuer, so
+token verification runs as in production. Results are JSON, including pass/fail against
+the prd.md targets (policy eval < 500 ms, file read < 2 s), so runs can be diffed
+between versions.
+"""
+import argparse
+import asyncio
+import collections
+import itertools
+import json
+import os
+import platform
+import random
+import subprocess
+import tempfile
+import time
+
+import httpx
+
+from .common import (
+    POLICY_DIR, SERVICE_DIR, BackgroundServer, StubIssuer, SubprocessServer, emit, proc_status_kb, run_load, stub_opa_app,
+    write_synthetic_csv,
+)
+
+SCENARIOS = ("policy_eval", "read_page", "read_scan", "upload")
+# write_synthetic_csv rows average roughly this many bytes
+BYTES_PER_ROW = 75
+TARGETS_MS = {"policy_eval": 500, "read_page": 2000, "read_scan": 2000}
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=SERVICE_DIR, capture_output=True, text=True, timeout=5).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+
+def server_env(data_dir: str, opa_url: str, issuer: StubIssuer, jwks_url: str, args) -> dict:
+    env = {
+        "DATA_DIR": data_dir, "OPA_URL": opa_url, "POLICY_ENGINE": args.policy_engine,
+        "JWKS_URL": jwks_url, "JWT_ISSUER": issuer.issuer, "JWT_AUDIENCE": issuer.audience,
+        "AUTH_DEV_TOKENS": "false", "LOG_LEVEL": args.log_level,
+    }
+    if args.policy_engine == "embedded":
+        env["POLICY_DIR"] = POLICY_DIR
+    if args.no_file_cache:
+        env["FILE_CACHE_MAX_BYTES"] = "0"
+    return env
+
+
+def scenario_calls(client: httpx.AsyncClient, tokens: dict, total_rows: int, errors: collections.Counter, args) -> dict:
+    users = itertools.cycle(tokens["users"])
+    admin = {"Authorization": f"Bearer {tokens['admin']}"}
+    rng = random.Random(11)
+    payload = os.urandom(args.upload_kb * 1024)
+    uploads = itertools.count()
+
+    def check(name: str, resp: httpx.Response) -> None:
+        # Failures are counted rather than raised so one bad response does not end the run
+        if resp.status_code != 200:
+            errors[f"{name}:{resp.status_code}"] += 1
+
+    async def policy_eval():
+        headers = {"Authorization": f"Bearer {next(users)}"}
+        resource = {"path": f"/data/public/file-{rng.randrange(args.resources)}.csv"}
+        check("policy_eval", await client.post("/mcp/tools/opa_policy_eval", json={"action": "excel.read", "resource": resource}, headers=headers))
+
+    async def read_page():
+        offset = rng.randrange(max(1, total_rows - args.page_rows))
+        body = {"source": "public/large.csv", "max_rows": args.page_rows, "offset": offset}
+        check("read_page", await client.post("/mcp/tools/excel_csv_reader", json=body, headers=admin))
+
+    async def read_scan():
+        # One pass over the whole file; summary keeps the response small
+        check("read_scan", await client.post("/mcp/tools/excel_csv_reader", json={"source": "public/large.csv", "summary": True}, headers=admin))
+
+    async def upload():
+        name = f"load-{next(uploads)}.csv"
+        check("upload", await client.post("/mcp/upload", files={"file": (name, payload)}, headers=admin))
+
+    return {"policy_eval": policy_eval, "read_page": read_page, "read_scan": read_scan, "upload": upload}
+
+
+async def drive(client: httpx.AsyncClient, tokens: dict, total_rows: int, args) -> dict:
+    errors = collections.Counter()
+    calls = scenario_calls(client, tokens, total_rows, errors, args)
+    results = {}
+    for name in args.scenarios:
+        requests = args.scan_requests if name == "read_scan" else args.requests
+        await run_load(calls[name], min(requests, args.warmup), min(args.concurrency, 4))
+        errors.clear()
+        concurrency = args.scan_concurrency if name == "read_scan" else args.concurrency
+        results[name] = await run_load(calls[name], requests, concurrency)
+        results[name]["errors"] = dict(errors)
+        if name in TARGETS_MS:
+            results[name]["target_p99_ms"] = TARGETS_MS[name]
+            results[name]["meets_target"] = not errors and results[name].get("p99_ms", 0) < TARGETS_MS[name]
+    return results
+
+
+async def run_inproc(env: dict, tokens: dict, total_rows: int, args) -> dict:
+    # Config is read at import time, so the environment has to be in place first
+    os.environ.update(env)
+    from app.main import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://mcp", timeout=120) as client:
+            results = await drive(client, tokens, total_rows, args)
+    return {"scenarios": results, "peak_rss_kb": proc_status_kb(os.getpid(), "VmHWM"), "rss_scope": "benchmark process"}
+
+
+def run_uvicorn(env: dict, tokens: dict, total_rows: int, args) -> dict:
+    with SubprocessServer(env) as server:
+        async def go():
+            limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+            async with httpx.AsyncClient(base_url=server.url, timeout=120, limits=limits) as client:
+                return await drive(client, tokens, total_rows, args)
+
+        results = asyncio.run(go())
+        return {"scenarios": results, "peak_rss_kb": server.peak_rss_kb(), "rss_scope": "server process"}
+
+
+def compare(result: dict, baseline: dict, max_regression_pct: float) -> dict:
+    # Positive deltas are slower (p99) or less throughput (rps) than the baseline run
+    report, regressed = {}, []
+    for name, current in result["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if not before or not before.get("p99_ms") or not before.get("rps"):
+            continue
+        p99 = round((current["p99_ms"] / before["p99_ms"] - 1) * 100, 1)
+        rps = round((1 - current["rps"] / before["rps"]) * 100, 1)
+        report[name] = {"p99_delta_pct": p99, "rps_drop_pct": rps}
+        if p99 > max_regression_pct or rps > max_regression_pct:
+            regressed.append(name)
+    return {"baseline_revision": baseline.get("revision"), "scenarios": report, "regressed": regressed}
+
+
+def main(args):
+    issuer = StubIssuer()
+    tokens = {"admin": issuer.mint("load-admin", "admin"), "users": [issuer.mint(f"load-user-{i}") for i in range(args.users)]}
+    with tempfile.TemporaryDirectory() as data_dir:
+        rows = max(1, int(args.csv_mb * 1024 * 1024 / BYTES_PER_ROW))
+        started = time.perf_counter()
+        size = write_synthetic_csv(os.path.join(data_dir, "public", "large.csv"), rows)
+        generated_s = round(time.perf_counter() - started, 2)
+        with BackgroundServer(stub_opa_app()) as opa, BackgroundServer(issuer.app) as auth:
+            env = server_env(data_dir, opa.url, issuer, f"{auth.url}/jwks", args)
+            if args.mode == "inproc":
+                outcome = asyncio.run(run_inproc(env, tokens, rows, args))
+            else:
+                outcome = run_uvicorn(env, tokens, rows, args)
+    result = {
+        "benchmark": "loadtest",
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "mode": args.mode,
+        "policy_engine": args.policy_engine,
+        "concurrency": args.concurrency,
+        "csv": {"rows": rows, "bytes": size, "generated_s": generated_s},
+        **outcome,
+    }
+    if args.baseline:
+        with open(args.baseline) as f:
+            result["comparison"] = compare(result, json.load(f), args.max_regression_pct)
+    emit(result)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+    if result.get("comparison", {}).get("regressed"):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mode", choices=("inproc", "uvicorn"), default="uvicorn")
+    parser.add_argument("--policy-engine", choices=("opa", "embedded"), default="opa")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--csv-mb", type=float, default=25)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--scan-requests", type=int, default=20)
+    # Whole-file scans are CPU bound; the prd target is for a single read, not a pile-up
+    parser.add_argument("--scan-concurrency", type=int, default=1)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--resources", type=int, default=200)
+    parser.add_argument("--page-rows", type=int, default=1000)
+    parser.add_argument("--upload-kb", type=int, default=256)
+    parser.add_argument("--no-file-cache", action="store_true")
+    parser.add_argument("--log-level", default="WARNING")
+    parser.add_argument("--output", help="also write the JSON result to this file")
+    parser.add_argument("--baseline", help="earlier --output file to compare against; exits 1 on regression")
+    parser.add_argument("--max-regression-pct", type=float, default=20)
+    main(parser.parse_args())
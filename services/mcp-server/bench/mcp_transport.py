@@ -0,0 +1,184 @@
+# python
+"""Per-call REST routes versus the /mcp JSON-RPC endpoint (streamable HTTP and WebSocket).
+
+    python -m bench.mcp_transport --requests 2000 --concurrency 16
+
+The server runs in a child uvicorn with the embedded policy engine and real RS256 tokens
+(AUTH_DEV_TOKENS=false), so each REST call pays header parsing and token verification.
+Cases:
+  rest_new_connection  one HTTP connection per call (what a naive agent does)
+  rest_keepalive       pooled connections, token verified on every call
+  mcp_http             one session, token verified at initialize, calls POSTed with Mcp-Session-Id
+  mcp_websocket        one WebSocket, `concurrency` calls multiplexed on it
+The stream section reads a large CSV page and reports time to the first rows: the REST
+JSON body versus the first notifications/progress on the WebSocket.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import tempfile
+import time
+
+import httpx
+import websockets
+
+from .common import BackgroundServer, StubIssuer, SubprocessServer, embedded_env, emit, run_load, summarize, write_synthetic_csv
+
+POLICY_CALL = {"action": "excel.read", "resource": {"path": "/data/public/a.csv"}}
+
+
+class WsClient:
+    """Minimal multiplexing JSON-RPC client: one reader task routes replies to waiting calls by id."""
+
+    def __init__(self, ws):
+        self.ws = ws
+        self.ids = itertools.count(1)
+        self.pending = {}
+        self.progress = {}
+        self.reader = asyncio.create_task(self._read())
+
+    async def _read(self):
+        async for raw in self.ws:
+            message = json.loads(raw)
+            if message.get("method") == "notifications/progress":
+                callback = self.progress.get(message["params"]["progressToken"])
+                if callback is not None:
+                    callback(message["params"])
+                continue
+            future = self.pending.pop(message.get("id"), None)
+            if future is not None:
+                future.set_result(message)
+
+    async def call(self, method: str, params: dict, on_progress=None) -> dict:
+        msg_id = next(self.ids)
+        if on_progress is not None:
+            params = {**params, "_meta": {"progressToken": msg_id}}
+            self.progress[msg_id] = on_progress
+        future = asyncio.get_running_loop().create_future()
+        self.pending[msg_id] = future
+        await self.ws.send(json.dumps({"jsonrpc": "2.0", "id": msg_id, "method": method, "params": params}))
+        try:
+            return await future
+        finally:
+            self.progress.pop(msg_id, None)
+
+
+def check(message: dict) -> None:
+    if "error" in message or message.get("result", {}).get("isError"):
+        raise RuntimeError(f"call failed: {json.dumps(message)[:300]}")
+
+
+async def rest_new_connection(url: str, token: str, args) -> dict:
+    async def call():
+        async with httpx.AsyncClient(base_url=url, timeout=30) as client:
+            (await client.post("/mcp/tools/opa_policy_eval", json=POLICY_CALL, headers={"Authorization": f"Bearer {token}"})).raise_for_status()
+
+    await run_load(call, args.warmup, 4)
+    return await run_load(call, args.requests, args.concurrency)
+
+
+async def rest_keepalive(url: str, token: str, args) -> dict:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=url, timeout=30, limits=limits, headers={"Authorization": f"Bearer {token}"}) as client:
+        async def call():
+            (await client.post("/mcp/tools/opa_policy_eval", json=POLICY_CALL)).raise_for_status()
+
+        await run_load(call, args.warmup, 4)
+        return await run_load(call, args.requests, args.concurrency)
+
+
+async def mcp_http(url: str, token: str, args) -> dict:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=url, timeout=30, limits=limits, headers={"Authorization": f"Bearer {token}"}) as client:
+        resp = await client.post("/mcp", json={"jsonrpc": "2.0", "id": 0, "method": "initialize", "params": {}})
+        resp.raise_for_status()
+        client.headers["Mcp-Session-Id"] = resp.headers["mcp-session-id"]
+        ids = itertools.count(1)
+
+        async def call():
+            body = {"jsonrpc": "2.0", "id": next(ids), "method": "tools/call", "params": {"name": "opa_policy_eval", "arguments": POLICY_CALL}}
+            resp = await client.post("/mcp", json=body)
+            resp.raise_for_status()
+            check(resp.json())
+
+        await run_load(call, args.warmup, 4)
+        return await run_load(call, args.requests, args.concurrency)
+
+
+async def mcp_websocket(url: str, token: str, args) -> dict:
+    async with websockets.connect(url.replace("http", "ws", 1) + "/mcp", additional_headers={"Authorization": f"Bearer {token}"}, max_size=None) as ws:
+        client = WsClient(ws)
+        check(await client.call("initialize", {}))
+
+        async def call():
+            check(await client.call("tools/call", {"name": "opa_policy_eval", "arguments": POLICY_CALL}))
+
+        await run_load(call, args.warmup, 4)
+        result = await run_load(call, args.requests, args.concurrency)
+        client.reader.cancel()
+        return result
+
+
+async def first_rows(url: str, token: str, args) -> dict:
+    # Time until the caller holds the first rows of a large page, and until the call completes
+    arguments = {"source": "public/large.csv", "max_rows": args.stream_rows}
+    rest_first, ws_first, ws_done = [], [], []
+    async with httpx.AsyncClient(base_url=url, timeout=120, headers={"Authorization": f"Bearer {token}"}) as client:
+        for _ in range(args.stream_repeats):
+            t0 = time.perf_counter()
+            (await client.post("/mcp/tools/excel_csv_reader", json=arguments)).raise_for_status()
+            rest_first.append(time.perf_counter() - t0)
+    async with websockets.connect(url.replace("http", "ws", 1) + "/mcp", additional_headers={"Authorization": f"Bearer {token}"}, max_size=None) as ws:
+        client = WsClient(ws)
+        for _ in range(args.stream_repeats):
+            t0 = time.perf_counter()
+            seen = []
+
+            def on_progress(params):
+                if params.get("rows") and not seen:
+                    seen.append(time.perf_counter() - t0)
+
+            check(await client.call("tools/call", {"name": "excel_csv_reader", "arguments": arguments}, on_progress))
+            ws_done.append(time.perf_counter() - t0)
+            ws_first.append(seen[0])
+        client.reader.cancel()
+    return {
+        "rows": args.stream_rows,
+        "rest_full_body": summarize(rest_first, sum(rest_first)),
+        "mcp_ws_first_rows": summarize(ws_first, sum(ws_first)),
+        "mcp_ws_complete": summarize(ws_done, sum(ws_done)),
+    }
+
+
+CASES = {"rest_new_connection": rest_new_connection, "rest_keepalive": rest_keepalive, "mcp_http": mcp_http, "mcp_websocket": mcp_websocket}
+
+
+def main(args):
+    issuer = StubIssuer()
+    token = issuer.mint("bench-user", "admin")
+    results = {}
+    with tempfile.TemporaryDirectory() as data_dir:
+        write_synthetic_csv(os.path.join(data_dir, "public", "large.csv"), args.stream_rows + 10)
+        with BackgroundServer(issuer.app) as auth:
+            env = {
+                **embedded_env(data_dir), "JWKS_URL": f"{auth.url}/jwks", "JWT_ISSUER": issuer.issuer, "JWT_AUDIENCE": issuer.audience,
+                "AUTH_DEV_TOKENS": "false", "LOG_LEVEL": "WARNING", "MCP_SESSION_MAX_IN_FLIGHT": str(args.concurrency),
+            }
+            with SubprocessServer(env) as server:
+                for name in args.cases:
+                    results[name] = asyncio.run(CASES[name](server.url, token, args))
+                results["stream"] = asyncio.run(first_rows(server.url, token, args))
+    emit({"benchmark": "mcp_transport", "requests": args.requests, "concurrency": args.concurrency, **results})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--warmup", type=int, default=50)
+    parser.add_argument("--cases", nargs="+", choices=sorted(CASES), default=list(CASES))
+    parser.add_argument("--stream-rows", type=int, default=200000)
+    parser.add_argument("--stream-repeats", type=int, default=5)
+    main(parser.parse_args())
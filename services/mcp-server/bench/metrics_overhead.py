@@ -0,0 +1,112 @@
+# python
+"""Throughput with METRICS_ENABLED on vs off, plus the raw per-request cost of the instrumentation.
+
+    python -m bench.metrics_overhead --rounds 5 --requests 2000 --concurrency 16
+
+Both servers run side by side and rounds alternate between them, so drift on the
+host affects both equally. The target is < 2% throughput overhead.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+import httpx
+
+from app.utils import metrics
+
+from .common import SubprocessServer, embedded_env, emit, run_load, write_synthetic_csv
+
+HEADERS = {"Authorization": "Bearer admin-key"}
+# Stages a cached excel_csv_reader request records besides the middleware itself
+STAGES_PER_REQUEST = ("policy", "file_stat", "serialize")
+
+
+async def workload(url: str, requests: int, concurrency: int) -> dict:
+    async with httpx.AsyncClient(base_url=url, headers=HEADERS, timeout=30) as client:
+        async def read():
+            resp = await client.post("/mcp/tools/excel_csv_reader", json={"source": "public/small.csv", "max_rows": 20})
+            resp.raise_for_status()
+
+        async def policy():
+            resp = await client.post("/mcp/tools/opa_policy_eval", json={"action": "excel.read", "resource": {"path": "/data/public/a.csv"}})
+            resp.raise_for_status()
+
+        return {
+            "read": await run_load(read, requests, concurrency),
+            "policy_eval": await run_load(policy, requests, concurrency),
+        }
+
+
+def instrumentation_cost(iterations: int) -> dict:
+    # Time a bare ASGI app with and without the middleware plus the per-stage observations
+    async def bare(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"{}"})
+
+    async def noop_send(message):
+        pass
+
+    wrapped = metrics.MetricsMiddleware(bare)
+
+    async def run(app, stages) -> float:
+        scope = {"type": "http", "path": "/mcp/tools/excel_csv_reader", "method": "POST"}
+        start = time.perf_counter()
+        for _ in range(iterations):
+            await app(dict(scope), None, noop_send)
+            for stage in stages:
+                metrics.observe_stage(stage, time.perf_counter())
+        return (time.perf_counter() - start) / iterations
+
+    without = asyncio.run(run(bare, ()))
+    with_metrics = asyncio.run(run(wrapped, STAGES_PER_REQUEST))
+    return {"us_per_request": round((with_metrics - without) * 1e6, 2)}
+
+
+async def measure(servers: dict, args) -> dict:
+    runs = {name: [] for name in servers}
+    for _ in range(args.rounds):
+        for name, server in servers.items():
+            runs[name].append(await workload(server.url, args.requests, args.concurrency))
+    result = {}
+    for name, samples in runs.items():
+        result[name] = {
+            endpoint: {
+                "rps_median": statistics.median(s[endpoint]["rps"] for s in samples),
+                "p50_ms_median": statistics.median(s[endpoint]["p50_ms"] for s in samples),
+                "p99_ms_median": statistics.median(s[endpoint]["p99_ms"] for s in samples),
+            }
+            for endpoint in samples[0]
+        }
+    result["overhead_pct"] = {
+        endpoint: round((1 - result["enabled"][endpoint]["rps_median"] / result["disabled"][endpoint]["rps_median"]) * 100, 2)
+        for endpoint in result["enabled"]
+    }
+    return result
+
+
+def main(args):
+    with tempfile.TemporaryDirectory() as data_dir:
+        write_synthetic_csv(os.path.join(data_dir, "public", "small.csv"), 200)
+        env = embedded_env(data_dir)
+        with SubprocessServer({**env, "METRICS_ENABLED": "true"}) as on, SubprocessServer({**env, "METRICS_ENABLED": "false"}) as off:
+            # Warm both (imports, file cache) before measuring
+            asyncio.run(workload(on.url, 200, 4))
+            asyncio.run(workload(off.url, 200, 4))
+            result = asyncio.run(measure({"enabled": on, "disabled": off}, args))
+    cost = instrumentation_cost(args.iterations)
+    read_us = result["disabled"]["read"]["p50_ms_median"] * 1000
+    cost["pct_of_read_p50"] = round(cost["us_per_request"] / read_us * 100, 3) if read_us else None
+    emit({"benchmark": "metrics_overhead", "rounds": args.rounds, "requests": args.requests,
+          "concurrency": args.concurrency, **result, "instrumentation": cost})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--iterations", type=int, default=100000)
+    main(parser.parse_args())
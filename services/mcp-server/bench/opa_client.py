@@ -0,0 +1,43 @@
+# python
+"""Per-call httpx client vs the pooled app-lifetime OPA client against a local stub OPA.
+
+    python -m bench.opa_client --requests 2000 --concurrency 32
+"""
+import argparse
+import asyncio
+
+from app.clients.opa import create_opa_client
+from app.mcp.tools.opa_policy_eval import evaluate
+
+from .common import BackgroundServer, emit, run_load, stub_opa_app
+
+SUBJECT = {"sub": "demo", "role": "user"}
+RESOURCE = {"path": "/data/public/sample.csv", "owner": ""}
+
+
+async def main(args):
+    results = {}
+    with BackgroundServer(stub_opa_app()) as opa:
+        async def per_call():
+            allowed, _ = await evaluate(opa.url, SUBJECT, "excel.read", RESOURCE)
+            assert allowed
+
+        client = create_opa_client()
+
+        async def pooled():
+            allowed, _ = await evaluate(opa.url, SUBJECT, "excel.read", RESOURCE, client=client)
+            assert allowed
+
+        # warm-up so both modes start from a running stub
+        await run_load(per_call, 50, 4)
+        results["per_call"] = await run_load(per_call, args.requests, args.concurrency)
+        results["pooled"] = await run_load(pooled, args.requests, args.concurrency)
+        await client.aclose()
+    emit({"benchmark": "opa_client", "concurrency": args.concurrency, **results})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,118 @@
+# python
+"""Tail latency through an OPA outage, with and without the circuit breaker and stale mode.
+
+    python -m bench.opa_faults --healthy 3 --outage 6 --recovery 4 --concurrency 16
+
+A local OPA stub answers normally, then hangs (or returns 503 with --fault error) for
+the outage window, then recovers. Clients call opa_policy_eval continuously; results
+are reported per phase, together with how many requests reached OPA.
+"""
+import argparse
+import asyncio
+import collections
+import statistics
+import tempfile
+import time
+
+import httpx
+
+from .common import BackgroundServer, SubprocessServer, emit, stub_opa_app
+
+HEADERS = {"Authorization": "Bearer demo-key"}
+PATHS = [f"/data/public/file-{i}.csv" for i in range(20)]
+
+CONFIGS = {
+    # Roughly the old behaviour: no breaker, unlimited retries, ~7 s spent per request
+    "legacy_like": {"OPA_BREAKER_FAILURES": "0", "OPA_RETRY_BUDGET_RATIO": "1000", "OPA_RETRY_BUDGET_MIN_PER_SEC": "1000",
+                    "OPA_REQUEST_BUDGET": "7", "OPA_BACKOFF_BASE": "0.2", "OPA_BACKOFF_MAX": "0.6"},
+    "breaker_fail_fast": {"OPA_FAIL_MODE": "fail_fast"},
+    "breaker_stale": {"OPA_FAIL_MODE": "stale"},
+}
+
+
+class FlakyOPA:
+    """Wraps the stub OPA app; `mode` is flipped by the benchmark between phases."""
+
+    def __init__(self, fault: str):
+        self.inner = stub_opa_app()
+        self.fault = fault
+        self.mode = "ok"
+        self.received = collections.Counter()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            self.received[self.mode] += 1
+            if self.mode == "outage":
+                if self.fault == "hang":
+                    await asyncio.sleep(10)
+                else:
+                    await send({"type": "http.response.start", "status": 503, "headers": [(b"content-type", b"text/plain")]})
+                    await send({"type": "http.response.body", "body": b"unavailable"})
+                    return
+        await self.inner(scope, receive, send)
+
+
+def phase_summary(samples: list) -> dict:
+    if not samples:
+        return {"requests": 0}
+    lat = sorted(s[0] for s in samples)
+
+    def pct(p: float) -> float:
+        return round(lat[min(len(lat) - 1, int(p * len(lat)))] * 1000, 1)
+
+    statuses = collections.Counter(str(s[1]) for s in samples)
+    return {"requests": len(lat), "p50_ms": pct(0.5), "p99_ms": pct(0.99), "max_ms": round(lat[-1] * 1000, 1),
+            "mean_ms": round(statistics.fmean(lat) * 1000, 1), "status": dict(statuses), "stale": sum(s[2] for s in samples)}
+
+
+async def drive(url: str, opa: FlakyOPA, args) -> dict:
+    samples = {"healthy": [], "outage": [], "recovery": []}
+    phase = ["healthy"]
+    stop = asyncio.Event()
+    async with httpx.AsyncClient(base_url=url, headers=HEADERS, timeout=30) as client:
+        async def worker(n: int):
+            i = n
+            while not stop.is_set():
+                i += 1
+                started_phase = phase[0]
+                t0 = time.perf_counter()
+                resp = await client.post("/mcp/tools/opa_policy_eval", json={"action": "excel.read", "resource": {"path": PATHS[i % len(PATHS)]}})
+                stale = resp.status_code == 200 and bool(resp.json().get("engine", {}).get("stale"))
+                # Attributed to the phase the request started in
+                samples[started_phase].append((time.perf_counter() - t0, resp.status_code, stale))
+
+        workers = [asyncio.create_task(worker(n)) for n in range(args.concurrency)]
+        await asyncio.sleep(args.healthy)
+        phase[0] = opa.mode = "outage"
+        await asyncio.sleep(args.outage)
+        phase[0], opa.mode = "recovery", "ok"
+        await asyncio.sleep(args.recovery)
+        stop.set()
+        await asyncio.gather(*workers)
+    return {name: phase_summary(s) for name, s in samples.items()}
+
+
+def main(args):
+    results = {}
+    with tempfile.TemporaryDirectory() as data_dir:
+        for name in args.configs:
+            opa = FlakyOPA(args.fault)
+            with BackgroundServer(opa) as stub:
+                env = {"OPA_URL": stub.url, "DATA_DIR": data_dir, "POLICY_ENGINE": "opa", "DECISION_CACHE_ALLOW_TTL": "1",
+                       "LOG_LEVEL": "ERROR", **CONFIGS[name]}
+                with SubprocessServer(env) as server:
+                    phases = asyncio.run(drive(server.url, opa, args))
+            results[name] = {**phases, "opa_requests": dict(opa.received)}
+    emit({"benchmark": "opa_faults", "fault": args.fault, "concurrency": args.concurrency,
+          "phases_s": [args.healthy, args.outage, args.recovery], **results})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--healthy", type=float, default=3)
+    parser.add_argument("--outage", type=float, default=6)
+    parser.add_argument("--recovery", type=float, default=4)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--fault", choices=("hang", "error"), default="hang")
+    parser.add_argument("--configs", nargs="+", choices=sorted(CONFIGS), default=list(CONFIGS))
+    main(parser.parse_args())
@@ -0,0 +1,114 @@
+# python
+"""Differential check of the embedded policy engine against recorded OPA decisions.
+
+    python -m bench.policy_diff                       # replay fixture, exit 1 on mismatch
+    python -m bench.policy_diff --record --opa-url http://localhost:8181
+    python -m bench.policy_diff --record              # record with regopy when no OPA is at hand
+"""
+import argparse
+import itertools
+import json
+import os
+import sys
+
+from app.clients.embedded_policy import load_policy_dir
+
+from .common import POLICY_DIR
+
+HERE = os.path.dirname(__file__)
+FIXTURE = os.path.join(HERE, "fixtures", "opa_decisions.json")
+
+SUBJECTS = [
+    {"sub": "admin-subject", "role": "admin"},
+    {"sub": "demo", "role": "user"},
+    {"sub": "alice", "role": "user"},
+    {"sub": "demo", "role": "guest"},
+    {"sub": "demo"},
+    {},
+]
+ACTIONS = ["excel.read", "excel.write", "opa.eval", "", None]
+RESOURCES = [
+    {"path": "/data/public/sample.csv", "owner": ""},
+    {"path": "/data/protected/protected.csv", "owner": ""},
+    {"path": "/data/protected/protected.csv", "owner": "demo"},
+    {"path": "/data/uploads/report.csv", "owner": "demo"},
+    {"path": "/data/uploads/report.csv", "owner": "alice"},
+    {"path": "/data/uploads/report.csv"},
+    {"path": "/data/uploads/report.csv", "owner": ""},
+    {"path": "/data/public", "owner": ""},
+    {"path": "/data/publicity/x.csv", "owner": ""},
+    {"path": "/etc/passwd", "owner": "demo"},
+    {"path": 42, "owner": "demo"},
+    {},
+]
+
+
+def build_inputs() -> list[dict]:
+    inputs = []
+    for subject, action, resource in itertools.product(SUBJECTS, ACTIONS, RESOURCES):
+        inp = {"subject": subject, "resource": resource}
+        if action is not None:
+            inp["action"] = action
+        inputs.append(inp)
+    return inputs
+
+
+def record_opa(opa_url: str, inputs: list[dict]) -> list[bool]:
+    import httpx
+
+    results = []
+    with httpx.Client(timeout=5) as client:
+        for inp in inputs:
+            resp = client.post(f"{opa_url}/v1/data/mcp/authz/allow", json={"input": inp})
+            resp.raise_for_status()
+            results.append(resp.json().get("result") is True)
+    return results
+
+
+def record_regopy(inputs: list[dict]) -> list[bool]:
+    from regopy import Interpreter
+
+    results = []
+    for inp in inputs:
+        rego = Interpreter()
+        for name in sorted(os.listdir(os.path.join(POLICY_DIR, "mcp"))):
+            with open(os.path.join(POLICY_DIR, "mcp", name)) as f:
+                rego.add_module(name, f.read())
+        rego.set_input_term(json.dumps(inp))
+        out = json.loads(str(rego.query("x = data.mcp.authz.allow")))
+        results.append(out["bindings"]["x"] is True)
+    return results
+
+
+def main(args) -> int:
+    if args.record:
+        inputs = build_inputs()
+        if args.opa_url:
+            results, recorder = record_opa(args.opa_url, inputs), f"opa {args.opa_url}"
+        else:
+            results, recorder = record_regopy(inputs), "regopy"
+        cases = [{"input": i, "result": r} for i, r in zip(inputs, results)]
+        with open(FIXTURE, "w") as f:
+            # One case per line keeps fixture diffs readable
+            f.write(json.dumps({"recorded_with": recorder, "query": "data.mcp.authz.allow"})[:-1])
+            f.write(', "cases": [\n')
+            f.write(",\n".join(json.dumps(c, sort_keys=True) for c in cases))
+            f.write("\n]}\n")
+        print(f"recorded {len(cases)} decisions with {recorder}")
+        return 0
+
+    with open(FIXTURE) as f:
+        fixture = json.load(f)
+    policy = load_policy_dir(POLICY_DIR)
+    mismatches = [c for c in fixture["cases"] if policy.decide(c["input"]) != c["result"]]
+    for case in mismatches:
+        print(f"MISMATCH expected={case['result']} input={json.dumps(case['input'])}")
+    print(json.dumps({"cases": len(fixture["cases"]), "mismatches": len(mismatches), "recorded_with": fixture["recorded_with"]}))
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--record", action="store_true")
+    parser.add_argument("--opa-url")
+    sys.exit(main(parser.parse_args()))
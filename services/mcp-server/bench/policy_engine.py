@@ -0,0 +1,51 @@
+# python
+"""Decisions per second: embedded evaluator vs the OPA HTTP path (stub OPA, pooled client).
+
+    python -m bench.policy_engine --seconds 2
+"""
+import argparse
+import asyncio
+import time
+
+from app.clients.embedded_policy import load_policy_dir
+from app.clients.opa import create_opa_client
+from app.mcp.tools.opa_policy_eval import evaluate
+
+from .common import BackgroundServer, emit, run_load, stub_opa_app
+from .policy_diff import POLICY_DIR, build_inputs
+
+
+def bench_decide(policy, inputs: list[dict], seconds: float) -> dict:
+    n, start = 0, time.perf_counter()
+    deadline = start + seconds
+    while time.perf_counter() < deadline:
+        for inp in inputs:
+            policy.decide(inp)
+        n += len(inputs)
+    elapsed = time.perf_counter() - start
+    return {"decisions": n, "decisions_per_s": round(n / elapsed), "us_per_decision": round(elapsed / n * 1e6, 3)}
+
+
+async def main(args):
+    policy = load_policy_dir(POLICY_DIR)
+    inputs = build_inputs()
+    results = {"embedded": bench_decide(policy, inputs, args.seconds)}
+    with BackgroundServer(stub_opa_app()) as opa:
+        client = create_opa_client()
+        cycle = iter(inputs * (args.requests // len(inputs) + 1))
+
+        async def via_http():
+            inp = next(cycle)
+            await evaluate(opa.url, inp["subject"], inp.get("action", ""), inp["resource"], client=client)
+
+        results["opa_http"] = await run_load(via_http, args.requests, args.concurrency)
+        await client.aclose()
+    emit({"benchmark": "policy_engine", **results})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=2.0)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,56 @@
+# python
+"""Response size and latency of server-side filtering/summary vs fetching rows and working client-side.
+
+    python -m bench.pushdown --rows 200000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import httpx
+
+from .common import SubprocessServer, embedded_env, emit, write_synthetic_csv
+
+FILTER = [{"column": "region", "op": "eq", "value": "north"}, {"column": "amount", "op": "gt", "value": 4500}]
+
+
+def timed(client: httpx.Client, body: dict, repeat: int):
+    best, resp = None, None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        resp = client.post("/mcp/tools/excel_csv_reader", json=body)
+        resp.raise_for_status()
+        data = resp.json()
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return data, {"response_bytes": len(resp.content), "best_ms": round(best * 1000, 1)}
+
+
+def main(args):
+    results = {}
+    with tempfile.TemporaryDirectory() as data_dir:
+        size = write_synthetic_csv(os.path.join(data_dir, "public", "big.csv"), args.rows)
+        # No parsed-file cache so every variant pays for its own pass over the file
+        env = {**embedded_env(data_dir), "FILE_CACHE_MAX_BYTES": "0"}
+        with SubprocessServer(env) as server, httpx.Client(base_url=server.url, headers={"Authorization": "Bearer admin-key"}, timeout=300) as client:
+            base = {"source": "public/big.csv", "max_rows": args.rows, "format": "rows"}
+
+            data, results["filter_client_side"] = timed(client, base, args.repeat)
+            cols = data["columns"]
+            region, amount = cols.index("region"), cols.index("amount")
+            client_count = sum(1 for r in data["rows"] if r[region] == "north" and float(r[amount]) > 4500)
+
+            data, results["filter_pushdown"] = timed(client, {**base, "filters": FILTER}, args.repeat)
+            assert data["count"] == client_count, (data["count"], client_count)
+
+            _, results["projection_pushdown"] = timed(client, {**base, "filters": FILTER, "columns": ["id", "amount"]}, args.repeat)
+            _, results["summary_pushdown"] = timed(client, {"source": "public/big.csv", "summary": True, "columns": ["amount", "quantity"]}, args.repeat)
+    emit({"benchmark": "pushdown", "file_bytes": size, "rows": args.rows, "matching_rows": client_count, **results})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--repeat", type=int, default=3)
+    main(parser.parse_args())
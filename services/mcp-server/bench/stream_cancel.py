@@ -0,0 +1,64 @@
+# python
+"""Regression check: cancelling a stream while a worker is inside next().
+
+    python -m bench.stream_cancel
+
+A client disconnect or MCP notifications/cancelled cancels the consumer of
+BoundedExecutor.iterate() while a pool thread may still be parsing the next batch.
+The consumer must see CancelledError, the generator must be closed once that
+thread is done, and the worker slot must be released. Exits 1 on failure.
+"""
+import asyncio
+import threading
+import time
+
+from app.utils.workers import BoundedExecutor
+
+from .common import emit
+
+
+def slow_rows(state: dict, started: threading.Event, delay: float):
+    try:
+        yield 0
+        started.set()
+        time.sleep(delay)  # stands in for a slow parse of the next batch
+        yield 1
+    finally:
+        state["closed"] = True
+
+
+async def check(delay: float) -> dict:
+    pool = BoundedExecutor(2, 4)
+    state, started = {"closed": False}, threading.Event()
+
+    async def consume():
+        async for _ in pool.iterate(slow_rows(state, started, delay)):
+            pass
+
+    task = asyncio.create_task(consume())
+    await asyncio.to_thread(started.wait)
+    task.cancel()
+    t0 = time.perf_counter()
+    try:
+        await task
+        outcome = "completed"
+    except asyncio.CancelledError:
+        outcome = "CancelledError"
+    except Exception as exc:
+        outcome = f"{type(exc).__name__}: {exc}"
+    result = {"outcome": outcome, "generator_closed": state["closed"], "pending_after": pool.pending,
+              "cancel_wait_ms": round((time.perf_counter() - t0) * 1000, 1)}
+    pool.shutdown()
+    return result
+
+
+def main():
+    result = asyncio.run(check(0.2))
+    ok = result["outcome"] == "CancelledError" and result["generator_closed"] and result["pending_after"] == 0
+    emit({"benchmark": "stream_cancel", "ok": ok, **result})
+    if not ok:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
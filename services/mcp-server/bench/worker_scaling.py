@@ -0,0 +1,134 @@
+# python
+"""Throughput of one host as uvicorn workers are added.
+
+    python -m bench.worker_scaling --workers 1 2 4 --clients 4 --connections 16 --duration 10
+    python -m bench.worker_scaling ... --shared-state-url redis://127.0.0.1:6379/0
+
+Each worker count starts a fresh server (uvicorn --workers N, embedded policy engine, real
+RS256 tokens) and drives it from --clients separate processes, each holding --connections
+MCP WebSockets with one call in flight per socket, for --duration seconds. Calls alternate
+between opa_policy_eval over many resources and a small excel_csv_reader page.
+Load generators share the host's CPUs with the server, so the speedup is bounded by
+cpu_count minus what the clients use; run with more cores than the largest worker count.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+
+import httpx
+import websockets
+
+from .common import BackgroundServer, StubIssuer, SubprocessServer, embedded_env, emit, summarize, write_synthetic_csv
+
+
+def make_calls(resources: int):
+    paths = itertools.cycle(f"/data/public/file-{i}.csv" for i in range(resources))
+    offsets = itertools.cycle(range(0, 5000, 50))
+    kinds = itertools.cycle(("policy", "read"))
+    while True:
+        if next(kinds) == "policy":
+            yield {"name": "opa_policy_eval", "arguments": {"action": "excel.read", "resource": {"path": next(paths)}}}
+        else:
+            yield {"name": "excel_csv_reader", "arguments": {"source": "public/table.csv", "max_rows": 50, "offset": next(offsets)}}
+
+
+async def connection(url: str, token: str, stop_at: float, resources: int, latencies: list, errors: list):
+    calls = make_calls(resources)
+    async with websockets.connect(url, additional_headers={"Authorization": f"Bearer {token}"}, max_size=None) as ws:
+        await ws.send(json.dumps({"jsonrpc": "2.0", "id": 0, "method": "initialize", "params": {}}))
+        await ws.recv()
+        for msg_id in itertools.count(1):
+            started = time.perf_counter()
+            if started >= stop_at:
+                return
+            await ws.send(json.dumps({"jsonrpc": "2.0", "id": msg_id, "method": "tools/call", "params": next(calls)}))
+            reply = json.loads(await ws.recv())
+            if "error" in reply or reply.get("result", {}).get("isError"):
+                errors.append(json.dumps(reply)[:200])
+            latencies.append(time.perf_counter() - started)
+
+
+def client_process(url: str, token: str, connections: int, duration: float, start_at: float, resources: int, out):
+    # One load generator; all of them start at the same wall-clock instant
+    async def run():
+        await asyncio.sleep(max(0.0, start_at - time.time()))
+        stop_at = time.perf_counter() + duration
+        latencies, errors = [], []
+        await asyncio.gather(*(connection(url, token, stop_at, resources, latencies, errors) for _ in range(connections)))
+        return latencies, errors
+
+    out.put(asyncio.run(run()))
+
+
+def wait_for_workers(url: str, token: str, workers: int, timeout: float = 30.0) -> int:
+    # /healthz answers as soon as one worker is up; wait until every worker has served a request
+    pids, deadline = set(), time.time() + timeout
+    while len(pids) < workers and time.time() < deadline:
+        # A new connection each time so the kernel can hand it to any worker
+        pids.add(httpx.get(f"{url}/admin/shared-state", headers={"Authorization": f"Bearer {token}"}, timeout=5).json()["pid"])
+    return len(pids)
+
+
+def measure(url: str, token: str, args) -> dict:
+    ctx = multiprocessing.get_context("spawn")
+    out = ctx.Queue()
+    start_at = time.time() + 2.0
+    procs = [ctx.Process(target=client_process, args=(url, token, args.connections, args.duration, start_at, args.resources, out))
+             for _ in range(args.clients)]
+    for proc in procs:
+        proc.start()
+    latencies, errors = [], []
+    for _ in procs:
+        got, failed = out.get()
+        latencies += got
+        errors += failed
+    for proc in procs:
+        proc.join()
+    result = summarize(latencies, args.duration)
+    result["errors"] = len(errors)
+    if errors:
+        result["first_error"] = errors[0]
+    return result
+
+
+def main(args):
+    issuer = StubIssuer()
+    token = issuer.mint("bench-admin", "admin")
+    runs = []
+    with tempfile.TemporaryDirectory() as data_dir:
+        write_synthetic_csv(os.path.join(data_dir, "public", "table.csv"), 5100)
+        with BackgroundServer(issuer.app) as auth:
+            env = {
+                **embedded_env(data_dir), "JWKS_URL": f"{auth.url}/jwks", "JWT_ISSUER": issuer.issuer, "JWT_AUDIENCE": issuer.audience,
+                "AUTH_DEV_TOKENS": "false", "LOG_LEVEL": "WARNING", "METRICS_ENABLED": "false", "SHARED_STATE_URL": args.shared_state_url,
+                "SHARED_STATE_PREFIX": f"bench-{os.getpid()}:",
+            }
+            for workers in args.workers:
+                with SubprocessServer({**env, "WEB_CONCURRENCY": str(workers)}, extra_args=("--workers", str(workers))) as server:
+                    seen = wait_for_workers(server.url, token, workers)
+                    result = measure(server.url.replace("http", "ws", 1) + "/mcp", token, args)
+                runs.append({"workers": workers, "workers_seen": seen, **result})
+    base = runs[0]["rps"] / runs[0]["workers"] if runs and runs[0]["rps"] else 0
+    for run in runs:
+        run["speedup"] = round(run["rps"] / runs[0]["rps"], 2) if base else None
+        run["efficiency"] = round(run["rps"] / (base * run["workers"]), 2) if base else None
+    emit({
+        "benchmark": "worker_scaling", "cpu_count": os.cpu_count(), "shared_state": args.shared_state_url.split(":", 1)[0],
+        "clients": args.clients, "connections_per_client": args.connections, "duration_s": args.duration, "runs": runs,
+    })
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--clients", type=int, default=4, help="load generator processes")
+    parser.add_argument("--connections", type=int, default=16, help="WebSockets per load generator")
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--resources", type=int, default=500)
+    parser.add_argument("--shared-state-url", default="memory://")
+    main(parser.parse_args())
@@ -0,0 +1,79 @@
+# python
+"""XLSX rows/s and peak memory: streaming read-only iterator vs loading the whole workbook.
+
+    python -m bench.xlsx_reader --rows 100000
+
+Each mode runs in a fresh child process so ru_maxrss is attributable to it.
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from .common import SERVICE_DIR, emit
+
+MODES = ("full_load", "streaming", "streaming_projected", "streaming_first_1000")
+
+
+def write_workbook(path: str, rows: int) -> int:
+    import openpyxl
+
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet("data")
+    ws.append(["id", "name", "amount", "region", "quantity", "created_at", "note"])
+    for i in range(1, rows + 1):
+        ws.append([i, f"name-{i % 97}", i * 1.25, ("north", "south", "east", "west")[i % 4], i % 500, f"2025-01-{i % 28 + 1:02d}", f"row {i} note"])
+    wb.save(path)
+    return os.path.getsize(path)
+
+
+def run_mode(mode: str, path: str) -> dict:
+    from app.mcp.tools.excel_csv_reader import read_table
+
+    t0 = time.perf_counter()
+    if mode == "full_load":
+        import openpyxl
+
+        wb = openpyxl.load_workbook(path, data_only=True)
+        rows = [list(r) for r in wb.worksheets[0].iter_rows(min_row=2, values_only=True)]
+        count = len(rows)
+    elif mode == "streaming":
+        count = len(read_table(path, max_rows=None, kind="xlsx")[1])
+    elif mode == "streaming_projected":
+        count = len(read_table(path, max_rows=None, kind="xlsx", columns=["id", "amount"])[1])
+    else:
+        count = len(read_table(path, max_rows=1000, kind="xlsx")[1])
+    elapsed = time.perf_counter() - t0
+    return {
+        "rows": count,
+        "seconds": round(elapsed, 3),
+        "rows_per_s": round(count / elapsed),
+        "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+
+
+def main(args):
+    if args.child:
+        print(json.dumps(run_mode(args.child, args.path)))
+        return
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "big.xlsx")
+        size = write_workbook(path, args.rows)
+        for mode in MODES:
+            out = subprocess.run([sys.executable, "-m", "bench.xlsx_reader", "--child", mode, "--path", path],
+                                 cwd=SERVICE_DIR, check=True, capture_output=True, text=True).stdout
+            results[mode] = json.loads(out)
+    emit({"benchmark": "xlsx_reader", "file_bytes": size, "rows": args.rows, "modes": results})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--child", choices=MODES)
+    parser.add_argument("--path")
+    main(parser.parse_args())
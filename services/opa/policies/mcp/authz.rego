@@ -20,11 +20,20 @@ allow {
   startswith(input.resource.path, "/data/public/")
 }
 
-# Allow users to upload/write files to the uploads directory
+# Allow users to upload new files to the uploads directory
 allow {
   input.subject.role == "user"
   input.action == "excel.write"
   startswith(input.resource.path, "/data/uploads/")
+  input.resource.owner == ""
+}
+
+# Allow users to overwrite uploads they own
+allow {
+  input.subject.role == "user"
+  input.action == "excel.write"
+  startswith(input.resource.path, "/data/uploads/")
+  input.resource.owner == input.subject.sub
 }
 
 # Allow admins to upload/write files (general rule, covers uploads too)
@@ -0,0 +1,7 @@
+# python
+# Clients for the MCP server: pooled, cached REST calls for page scripts and an async
+# JSON-RPC client for running several tool calls at once.
+from .aio import AsyncMcpClient, call_tools
+from .rest import McpError, evaluate_policy, get_session, list_files, read_page, upload_file
+
+__all__ = ["AsyncMcpClient", "McpError", "call_tools", "evaluate_policy", "get_session", "list_files", "read_page", "upload_file"]
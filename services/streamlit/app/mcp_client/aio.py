@@ -0,0 +1,77 @@
+# python
+import asyncio
+import itertools
+import json
+from typing import List, Optional, Tuple
+
+import httpx
+
+
+class AsyncMcpClient:
+    """JSON-RPC client for the server's streamable-HTTP /mcp endpoint.
+
+    One session per client: the token is checked once at initialize and tool calls are
+    sent concurrently over a pooled connection. The server caps calls in flight per
+    session (MCP_SESSION_MAX_IN_FLIGHT); max_in_flight should not exceed it.
+    """
+
+    def __init__(self, base_url: str, bearer: str, timeout: float = 60.0, max_in_flight: int = 8):
+        self.http = httpx.AsyncClient(base_url=base_url, timeout=timeout, headers={"Authorization": bearer} if bearer else {},
+                                      limits=httpx.Limits(max_connections=max_in_flight, max_keepalive_connections=max_in_flight))
+        self.ids = itertools.count(1)
+        self.session_id: Optional[str] = None
+        self.sem = asyncio.Semaphore(max_in_flight)
+
+    async def __aenter__(self):
+        reply = await self._rpc("initialize", {"clientInfo": {"name": "streamlit"}})
+        self.server_info = reply.get("serverInfo", {})
+        return self
+
+    async def __aexit__(self, *exc):
+        try:
+            if self.session_id is not None:
+                await self.http.delete("/mcp", headers={"Mcp-Session-Id": self.session_id})
+        except httpx.HTTPError:
+            pass
+        await self.http.aclose()
+
+    async def _rpc(self, method: str, params: dict) -> dict:
+        headers = {"Mcp-Session-Id": self.session_id} if self.session_id else {}
+        async with self.sem:
+            resp = await self.http.post("/mcp", json={"jsonrpc": "2.0", "id": next(self.ids), "method": method, "params": params}, headers=headers)
+        if resp.status_code != 200:
+            raise RuntimeError(f"MCP {method} failed with HTTP {resp.status_code}: {resp.text[:300]}")
+        if self.session_id is None:
+            self.session_id = resp.headers.get("mcp-session-id")
+        message = resp.json()
+        if "error" in message:
+            raise RuntimeError(f"MCP {method} failed: {message['error'].get('message')}")
+        return message["result"]
+
+    async def list_tools(self) -> list:
+        return (await self._rpc("tools/list", {}))["tools"]
+
+    async def call_tool(self, name: str, arguments: dict) -> dict:
+        # The tool's JSON result; tool errors (denied, bad input) come back as {"error": text}
+        result = await self._rpc("tools/call", {"name": name, "arguments": arguments})
+        text = "".join(block.get("text", "") for block in result.get("content", []))
+        if result.get("isError"):
+            return {"error": text}
+        try:
+            return json.loads(text)
+        except ValueError:
+            return {"text": text}
+
+    async def call_many(self, calls: List[Tuple[str, dict]]) -> list:
+        # Results in call order; one failing call does not cancel the others
+        results = await asyncio.gather(*(self.call_tool(name, arguments) for name, arguments in calls), return_exceptions=True)
+        return [{"error": f"{type(r).__name__}: {r}"} if isinstance(r, Exception) else r for r in results]
+
+
+def call_tools(base_url: str, bearer: str, calls: List[Tuple[str, dict]]) -> list:
+    # Blocking entry point for Streamlit scripts, which run outside an event loop
+    async def run():
+        async with AsyncMcpClient(base_url, bearer) as client:
+            return await client.call_many(calls)
+
+    return asyncio.run(run())
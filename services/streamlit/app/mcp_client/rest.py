@@ -0,0 +1,64 @@
+# python
+import os
+from typing import Optional
+
+import requests
+import streamlit as st
+from requests.adapters import HTTPAdapter
+
+# How long an identical read is answered from the page cache instead of the server
+READ_CACHE_TTL = float(os.environ.get("READ_CACHE_TTL", "60"))
+LIST_CACHE_TTL = float(os.environ.get("LIST_CACHE_TTL", "30"))
+HTTP_POOL_SIZE = int(os.environ.get("HTTP_POOL_SIZE", "10"))
+
+
+class McpError(Exception):
+    def __init__(self, status: int, body: str):
+        super().__init__(f"Error {status}")
+        self.status = status
+        self.body = body
+
+
+@st.cache_resource
+def get_session() -> requests.Session:
+    # One keep-alive pool for every rerun and browser session of this process
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def _post(url: str, bearer: str, timeout: float, **kwargs) -> dict:
+    headers = {"Authorization": bearer} if bearer else {}
+    resp = get_session().post(url, headers=headers, timeout=timeout, **kwargs)
+    if not resp.ok:
+        # Raised, so st.cache_data does not keep failures
+        raise McpError(resp.status_code, resp.text)
+    return resp.json()
+
+
+@st.cache_data(ttl=READ_CACHE_TTL, show_spinner=False, max_entries=256)
+def read_page(base_url: str, bearer: str, source: str, max_rows: int, offset: int = 0, version: Optional[str] = None) -> dict:
+    # Keyed by token, so users never see each other's results. version (an upload's sha256)
+    # makes a re-uploaded file miss the cache instead of waiting for the TTL.
+    payload = {"source": source, "max_rows": max_rows, "offset": offset, "format": "rows", "infer_types": True}
+    return _post(f"{base_url}/mcp/tools/excel_csv_reader", bearer, 30, json=payload)
+
+
+@st.cache_data(ttl=LIST_CACHE_TTL, show_spinner=False)
+def list_files(base_url: str, bearer: str, prefix: str = "") -> list:
+    files, offset = [], 0
+    while offset is not None:
+        page = _post(f"{base_url}/mcp/tools/list_files", bearer, 30, json={"prefix": prefix, "offset": offset, "limit": 500})
+        files += page["files"]
+        offset = page["next_offset"]
+    return files
+
+
+def upload_file(base_url: str, bearer: str, name: str, content: bytes, content_type: str) -> dict:
+    return _post(f"{base_url}/mcp/upload", bearer, 60, files={"file": (name, content, content_type)})
+
+
+def evaluate_policy(base_url: str, bearer: str, action: str, resource: dict) -> dict:
+    return _post(f"{base_url}/mcp/tools/opa_policy_eval", bearer, 30, json={"action": action, "resource": resource})
@@ -1,9 +1,13 @@
 # python
+import json
+import math
 import os
 import requests
 import streamlit as st
 import pandas as pd
 
+from app.mcp_client import McpError, evaluate_policy, list_files, read_page, upload_file
+
 st.set_page_config(page_title="MCP Tools", layout="wide")
 
 # Resolve MCP server URL for both Docker (service DNS) and local dev
@@ -11,6 +15,8 @@ MCP_SERVER_URL = os.environ.get("MCP_SERVER_URL") or os.environ.get("VITE_MCP_SE
 if not MCP_SERVER_URL:
     st.error("MCP_SERVER_URL environment variable not set. Please configure it.")
     st.stop()
+# Rows fetched and rendered at a time; larger reads are paged with offset/next_offset
+PAGE_ROWS = int(os.environ.get("PAGE_ROWS", "500"))
 
 st.title("MCP Tools")
 
@@ -26,98 +32,83 @@ default_files = [
     "protected/protected.csv",
 ]
 
+
+def show_read(source: str, max_rows: int, version=None):
+    # Only the selected page is fetched and turned into a DataFrame; pages are cached
+    pages = max(1, math.ceil(max_rows / PAGE_ROWS))
+    page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1, key=f"page:{source}") if pages > 1 else 1
+    offset = (page - 1) * PAGE_ROWS
+    with st.spinner("Reading file..."):
+        try:
+            data = read_page(MCP_SERVER_URL, bearer, source, min(PAGE_ROWS, max_rows - offset), offset, version)
+        except McpError as e:
+            st.error("User does not have read permissions on this file." if e.status == 403 else f"Error {e.status}")
+            st.code(e.body)
+            return
+        except requests.RequestException as e:
+            st.error(f"Request failed: {e}")
+            return
+    rows = data.get("rows", [])
+    tab_table, tab_json = st.tabs(["Table", "JSON"])
+    with tab_table:
+        if rows:
+            st.caption(f"Rows {offset + 1}-{offset + len(rows)}" + ("" if data.get("next_offset") else " (end of file)"))
+            st.dataframe(pd.DataFrame(rows, columns=data.get("columns")), use_container_width=True)
+        else:
+            st.info("No rows returned.")
+    with tab_json:
+        st.code(json.dumps(data, ensure_ascii=False))
+
+
 mode = st.selectbox("Select source", ["Default", "Protected", "Upload"], index=0)
 
 # Prepare variables used later
 selected_source = None
 
 if mode == "Default":
+    try:
+        listed = [f["path"] for f in list_files(MCP_SERVER_URL, bearer)]
+    except (McpError, requests.RequestException):
+        listed = []
     cols = st.columns([3,1])
     with cols[0]:
-        selected_source = st.selectbox("Default file (DATA_DIR)", default_files, index=0)
+        selected_source = st.selectbox("Default file (DATA_DIR)", sorted(set(default_files) | set(listed)), index=0)
     with cols[1]:
         max_rows = st.number_input("Max rows", min_value=1, max_value=5000, value=10)
     if st.button("Read File", type="primary"):
-        headers = {"Authorization": bearer} if bearer else {}
-        payload = {"source": selected_source, "max_rows": int(max_rows)}
-        with st.spinner("Reading file..."):
-            try:
-                resp = requests.post(f"{MCP_SERVER_URL}/mcp/tools/excel_csv_reader", json={**payload}, headers=headers, timeout=30)
-            except requests.RequestException as e:
-                # Check if the error is related to permissions for protected files
-                if "protected" in selected_source and "user" in bearer and "admin-key" not in bearer:
-                    st.error("User does not have read permissions on Protected file.")
-                else:
-                    st.error(f"Request failed: {e}")
-                resp = None
-        st.divider(); st.subheader("Result")
-        if resp and resp.ok:
-            data = resp.json(); rows = data.get("rows", [])
-            tab_table, tab_json = st.tabs(["Table", "JSON"])
-            with tab_table:
-                if rows:
-                    st.dataframe(pd.DataFrame(rows), use_container_width=True)
-                else:
-                    st.info("No rows returned.")
-            with tab_json:
-                st.code(resp.text)
-        elif resp:
-            st.error(f"Error {resp.status_code}")
-            st.code(resp.text)
-        else:
-            st.error("No response from server.")
+        # Kept across reruns so paging does not need another button press
+        st.session_state["read"] = {"source": selected_source, "max_rows": int(max_rows)}
 else:
     upcol = st.columns([3,1])
     with upcol[0]:
-        uploaded = st.file_uploader("Upload CSV file", type=["csv"]) 
+        uploaded = st.file_uploader("Upload CSV or XLSX file", type=["csv", "xlsx"])
     with upcol[1]:
         max_rows = st.number_input("Max rows", min_value=1, max_value=5000, value=10, key="up_rows")
     if uploaded is not None:
         st.caption("Uploaded file will be read from /data/uploads inside MCP container")
         if st.button("Upload & Read", type="primary"):
-            headers = {"Authorization": bearer} if bearer else {}
-            files = {"file": (uploaded.name, uploaded.getvalue(), uploaded.type or "text/csv")}
             with st.spinner("Uploading..."):
                 try:
-                    up_resp = requests.post(f"{MCP_SERVER_URL}/mcp/upload", files=files, headers=headers, timeout=60)
+                    up_info = upload_file(MCP_SERVER_URL, bearer, uploaded.name, uploaded.getvalue(), uploaded.type or "application/octet-stream")
+                except McpError as e:
+                    st.error(f"Upload error {e.status}")
+                    st.code(e.body)
+                    up_info = None
                 except requests.RequestException as e:
                     st.error(f"Upload failed: {e}")
-                    up_resp = None
-            if up_resp and up_resp.ok:
-                up_info = up_resp.json()
-                selected_source = up_info.get("relative_path")  # e.g., uploads/<name>
-                owner = bearer.split("Bearer ")[1].split("-")[0] if "Bearer " in bearer and "-" in bearer else "demo"
-                payload = {"source": selected_source, "max_rows": int(max_rows), "owner": owner}
-                with st.spinner("Reading uploaded file..."):
-                    try:
-                        read_resp = requests.post(f"{MCP_SERVER_URL}/mcp/tools/excel_csv_reader", json={**payload}, headers=headers, timeout=30)
-                    except requests.RequestException as e:
-                        st.error(f"Custom Error: Read failed: {e}")
-                        read_resp = None
-                st.divider()
-                st.subheader("Result")
-                if read_resp and read_resp.ok:
-                    data = read_resp.json(); rows = data.get("rows", [])
-                    tab_table, tab_json = st.tabs(["Table", "JSON"])
-                    with tab_table:
-                        if rows:
-                            st.dataframe(pd.DataFrame(rows), use_container_width=True)
-                        else:
-                            st.info("No rows returned.")
-                    with tab_json:
-                        st.code(read_resp.text)
-                elif read_resp:
-                    st.error(f"Read error {read_resp.status_code}")
-                    st.code(read_resp.text)
-                else:
-                    st.error("No response from server for read.")
-            elif up_resp:
-                st.error(f"Upload error {up_resp.status_code}")
-                st.code(up_resp.text)
-            else:
-                st.error("No response from server for upload.")
+                    up_info = None
+            if up_info:
+                # The server records the uploader as owner; the hash keys the cache to this version
+                st.session_state["read"] = {"source": up_info.get("relative_path"), "max_rows": int(max_rows), "version": up_info.get("sha256")}
     else:
-        st.info("Choose a CSV file to enable Upload & Read.")
+        st.info("Choose a CSV or XLSX file to enable Upload & Read.")
+
+read = st.session_state.get("read")
+if read and (mode == "Default") == (read.get("version") is None):
+    if read.get("version"):
+        selected_source = read["source"]
+    st.divider(); st.subheader("Result")
+    show_read(read["source"], read["max_rows"], read.get("version"))
 
 # OPA Policy Eval section
 st.header("OPA Policy Eval")
@@ -125,7 +116,7 @@ colsa = st.columns(2)
 with colsa[0]:
     action = st.text_input("Action", value="excel.read")
 # Determine a safe default resource path
-if mode == "Default" and selected_source:
+if selected_source:
     resource_default = f"/data/{selected_source}"
 else:
     # Placeholder for uploads until a file is uploaded
@@ -133,24 +124,15 @@ else:
 with colsa[1]:
     resource_path = st.text_input("Resource Path", value=resource_default)
 if st.button("Evaluate Policy"):
-    headers = {"Authorization": bearer} if bearer else {}
-    payload = {"action": action, "resource": {"path": resource_path, "owner": bearer.split("Bearer ")[1].split("-")[0] if "Bearer " in bearer else ""}}
+    # Owner is filled in by the server from its file catalog
     try:
-        resp = requests.post(f"{MCP_SERVER_URL}/mcp/tools/opa_policy_eval", json=payload, headers=headers, timeout=30)
+        data = evaluate_policy(MCP_SERVER_URL, bearer, action, {"path": resource_path})
+    except McpError as e:
+        data = {"status": e.status, "raw": e.body}
     except requests.RequestException as e:
         st.error(f"OPA eval failed: {e}")
-        resp = None
-    st.divider(); st.subheader("Decision")
-    data = {}
-    if resp and resp.ok:
-        try:
-            data = resp.json()
-        except Exception:
-            data = {"raw": resp.text}
-    elif resp:
-        data = {"status": resp.status_code, "raw": resp.text}
-    else:
         data = {"error": "no response"}
+    st.divider(); st.subheader("Decision")
     allow = bool(data.get("allow"))
     role = "admin" if bearer.strip().endswith("admin-key") else "user"
     rights = data.get("rights") or ("rw" if role == "admin" else "r")
@@ -1,7 +1,10 @@
 # python
 import os
-import streamlit as st
+import time
 import requests
+import streamlit as st
+
+from app.mcp_client import McpError, call_tools, list_files
 
 st.set_page_config(page_title="Chat", layout="wide")
 
@@ -11,8 +14,35 @@ MCP_SERVER_URL = os.environ.get("MCP_SERVER_URL", "http://localhost:9000")
 
 with st.sidebar:
     bearer = st.text_input("Access Token", type="password")
+authorization = bearer if not bearer or bearer.startswith("Bearer ") else f"Bearer {bearer}"
 
 user_input = st.text_input("Your message")
 if st.button("Send") and user_input:
     st.write("This is a placeholder. LLM + tool-calls wiring will be implemented.")
     st.json({"message": user_input})
+
+# Tool calls an LLM turn would issue together run concurrently in one MCP session
+st.header("Parallel tool calls")
+try:
+    files = [f["path"] for f in list_files(MCP_SERVER_URL, authorization)] if authorization else []
+except (McpError, requests.RequestException) as e:
+    st.error(f"Could not list files: {e}")
+    files = []
+sources = st.multiselect("Files", files, default=files[:3])
+if st.button("Inspect files", disabled=not sources):
+    calls = [("excel_csv_reader", {"source": source, "metadata_only": True}) for source in sources]
+    calls += [("opa_policy_eval", {"action": "excel.write", "resource": {"path": f"/data/{source}"}}) for source in sources]
+    started = time.perf_counter()
+    with st.spinner(f"Running {len(calls)} tool calls..."):
+        try:
+            results = call_tools(MCP_SERVER_URL, authorization, calls)
+        except Exception as e:
+            st.error(f"MCP session failed: {e}")
+            results = []
+    if results:
+        st.caption(f"{len(calls)} calls in {(time.perf_counter() - started) * 1000:.0f} ms")
+        for source, meta, decision in zip(sources, results, results[len(sources):]):
+            with st.expander(source):
+                info = meta.get("file", meta)
+                st.write({"columns": info.get("columns"), "row_count": info.get("row_count"), "size": info.get("size"),
+                          "owner": info.get("owner"), "writable": decision.get("allow", False)})